@@ -0,0 +1,101 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Load test for the home page (or any other GET URL), standard library only.
+
+Runs N client threads against a running server for a fixed time and reports
+requests/second and latency percentiles. Run it against the server before
+and after a change (e.g. with STATION_MAP_CACHE_SECONDS=0 for "before", which
+rebuilds the station map on every hit) and compare.
+
+Usage:
+    python home_loadtest.py --url http://127.0.0.1:8000/ --concurrency 8 --duration 30
+"""
+import argparse
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def worker(url, deadline, timeout, latencies, errors, lock):
+    local_latencies = []
+    local_errors = 0
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                response.read()
+                ok = response.status == 200
+        except (urllib.error.URLError, OSError):
+            ok = False
+        if ok:
+            local_latencies.append(time.monotonic() - started)
+        else:
+            local_errors += 1
+    with lock:
+        latencies.extend(local_latencies)
+        errors[0] += local_errors
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PSWS home page load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/", help="URL to request")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--warmup", type=int, default=3, help="requests before timing starts")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per request timeout (seconds)")
+    args = parser.parse_args(argv)
+
+    # fill caches / open connections so the first request is not measured
+    for _ in range(args.warmup):
+        try:
+            with urllib.request.urlopen(args.url, timeout=args.timeout) as response:
+                response.read()
+        except (urllib.error.URLError, OSError) as ex:
+            print("warmup request failed: %s" % ex)
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker,
+                                args=(args.url, deadline, args.timeout, latencies, errors, lock))
+               for _ in range(max(1, args.concurrency))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    print("url:          %s" % args.url)
+    print("concurrency:  %d" % args.concurrency)
+    print("requests:     %d ok, %d failed in %.1fs" % (len(latencies), errors[0], elapsed))
+    print("throughput:   %.1f requests/s" % (len(latencies) / elapsed))
+    if latencies:
+        print("latency (ms): mean %.1f  p50 %.1f  p95 %.1f  p99 %.1f  max %.1f" % (
+            statistics.mean(latencies) * 1000,
+            percentile(latencies, 0.50) * 1000,
+            percentile(latencies, 0.95) * 1000,
+            percentile(latencies, 0.99) * 1000,
+            latencies[-1] * 1000))
+
+
+if __name__ == "__main__":
+    main()
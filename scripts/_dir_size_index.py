@@ -0,0 +1,225 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Incremental, cached size index for observation directories.
+
+A DRF observation directory gains one HDF5 file per hour (or per minute) all
+day, and every continuous upload used to re-stat the whole tree to update
+Observation.size. The index remembers, per directory, its mtime and the
+(size, mtime, inode) of every file in it. On refresh only directories whose mtime
+changed are listed. In unchanged directories only the files modified within
+SIZE_INDEX_SEAL_HOURS are stat'ed again, since a file that grows or is
+rewritten in place (rsync --inplace/--append, an HDF5 file still being
+written) does not change its directory's mtime; a directory whose files
+are all older than that is sealed and costs a single stat of the directory.
+A full rescan walks the tree level by level with os.scandir on a bounded
+thread pool.
+
+Indexes are stored as JSON under SIZE_INDEX_DIR (not inside the observation
+directory, so they never end up in downloaded archives).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+INDEX_VERSION = 2
+
+
+def default_index_dir() -> str:
+    return os.getenv("SIZE_INDEX_DIR", "/psws/temp/size_index")
+
+
+def index_path_for(root: str, index_dir: str | None = None) -> str:
+    root = os.path.abspath(root)
+    digest = hashlib.sha1(root.encode("utf-8")).hexdigest()[:20]
+    return os.path.join(index_dir or default_index_dir(), digest + ".json")
+
+
+class DirSizeIndex:
+    """Size index for one directory tree (e.g. one DRF observation)."""
+
+    def __init__(self, root: str, index_dir: str | None = None,
+                 workers: int | None = None) -> None:
+        self.root = os.path.abspath(root)
+        self.path = index_path_for(self.root, index_dir)
+        self.workers = workers or int(os.getenv("SIZE_INDEX_WORKERS", "8"))
+        # files unmodified for this long are taken as complete
+        self.seal_after_ns = int(float(os.getenv("SIZE_INDEX_SEAL_HOURS", "6")) * 3600 * 10**9)
+        # relative dir -> {"mtime_ns": int, "files": {name: [size, mtime_ns, inode]},
+        #                  "subdirs": [names], "sealed": bool}
+        self.dirs: dict[str, dict] = {}
+        self.stats = {"dirs_listed": 0, "dirs_reused": 0, "dirs_sealed": 0, "files_stated": 0}
+        self._stats_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def load(self) -> bool:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION or data.get("root") != self.root:
+            return False
+        self.dirs = data.get("dirs", {})
+        return True
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {"version": INDEX_VERSION, "root": self.root,
+                "total": self.total(), "dirs": self.dirs}
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    # ------------------------------------------------------------------
+    # Scanning
+    # ------------------------------------------------------------------
+    def _scan_dir(self, rel: str, full: bool) -> tuple[str, dict | None]:
+        path = os.path.join(self.root, rel) if rel else self.root
+        cached = self.dirs.get(rel)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return rel, None
+        recent_ns = time.time_ns() - self.seal_after_ns
+        if cached is not None and not full and cached["mtime_ns"] == mtime_ns:
+            if cached.get("sealed"):
+                with self._stats_lock:
+                    self.stats["dirs_sealed"] += 1
+                return rel, cached
+            # no entries added or removed: re-stat the files that may still be written
+            files = dict(cached["files"])
+            stated = 0
+            for name, known in cached["files"].items():
+                if known[1] < recent_ns:
+                    continue
+                stated += 1
+                try:
+                    st = os.stat(os.path.join(path, name), follow_symlinks=False)
+                except OSError:
+                    del files[name]
+                    continue
+                files[name] = [st.st_size, st.st_mtime_ns, st.st_ino]
+            with self._stats_lock:
+                self.stats["dirs_reused"] += 1
+                self.stats["files_stated"] += stated
+            return rel, dict(cached, files=files, sealed=self._sealed(files, recent_ns))
+
+        known_files = cached["files"] if cached is not None and not full else {}
+        files: dict[str, list[int]] = {}
+        subdirs: list[str] = []
+        stated = 0
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    # skip symbolic links, as os.walk + islink did
+                    if entry.is_symlink():
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        known = known_files.get(entry.name)
+                        if known is not None and known[1] < recent_ns and known[2] == entry.inode():
+                            # an old file, not replaced, in a directory that gained entries
+                            files[entry.name] = known
+                            continue
+                        try:
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        stated += 1
+                        files[entry.name] = [st.st_size, st.st_mtime_ns, st.st_ino]
+        except OSError:
+            return rel, None
+        with self._stats_lock:
+            self.stats["dirs_listed"] += 1
+            self.stats["files_stated"] += stated
+        return rel, {"mtime_ns": mtime_ns, "files": files, "subdirs": sorted(subdirs),
+                     "sealed": self._sealed(files, recent_ns)}
+
+    @staticmethod
+    def _sealed(files: dict, recent_ns: int) -> bool:
+        return all(known[1] < recent_ns for known in files.values())
+
+    def refresh(self, full: bool = False) -> int:
+        """Bring the index up to date and return the total size in bytes."""
+        if not os.path.isdir(self.root):
+            self.dirs = {}
+            return 0
+        new_dirs: dict[str, dict] = {}
+        level = [""]
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            while level:
+                if len(level) == 1:
+                    results = [self._scan_dir(level[0], full)]
+                else:
+                    results = list(pool.map(lambda r: self._scan_dir(r, full), level))
+                level = []
+                for rel, entry in results:
+                    if entry is None:
+                        continue
+                    new_dirs[rel] = entry
+                    level.extend(os.path.join(rel, name) if rel else name
+                                 for name in entry["subdirs"])
+        self.dirs = new_dirs
+        return self.total()
+
+    def total(self) -> int:
+        return sum(known[0] for entry in self.dirs.values()
+                   for known in entry["files"].values())
+
+
+def get_size(start_path: str, full: bool = False, index_dir: str | None = None) -> int:
+    """
+    Total size in bytes of all regular files under start_path, using (and
+    updating) the size index. A plain file returns its own size.
+    """
+    if os.path.isfile(start_path):
+        return os.path.getsize(start_path)
+    index = DirSizeIndex(start_path, index_dir)
+    if not full:
+        index.load()
+    total = index.refresh(full=full)
+    try:
+        index.save()
+    except OSError:
+        # an unwritable index directory only costs us the next refresh
+        pass
+    return total
+
+
+def read_size(start_path: str, index_dir: str | None = None) -> int | None:
+    """
+    Size recorded by the last refresh, without touching the data (for readers
+    such as the audit); None if the directory is not indexed.
+    """
+    try:
+        with open(index_path_for(start_path, index_dir), "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != INDEX_VERSION or data.get("root") != os.path.abspath(start_path):
+        return None
+    return data.get("total")
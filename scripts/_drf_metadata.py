@@ -0,0 +1,190 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Shared Digital RF metadata extraction for the watcher, addOBS and plotters.
+
+All needed metadata fields are read with a single DigitalMetadataReader.read()
+call and the channel bounds are read once. Results are cached in memory and
+as JSON under DRF_METADATA_CACHE_DIR so the separate plotter process reuses
+what the watcher already read:
+
+- metadata fields are keyed by dataset path and the dmd_properties.h5 mtime
+- data bounds are keyed by the channel directory state (the newest hourly
+  subdirectory and its mtime), since they grow with every upload
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# fields used by the watcher, addOBS and plotspectrum
+METADATA_FIELDS = ("center_frequencies", "sample_rate_numerator",
+                   "sample_rate_denominator", "lat", "long")
+
+_memory_cache: dict[str, dict] = {}
+_memory_lock = threading.Lock()
+
+
+@dataclass
+class DrfMetadata:
+    path: str
+    channel: str
+    fields: list = field(default_factory=list)
+    center_frequencies: list = field(default_factory=list)
+    sample_rate_numerator: int | None = None
+    sample_rate_denominator: int | None = None
+    lat: float | None = None
+    long: float | None = None
+    metadata_start: int | None = None
+    metadata_end: int | None = None
+    start_sample: int | None = None
+    end_sample: int | None = None
+
+    @property
+    def sample_rate(self) -> float | None:
+        if self.sample_rate_numerator is None:
+            return None
+        return self.sample_rate_numerator / (self.sample_rate_denominator or 1)
+
+
+def default_cache_dir() -> str:
+    return os.getenv("DRF_METADATA_CACHE_DIR", "/psws/temp/drf_metadata")
+
+
+def _plain(value):
+    """Convert numpy scalars/arrays from DRF into JSON-friendly values."""
+    if isinstance(value, np.ndarray):
+        return [_plain(v) for v in value.tolist()]
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return value
+
+
+def _metadata_key(path: str, channel: str) -> str:
+    props = os.path.join(path, channel, "metadata", "dmd_properties.h5")
+    mtime = os.stat(props).st_mtime_ns
+    return "%s|%s|%d" % (os.path.abspath(path), channel, mtime)
+
+
+def _bounds_key(path: str, channel: str) -> str:
+    channel_dir = os.path.join(path, channel)
+    st = os.stat(channel_dir)
+    subdirs = sorted(e.name for e in os.scandir(channel_dir)
+                     if e.is_dir() and e.name != "metadata")
+    newest = subdirs[-1] if subdirs else ""
+    newest_mtime = os.stat(os.path.join(channel_dir, newest)).st_mtime_ns if newest else 0
+    return "%d|%s|%d" % (st.st_mtime_ns, newest, newest_mtime)
+
+
+def _cache_file(cache_dir: str, path: str, channel: str) -> str:
+    digest = hashlib.sha1(("%s|%s" % (os.path.abspath(path), channel)).encode()).hexdigest()[:20]
+    return os.path.join(cache_dir, digest + ".json")
+
+
+def _load(cache_file: str) -> dict:
+    with _memory_lock:
+        if cache_file in _memory_cache:
+            return dict(_memory_cache[cache_file])
+    try:
+        with open(cache_file, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _store(cache_file: str, entry: dict) -> None:
+    with _memory_lock:
+        _memory_cache[cache_file] = dict(entry)
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cache_file), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, cache_file)
+    except OSError:
+        # the in-memory cache still saves work inside this process
+        pass
+
+
+def _read_fields(path: str, channel: str) -> dict:
+    import digital_rf as drf
+
+    dmr = drf.DigitalMetadataReader(os.path.join(path, channel, "metadata"))
+    first_sample, last_sample = dmr.get_bounds()
+    start_idx = int(np.uint64(first_sample))
+    available = list(dmr.get_fields())
+    wanted = [f for f in METADATA_FIELDS if f in available]
+    values = {}
+    if wanted:
+        # one read for every field; the first sample's values describe the dataset
+        data_dict = dmr.read(start_idx, start_idx + 2, wanted)
+        for key in list(data_dict)[0:1]:
+            values = data_dict[key]
+    result = {
+        "fields": available,
+        "metadata_start": int(first_sample),
+        "metadata_end": int(last_sample),
+    }
+    for name in wanted:
+        if name in values:
+            result[name] = _plain(values[name])
+    freqs = result.get("center_frequencies")
+    if freqs is not None and not isinstance(freqs, list):
+        result["center_frequencies"] = [freqs]
+    return result
+
+
+def _read_bounds(path: str, channel: str) -> dict:
+    import digital_rf as drf
+
+    start, end = drf.DigitalRFReader(path).get_bounds(channel)
+    return {"start_sample": int(start), "end_sample": int(end)}
+
+
+def read_drf_metadata(path: str, channel: str = "ch0", with_bounds: bool = True,
+                      cache_dir: str | None = None) -> DrfMetadata:
+    """
+    Metadata and (optionally) data bounds for the DRF dataset at path.
+    Raises IOError when the metadata cannot be read.
+    """
+    cache_file = _cache_file(cache_dir or default_cache_dir(), path, channel)
+    entry = _load(cache_file)
+    changed = False
+
+    meta_key = _metadata_key(path, channel)
+    if entry.get("metadata_key") != meta_key:
+        entry = {"metadata_key": meta_key, "metadata": _read_fields(path, channel)}
+        changed = True
+
+    if with_bounds:
+        bounds_key = _bounds_key(path, channel)
+        if entry.get("bounds_key") != bounds_key:
+            entry["bounds_key"] = bounds_key
+            entry["bounds"] = _read_bounds(path, channel)
+            changed = True
+
+    if changed:
+        _store(cache_file, entry)
+
+    values = dict(entry["metadata"])
+    if with_bounds:
+        values.update(entry["bounds"])
+    known = DrfMetadata.__dataclass_fields__
+    return DrfMetadata(path=path, channel=channel,
+                       **{k: v for k, v in values.items() if k in known})
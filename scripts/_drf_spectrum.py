@@ -0,0 +1,115 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Vectorized day readers for the Grape narrow spectrum plots.
+
+The plot is built from 1439 overlapping 1024-sample windows, one every 600
+samples (one minute at 10 samples/second). Instead of one read_vector() call
+and a Python copy loop per window and per subchannel, the day is read once for
+all subchannels, an hour of windows at a time, with one read_vector() call per
+continuous block; the windows are cut out of that buffer with a strided view.
+A window that touches a gap is left as zeros, exactly as the per-window read
+did when read_vector() raised IOError.
+"""
+from __future__ import annotations
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+NFFT = 1024          # samples per FFT window
+STEP = 600           # samples between window starts (1 minute at 10 sps)
+WINDOWS = 1439       # windows read from the dataset
+MINUTES = 1440       # windows in the plot buffer (the last one stays empty)
+CHUNK_WINDOWS = 60   # windows read per pass (one hour), bounds the raw read buffer
+
+
+def read_span(reader, start_sample: int, length: int, channel: str = "ch0",
+              num_subchannels: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Samples [start_sample, start_sample + length) as a (length, num_subchannels)
+    array, plus a mask of the samples actually present. Missing samples are zero.
+    A single-subchannel vector is repeated into every column, as the per-sample
+    copy loop did.
+    """
+    data = None
+    valid = np.zeros(length, dtype=bool)
+    end_sample = start_sample + length
+    try:
+        blocks = reader.get_continuous_blocks(start_sample, end_sample - 1, channel)
+    except IOError:
+        blocks = {}
+    for block_start, block_len in blocks.items():
+        lo = max(int(block_start), start_sample)
+        hi = min(int(block_start) + int(block_len), end_sample)
+        if hi <= lo:
+            continue
+        try:
+            vector = reader.read_vector(lo, hi - lo, channel)
+        except IOError:
+            continue
+        vector = vector.reshape(len(vector), -1)
+        if data is None:
+            data = np.zeros((length, num_subchannels),
+                            dtype=np.result_type(vector.dtype, np.complex64))
+        columns = min(vector.shape[1], num_subchannels)
+        if vector.shape[1] == 1:
+            data[lo - start_sample:hi - start_sample] = vector
+        else:
+            data[lo - start_sample:hi - start_sample, :columns] = vector[:, :columns]
+        valid[lo - start_sample:hi - start_sample] = True
+    if data is None:
+        data = np.zeros((length, num_subchannels), dtype=np.complex64)
+    return data, valid
+
+
+def read_day_windows(reader, start_sample: int, channel: str = "ch0",
+                     num_subchannels: int = 1) -> np.ndarray:
+    """
+    The plot buffers for every subchannel as a (num_subchannels, MINUTES * NFFT)
+    array, so day[i] is a contiguous view for subchannel i. Within it, row j of
+    the (MINUTES, NFFT) reshape holds samples start_sample + j*STEP ... + NFFT - 1.
+
+    Samples keep the dataset's precision (complex64 for DRF complex data); use
+    day[i].astype(complex) where a complex128 buffer is wanted.
+    """
+    day = None
+    for first in range(0, WINDOWS, CHUNK_WINDOWS):
+        count = min(CHUNK_WINDOWS, WINDOWS - first)
+        span = (count - 1) * STEP + NFFT
+        data, valid = read_span(reader, start_sample + first * STEP, span,
+                                channel, num_subchannels)
+        if day is None:
+            day = np.zeros((num_subchannels, MINUTES * NFFT), dtype=data.dtype)
+        elif not np.can_cast(data.dtype, day.dtype):
+            day = day.astype(np.result_type(day.dtype, data.dtype))
+
+        # a window is usable only if none of its samples is missing
+        missing = np.concatenate(([0], np.cumsum(~valid)))
+        starts = np.arange(count) * STEP
+        complete = missing[starts + NFFT] == missing[starts]
+
+        # (count, num_subchannels, NFFT) -> (num_subchannels, count, NFFT)
+        windows = sliding_window_view(data, NFFT, axis=0)[::STEP][:count]
+        rows = day.reshape(num_subchannels, MINUTES, NFFT)
+        rows[:, first:first + count][:, complete] = \
+            windows[complete].transpose(1, 0, 2)
+    return day
+
+
+def minute_peaks(abs_amplitude: np.ndarray) -> np.ndarray:
+    """
+    Peak amplitude per minute, matching the original sample loop: entry 0 is
+    zero, entry k is the largest value among samples (k-1)*NFFT + 1 through
+    k*NFFT - 1 (the first sample of each window is skipped), NaNs are ignored
+    and the result is never below zero.
+    """
+    rows = abs_amplitude[:MINUTES * NFFT].reshape(MINUTES, NFFT)[:MINUTES - 1, 1:]
+    peaks = np.zeros(MINUTES, dtype=float)
+    peaks[1:] = np.fmax(np.fmax.reduce(rows, axis=1), 0.0)
+    return peaks
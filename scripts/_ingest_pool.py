@@ -0,0 +1,124 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Persistent worker pool for in-process ingest jobs.
+Lets the watcher run addOBS/addCSV/plotmag work without paying for a new
+interpreter, Django setup and database connection on every upload.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+import traceback
+from typing import Callable
+
+
+class IngestPool:
+    """
+    Fixed set of worker threads draining a bounded job queue.
+
+    - submit() blocks once `maxsize` jobs are waiting, which pushes back on
+      the caller instead of letting a midnight burst grow memory without limit
+    - each worker keeps its own Django database connection open between jobs
+      (subject to CONN_MAX_AGE); stale connections are dropped before and
+      after every job with close_old_connections()
+    """
+
+    def __init__(self, workers: int = 4, maxsize: int = 256,
+                 log: Callable[[str], None] | None = None,
+                 name: str = "ingest") -> None:
+        self.workers = max(1, int(workers))
+        self.name = name
+        self._queue: queue.Queue = queue.Queue(maxsize=max(0, int(maxsize)))
+        self._log = log or print
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> "IngestPool":
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"{self.name}-{i}",
+                                 daemon=True)
+            t.start()
+            self._threads.append(t)
+        self._log(f"{self.name} pool started with {self.workers} workers, "
+                  f"queue size {self._queue.maxsize}")
+        return self
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the workers once every queued job has been processed."""
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for t in self._threads:
+                t.join()
+        self._threads = []
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+    def submit(self, fn: Callable, *args, **kwargs) -> None:
+        """Queue fn(*args, **kwargs); blocks while the queue is full."""
+        self._queue.put((fn, args, kwargs, time.monotonic()))
+        with self._lock:
+            self.submitted += 1
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def free_slots(self) -> int | None:
+        """Jobs that can be submitted without blocking (None if unbounded)."""
+        if not self._queue.maxsize:
+            return None
+        return max(0, self._queue.maxsize - self._queue.qsize())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "depth": self._queue.qsize(),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+    def _run(self) -> None:
+        from django.db import close_old_connections
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                close_old_connections()
+                return
+            fn, args, kwargs, queued_at = item
+            started = time.monotonic()
+            close_old_connections()
+            try:
+                fn(*args, **kwargs)
+                with self._lock:
+                    self.completed += 1
+            except Exception as ex:
+                with self._lock:
+                    self.failed += 1
+                self._log(f"{self.name} job {getattr(fn, '__name__', fn)} "
+                          f"failed: {ex}")
+                self._log(traceback.format_exc())
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+            self._log(f"{self.name} job {getattr(fn, '__name__', fn)} done in "
+                      f"{time.monotonic() - started:.2f}s "
+                      f"(waited {started - queued_at:.2f}s, depth {self._queue.qsize()})")
@@ -0,0 +1,312 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Persistent, crash-safe ingest job queue backed by SQLite.
+
+Upload triggers are enqueued idempotently, keyed by (station, instrument,
+observation name). A job survives watcher restarts, is retried with
+exponential backoff when ingest raises, and can be replayed by enqueueing the
+trigger path again - no need to remove and recreate trigger directories.
+
+Usage (maintenance):
+    python _job_queue.py stats
+    python _job_queue.py enqueue /psws/home/N000015/cOBS2024-01-01T00-00_#12 ...
+    python _job_queue.py retry-failed
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    station       TEXT NOT NULL,
+    instrument    TEXT NOT NULL,
+    obs_name      TEXT NOT NULL,
+    kind          TEXT NOT NULL,
+    path          TEXT NOT NULL,
+    trigger_mtime REAL NOT NULL DEFAULT 0,
+    state         TEXT NOT NULL,
+    priority      INTEGER NOT NULL DEFAULT 0,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    requeue       INTEGER NOT NULL DEFAULT 0,
+    available_at  REAL NOT NULL,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    started_at    REAL,
+    last_error    TEXT,
+    UNIQUE (station, instrument, obs_name)
+);
+CREATE INDEX IF NOT EXISTS jobs_ready
+    ON jobs (state, available_at, priority);
+"""
+
+
+@dataclass
+class Job:
+    id: int
+    station: str
+    instrument: str
+    obs_name: str
+    kind: str
+    path: str
+    attempts: int
+
+
+def parse_trigger(path: str) -> tuple[str, str, str, str]:
+    """
+    Split a trigger directory path into (kind, station, instrument, obs_name).
+
+    /psws/home/N000015/cOBS2024-01-01T00-00_#12 -> ('c', 'N000015', '12', 'OBS2024-01-01T00-00')
+    Raises ValueError when the name has no '_#<instrument>' suffix.
+    """
+    path = path.rstrip("/")
+    name = os.path.basename(path)
+    if "_#" not in name or not name:
+        raise ValueError("not a trigger directory: " + path)
+    base, instrument = name.split("_#", 1)
+    station = os.path.basename(os.path.dirname(path))
+    return name[0], station, instrument, base[1:]
+
+
+class JobQueue:
+    """SQLite job table shared by every watcher worker (one connection per thread)."""
+
+    def __init__(self, db_path: str, max_attempts: int = 5,
+                 backoff_base: float = 30.0, backoff_max: float = 3600.0) -> None:
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._local = threading.local()
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30.0,
+                                   isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ------------------------------------------------------------------
+    # Producers
+    # ------------------------------------------------------------------
+    def enqueue(self, path: str, priority: int = 0,
+                trigger_mtime: float | None = None, force: bool = False) -> bool:
+        """
+        Record a trigger. Returns True when new work was scheduled.
+
+        - unknown key: inserted as pending
+        - pending: path/priority refreshed (duplicate event, nothing new)
+        - running: flagged to run again once the current attempt finishes,
+          if the trigger is newer than the one being processed
+        - done/failed: pending again if the trigger is newer (a re-upload of
+          a continuous observation) or if force is set (replay)
+        """
+        kind, station, instrument, obs_name = parse_trigger(path)
+        if trigger_mtime is None:
+            try:
+                trigger_mtime = os.stat(path).st_mtime
+            except OSError:
+                trigger_mtime = time.time()
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, state, trigger_mtime FROM jobs "
+                "WHERE station=? AND instrument=? AND obs_name=?",
+                (station, instrument, obs_name)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO jobs (station, instrument, obs_name, kind, path, "
+                    "trigger_mtime, state, priority, available_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (station, instrument, obs_name, kind, path, trigger_mtime,
+                     PENDING, priority, now, now, now))
+                scheduled = True
+            else:
+                newer = force or trigger_mtime > row["trigger_mtime"]
+                state = row["state"]
+                scheduled = False
+                if state == PENDING:
+                    conn.execute(
+                        "UPDATE jobs SET path=?, priority=MAX(priority, ?), "
+                        "trigger_mtime=MAX(trigger_mtime, ?), updated_at=? WHERE id=?",
+                        (path, priority, trigger_mtime, now, row["id"]))
+                elif state == RUNNING and newer:
+                    conn.execute(
+                        "UPDATE jobs SET path=?, requeue=1, trigger_mtime=?, "
+                        "updated_at=? WHERE id=?",
+                        (path, trigger_mtime, now, row["id"]))
+                elif state in (DONE, FAILED) and newer:
+                    conn.execute(
+                        "UPDATE jobs SET path=?, kind=?, state=?, priority=?, attempts=0, "
+                        "trigger_mtime=?, available_at=?, created_at=?, updated_at=?, "
+                        "last_error=NULL WHERE id=?",
+                        (path, kind, PENDING, priority, trigger_mtime, now, now,
+                         now, row["id"]))
+                    scheduled = True
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return scheduled
+
+    def recover(self, stale_after: float | None = None) -> int:
+        """
+        Return jobs left running by a crashed watcher to pending.
+        With stale_after, only jobs started more than that many seconds ago.
+        """
+        now = time.time()
+        conn = self._conn()
+        if stale_after is None:
+            cur = conn.execute(
+                "UPDATE jobs SET state=?, available_at=?, updated_at=? WHERE state=?",
+                (PENDING, now, now, RUNNING))
+        else:
+            cur = conn.execute(
+                "UPDATE jobs SET state=?, available_at=?, updated_at=? "
+                "WHERE state=? AND started_at < ?",
+                (PENDING, now, now, RUNNING, now - stale_after))
+        return cur.rowcount
+
+    def retry_failed(self) -> int:
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE jobs SET state=?, attempts=0, available_at=?, updated_at=? "
+            "WHERE state=?", (PENDING, now, now, FAILED))
+        return cur.rowcount
+
+    # ------------------------------------------------------------------
+    # Consumers
+    # ------------------------------------------------------------------
+    def claim(self) -> Job | None:
+        """Take the highest-priority due job, or None if nothing is due."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE state=? AND available_at<=? "
+                "ORDER BY priority DESC, available_at, id LIMIT 1",
+                (PENDING, now)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET state=?, started_at=?, updated_at=?, requeue=0, "
+                "attempts=attempts+1 WHERE id=?",
+                (RUNNING, now, now, row["id"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return Job(row["id"], row["station"], row["instrument"], row["obs_name"],
+                   row["kind"], row["path"], row["attempts"] + 1)
+
+    def complete(self, job: Job) -> None:
+        now = time.time()
+        # a newer trigger arrived while this one was running: run it again
+        self._conn().execute(
+            "UPDATE jobs SET state=CASE WHEN requeue=1 THEN ? ELSE ? END, "
+            "attempts=CASE WHEN requeue=1 THEN 0 ELSE attempts END, "
+            "requeue=0, available_at=?, updated_at=?, last_error=NULL WHERE id=?",
+            (PENDING, DONE, now, now, job.id))
+
+    def fail(self, job: Job, error: str) -> bool:
+        """Record a failed attempt; returns True if the job will be retried."""
+        now = time.time()
+        retry = job.attempts < self.max_attempts
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (job.attempts - 1)))
+        self._conn().execute(
+            "UPDATE jobs SET state=?, available_at=?, updated_at=?, last_error=? "
+            "WHERE id=?",
+            (PENDING if retry else FAILED, now + delay if retry else now, now,
+             error[-2000:], job.id))
+        return retry
+
+    def run_next(self, handler: Callable[[str], None],
+                 log: Callable[[str], None] = print) -> bool:
+        """Claim one job and run handler(path); returns False if nothing was due."""
+        job = self.claim()
+        if job is None:
+            return False
+        try:
+            handler(job.path)
+        except Exception as ex:
+            retry = self.fail(job, repr(ex))
+            log("Job %d %s/%s/%s attempt %d failed (%s): %s" % (
+                job.id, job.station, job.instrument, job.obs_name, job.attempts,
+                "will retry" if retry else "giving up", ex))
+            raise
+        self.complete(job)
+        return True
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def due_count(self) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM jobs WHERE state=? AND available_at<=?",
+            (PENDING, time.time())).fetchone()[0]
+
+    def metrics(self) -> dict:
+        now = time.time()
+        conn = self._conn()
+        counts = {state: 0 for state in (PENDING, RUNNING, DONE, FAILED)}
+        for row in conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state"):
+            counts[row["state"]] = row["n"]
+        oldest = conn.execute(
+            "SELECT MIN(created_at) FROM jobs WHERE state IN (?, ?)",
+            (PENDING, RUNNING)).fetchone()[0]
+        return {
+            "depth": counts[PENDING],
+            "due": self.due_count(),
+            "running": counts[RUNNING],
+            "done": counts[DONE],
+            "failed": counts[FAILED],
+            "oldest_age_s": round(now - oldest, 1) if oldest else 0.0,
+        }
+
+
+def default_queue_path() -> str:
+    return os.getenv("INGEST_QUEUE_DB", "/psws/temp/ingest_queue.sqlite3")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "enqueue", "retry-failed"):
+        print("Usage: python _job_queue.py stats | enqueue <trigger_path>... | retry-failed")
+        sys.exit(1)
+    q = JobQueue(default_queue_path())
+    if sys.argv[1] == "stats":
+        print(q.metrics())
+    elif sys.argv[1] == "enqueue":
+        for p in sys.argv[2:]:
+            print(p, "queued" if q.enqueue(p, force=True) else "already pending")
+    else:
+        print("failed jobs requeued:", q.retry_failed())
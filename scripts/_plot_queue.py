@@ -0,0 +1,243 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Local render queue (SQLite) between the watcher/ingest scripts and the plot
+service (plotters/psws_plotd.py), replacing one task-spooler job and one fresh
+interpreter per plot.
+
+A job is a renderer kind ("spectrum", "magnetometer", "fldigi") plus the
+keyword arguments for it. Jobs are keyed, so a plot requested again before it
+has been rendered is only rendered once; requested again after it was
+rendered (a re-upload), it is rendered again.
+
+Usage (maintenance):
+    python _plot_queue.py stats
+    python _plot_queue.py retry-failed
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+from _job_queue import DONE, FAILED, PENDING, RUNNING
+
+KINDS = ("spectrum", "magnetometer", "fldigi")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plots (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind        TEXT NOT NULL,
+    job_key     TEXT NOT NULL UNIQUE,
+    args        TEXT NOT NULL,
+    state       TEXT NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    requeue     INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    started_at  REAL,
+    duration    REAL,
+    last_error  TEXT
+);
+CREATE INDEX IF NOT EXISTS plots_ready
+    ON plots (state, created_at);
+"""
+
+
+@dataclass
+class PlotJob:
+    id: int
+    kind: str
+    job_key: str
+    args: dict
+    attempts: int
+
+
+class PlotQueue:
+    """SQLite render queue shared by producers and plot worker processes."""
+
+    def __init__(self, db_path: str, max_attempts: int = 2) -> None:
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30.0,
+                                   isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ------------------------------------------------------------------
+    # Producers
+    # ------------------------------------------------------------------
+    def submit(self, kind: str, key: str, **kwargs) -> bool:
+        """
+        Request a plot. Returns True when a render was scheduled, False if
+        the same plot is already waiting.
+        """
+        if kind not in KINDS:
+            raise ValueError("unknown plot kind: " + kind)
+        job_key = kind + ":" + key
+        args = json.dumps(kwargs, sort_keys=True)
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT id, state FROM plots WHERE job_key=?",
+                               (job_key,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO plots (kind, job_key, args, state, created_at, "
+                    "updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (kind, job_key, args, PENDING, now, now))
+                scheduled = True
+            elif row["state"] == PENDING:
+                conn.execute("UPDATE plots SET args=?, updated_at=? WHERE id=?",
+                             (args, now, row["id"]))
+                scheduled = False
+            elif row["state"] == RUNNING:
+                # the data changed while it was being plotted: plot it again
+                conn.execute("UPDATE plots SET args=?, requeue=1, updated_at=? "
+                             "WHERE id=?", (args, now, row["id"]))
+                scheduled = True
+            else:
+                conn.execute(
+                    "UPDATE plots SET args=?, state=?, attempts=0, created_at=?, "
+                    "updated_at=?, last_error=NULL WHERE id=?",
+                    (args, PENDING, now, now, row["id"]))
+                scheduled = True
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return scheduled
+
+    def recover(self) -> int:
+        """Return jobs left running by a stopped plot service to pending."""
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE plots SET state=?, updated_at=? WHERE state=?",
+            (PENDING, now, RUNNING))
+        return cur.rowcount
+
+    def retry_failed(self) -> int:
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE plots SET state=?, attempts=0, updated_at=? WHERE state=?",
+            (PENDING, now, FAILED))
+        return cur.rowcount
+
+    # ------------------------------------------------------------------
+    # Consumers
+    # ------------------------------------------------------------------
+    def claim(self) -> PlotJob | None:
+        """Take the oldest pending job, or None if the queue is empty."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM plots WHERE state=? ORDER BY created_at, id LIMIT 1",
+                (PENDING,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE plots SET state=?, started_at=?, updated_at=?, requeue=0, "
+                "attempts=attempts+1 WHERE id=?", (RUNNING, now, now, row["id"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return PlotJob(row["id"], row["kind"], row["job_key"],
+                       json.loads(row["args"]), row["attempts"] + 1)
+
+    def complete(self, job: PlotJob, duration: float) -> None:
+        now = time.time()
+        self._conn().execute(
+            "UPDATE plots SET state=CASE WHEN requeue=1 THEN ? ELSE ? END, "
+            "attempts=CASE WHEN requeue=1 THEN 0 ELSE attempts END, requeue=0, "
+            "duration=?, updated_at=?, last_error=NULL WHERE id=?",
+            (PENDING, DONE, duration, now, job.id))
+
+    def fail(self, job: PlotJob, error: str, duration: float) -> bool:
+        """Record a failed render; returns True if it will be tried again."""
+        retry = job.attempts < self.max_attempts
+        self._conn().execute(
+            "UPDATE plots SET state=?, duration=?, updated_at=?, last_error=? "
+            "WHERE id=?",
+            (PENDING if retry else FAILED, duration, time.time(),
+             error[-2000:], job.id))
+        return retry
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def metrics(self, window: float = 3600.0) -> dict:
+        """Backlog and render times; durations cover jobs finished in the last `window` seconds."""
+        now = time.time()
+        conn = self._conn()
+        counts = {state: 0 for state in (PENDING, RUNNING, DONE, FAILED)}
+        for row in conn.execute("SELECT state, COUNT(*) AS n FROM plots GROUP BY state"):
+            counts[row["state"]] = row["n"]
+        oldest = conn.execute(
+            "SELECT MIN(created_at) FROM plots WHERE state=?", (PENDING,)).fetchone()[0]
+        recent = conn.execute(
+            "SELECT COUNT(*), AVG(duration), MAX(duration) FROM plots "
+            "WHERE state=? AND updated_at>=?", (DONE, now - window)).fetchone()
+        return {
+            "backlog": counts[PENDING],
+            "running": counts[RUNNING],
+            "done": counts[DONE],
+            "failed": counts[FAILED],
+            "oldest_age_s": round(now - oldest, 1) if oldest else 0.0,
+            "rendered_last_window": recent[0],
+            "avg_duration_s": round(recent[1] or 0.0, 2),
+            "max_duration_s": round(recent[2] or 0.0, 2),
+        }
+
+
+def default_plot_queue_path() -> str:
+    return os.getenv("PLOT_QUEUE_DB", "/psws/temp/plot_queue.sqlite3")
+
+
+_shared: PlotQueue | None = None
+_shared_lock = threading.Lock()
+
+
+def get_plot_queue() -> PlotQueue:
+    """Process-wide PlotQueue for producers (watcher, addCSV)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = PlotQueue(default_plot_queue_path(),
+                                max_attempts=int(os.getenv("PLOT_MAX_ATTEMPTS", "2")))
+        return _shared
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "retry-failed"):
+        print("Usage: python _plot_queue.py stats | retry-failed")
+        sys.exit(1)
+    q = get_plot_queue()
+    if sys.argv[1] == "stats":
+        print(q.metrics())
+    else:
+        print("failed plots requeued:", q.retry_failed())
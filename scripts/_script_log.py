@@ -0,0 +1,254 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Shared logging for the ingest, watcher, plot, audit and trigger scripts.
+
+Scripts used to open LOG_PATH, append one line and close it for every
+message. Now each process logs through a QueueHandler; a QueueListener
+thread drains the queue and writes whatever has accumulated in one append,
+so callers never wait on the file. Lines are JSON objects:
+
+    {"ts": "2026-01-01T00:00:00.000+00:00", "level": "INFO", "script": "psws_addOBS",
+     "pid": 1234, "msg": "...", "station": "N000015", "instrument": "12",
+     "trigger": "/home/N000015/cOBS...", "job_id": 7}
+
+station, instrument, trigger and job_id appear when bound to the logger
+(get_logger(..., station=...), logger.bind(...)) or passed in extra=.
+
+Several processes (watcher, plot workers, cron jobs) share one file. Each
+batch is written with O_APPEND under an flock on <file>.lock, and size-based
+rotation (LOG_MAX_BYTES, LOG_BACKUP_COUNT) happens under the same lock, so
+lines are never interleaved or lost across a rotation.
+
+Usage:
+    from _script_log import get_logger
+    log = get_logger("psws_addOBS")
+    log.info("Observation added")
+    log.bind(station="N000015", trigger=path).error("Station not found")
+"""
+from __future__ import annotations
+
+import atexit
+import copy
+import fcntl
+import json
+import logging
+import logging.handlers
+import multiprocessing.util
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+CONTEXT_FIELDS = ("station", "instrument", "trigger", "job_id")
+# records written per append at most, when the queue is busy
+BATCH_RECORDS = 500
+
+_setup_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+
+
+def default_log_path() -> str:
+    return os.getenv("LOG_PATH", "/var/log/psws/scripts.log")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the context fields that are set."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "script": record.name.split(".", 1)[-1],
+            "pid": record.process,
+            "msg": record.getMessage(),
+        }
+        for key in CONTEXT_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class JsonQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps a traceback out of the message, for the "exc" field."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class SharedRotatingFileHandler(logging.Handler):
+    """
+    Appends formatted records to a file shared between processes. Records
+    are buffered until flush() (called by the listener when the queue runs
+    empty, or every BATCH_RECORDS records) and then written in one
+    O_APPEND write under an flock, rotating first if the file would grow
+    past max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 0, backup_count: int = 0) -> None:
+        super().__init__()
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._pending: list[str] = []
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock_file = open(self.path + ".lock", "a")
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._pending.append(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._pending) >= BATCH_RECORDS:
+            self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            if not self._pending:
+                return
+            data = "".join(self._pending).encode("utf-8")
+            self._pending = []
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                if self.max_bytes > 0 and self.backup_count > 0:
+                    try:
+                        size = os.path.getsize(self.path)
+                    except FileNotFoundError:
+                        size = 0
+                    if size and size + len(data) > self.max_bytes:
+                        self._rotate()
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    view = memoryview(data)
+                    while view:
+                        view = view[os.write(fd, view):]
+                finally:
+                    os.close(fd)
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _rotate(self) -> None:
+        # path.(n-1) -> path.n, ..., path -> path.1; the caller holds the flock
+        for n in range(self.backup_count - 1, 0, -1):
+            source = "%s.%d" % (self.path, n)
+            if os.path.exists(source):
+                os.replace(source, "%s.%d" % (self.path, n + 1))
+        os.replace(self.path, self.path + ".1")
+
+    def close(self) -> None:
+        self.flush()
+        self._lock_file.close()
+        super().close()
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """QueueListener that has its handlers flush once the queue is drained."""
+
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+
+class ContextLogger(logging.LoggerAdapter):
+    """Logger carrying station/instrument/trigger/job_id context for its records."""
+
+    def process(self, msg, kwargs):
+        kwargs["extra"] = {**self.extra, **kwargs.get("extra", {})}
+        return msg, kwargs
+
+    def bind(self, **context) -> "ContextLogger":
+        return ContextLogger(self.logger, {**self.extra, **context})
+
+
+def setup(path: str | None = None) -> None:
+    """
+    Start this process's queue listener writing to path (default LOG_PATH).
+    Called by get_logger(); a second call is a no-op.
+    """
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is not None:
+            return
+        handler = SharedRotatingFileHandler(
+            path or default_log_path(),
+            max_bytes=int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024))),
+            backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")))
+        handler.setFormatter(JsonFormatter())
+        log_queue = queue.SimpleQueue()
+        _queue_handler = JsonQueueHandler(log_queue)
+        root = logging.getLogger("psws")
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        root.propagate = False
+        root.addHandler(_queue_handler)
+        _listener = BatchingQueueListener(log_queue, handler)
+        _listener.start()
+        atexit.register(shutdown)
+        # a fork-started multiprocessing child leaves through os._exit, which
+        # skips atexit; its exit runs the multiprocessing finalizers instead
+        # (the lowest priority runs last, after the pool's own clean-up)
+        multiprocessing.util.Finalize(None, shutdown, exitpriority=-100)
+
+
+def shutdown() -> None:
+    """Write out everything still queued and stop the listener."""
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        logging.getLogger("psws").removeHandler(_queue_handler)
+        _listener = _queue_handler = None
+
+
+def _after_fork() -> None:
+    # the listener thread does not exist in a forked child (plot workers,
+    # backfill pools); drop the inherited state so the child starts its own
+    global _setup_lock, _listener, _queue_handler
+    _setup_lock = threading.Lock()
+    if _queue_handler is not None:
+        logging.getLogger("psws").removeHandler(_queue_handler)
+    _listener = _queue_handler = None
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+class _SetupFilter(logging.Filter):
+    """Starts the listener on the first record of a forked child."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if _listener is None:
+            setup()
+        return True
+
+
+def get_logger(script: str, **context) -> ContextLogger:
+    """Logger for a script (e.g. "psws_addOBS"), optionally bound to context fields."""
+    setup()
+    logger = logging.getLogger("psws." + script)
+    if not any(isinstance(f, _SetupFilter) for f in logger.filters):
+        logger.addFilter(_SetupFilter())
+    return ContextLogger(logger, context)
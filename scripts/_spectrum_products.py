@@ -0,0 +1,134 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Compact day products for Grape DRF observations, written by the spectrum
+plotter next to the PNG so that other views (zooms, time windows, station
+comparisons) can be drawn from kilobytes instead of the raw hourly HDF5 set.
+
+One compressed .npz per observation day and subchannel, laid out as
+
+    SPECTRUM_PRODUCTS_PATH/<station>/<instrument>/<YYYY-MM-DD>/
+        <station>_<instrument>_<YYYY-MM-DD>_<freq MHz>_s<subchannel>.npz
+
+holding
+- minute_peak:      per-minute peak amplitude (as in the amplitude plot)
+- spectrogram_db:   spectrogram power in dB, uint8 coded (0 = no data,
+                    1..255 linear between db_min and db_max)
+- freq_hz:          Doppler frequency of each spectrogram row
+- segment_minute:   minute of day of each spectrogram column
+- doppler_hz, doppler_db: frequency and power of the strongest bin per column
+"""
+from __future__ import annotations
+
+import glob
+import os
+
+import numpy as np
+
+DYNAMIC_RANGE_DB = 120.0
+
+
+def default_products_path() -> str:
+    return os.getenv("SPECTRUM_PRODUCTS_PATH", "/psws/psws/media/products")
+
+
+def product_path(station: str, instrument, date: str, frequency, subchannel: int,
+                 root: str | None = None) -> str:
+    name = "%s_%s_%s_%s_s%d.npz" % (station, instrument, date,
+                                    _frequency_label(frequency), subchannel)
+    return os.path.join(root or default_products_path(), station, str(instrument),
+                        date, name)
+
+
+def _frequency_label(frequency) -> str:
+    return ("%.6f" % float(frequency)).rstrip("0").rstrip(".")
+
+
+def quantize_db(power: np.ndarray) -> tuple[np.ndarray, float, float]:
+    """uint8 code of 10*log10(power); 0 marks bins without signal."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        db = 10.0 * np.log10(power)
+    finite = np.isfinite(db)
+    if not finite.any():
+        return np.zeros(db.shape, dtype=np.uint8), 0.0, 0.0
+    db_max = float(db[finite].max())
+    db_min = max(float(db[finite].min()), db_max - DYNAMIC_RANGE_DB)
+    scale = 254.0 / (db_max - db_min) if db_max > db_min else 0.0
+    codes = np.zeros(db.shape, dtype=np.uint8)
+    codes[finite] = 1 + np.round((np.clip(db[finite], db_min, db_max) - db_min)
+                                 * scale).astype(np.uint8)
+    return codes, db_min, db_max
+
+
+def dequantize_db(codes: np.ndarray, db_min: float, db_max: float) -> np.ndarray:
+    """float32 dB from uint8 codes; bins without signal come back as NaN."""
+    step = (db_max - db_min) / 254.0
+    db = db_min + (codes.astype(np.float32) - 1) * step
+    db[codes == 0] = np.nan
+    return db
+
+
+def doppler_track(power: np.ndarray, freq_hz: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Frequency and dB power of the strongest bin in every column (NaN in gaps)."""
+    peak_bin = np.argmax(power, axis=0)
+    peak_power = power[peak_bin, np.arange(power.shape[1])]
+    has_signal = peak_power > 0
+    doppler_hz = np.where(has_signal, freq_hz[peak_bin], np.nan).astype(np.float32)
+    with np.errstate(divide="ignore"):
+        doppler_db = np.where(has_signal, 10.0 * np.log10(peak_power), np.nan)
+    return doppler_hz, doppler_db.astype(np.float32)
+
+
+def write_spectrum_product(station: str, instrument, date: str, frequency,
+                           subchannel: int, minute_peak: np.ndarray,
+                           power: np.ndarray, freq_hz: np.ndarray,
+                           segment_minute: np.ndarray,
+                           root: str | None = None) -> str:
+    """Write the day product for one subchannel; returns its path."""
+    path = product_path(station, instrument, date, frequency, subchannel, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    codes, db_min, db_max = quantize_db(power)
+    doppler_hz, doppler_db = doppler_track(power, freq_hz)
+
+    tmp = path[:-4] + ".tmp.npz"
+    np.savez_compressed(
+        tmp,
+        station=station, instrument=str(instrument), date=date,
+        frequency_mhz=float(frequency), subchannel=subchannel,
+        minute_peak=np.asarray(minute_peak, dtype=np.float32),
+        spectrogram_db=codes, db_min=db_min, db_max=db_max,
+        freq_hz=np.asarray(freq_hz, dtype=np.float32),
+        segment_minute=np.asarray(segment_minute, dtype=np.float32),
+        doppler_hz=doppler_hz, doppler_db=doppler_db)
+    os.replace(tmp, path)
+    return path
+
+
+def load_spectrum_product(path: str) -> dict:
+    """The product as a dict, with 'spectrogram_db' decoded to float32 dB."""
+    with np.load(path) as data:
+        product = {key: data[key] for key in data.files}
+    for key in ("station", "instrument", "date"):
+        product[key] = str(product[key])
+    for key in ("frequency_mhz", "db_min", "db_max"):
+        product[key] = float(product[key])
+    product["subchannel"] = int(product["subchannel"])
+    product["spectrogram_db"] = dequantize_db(product["spectrogram_db"],
+                                              product["db_min"], product["db_max"])
+    return product
+
+
+def find_products(station: str = "*", instrument="*", date: str = "*",
+                  frequency=None, root: str | None = None) -> list[str]:
+    """Product files matching the given station / instrument / date / frequency."""
+    freq = "*" if frequency is None else _frequency_label(frequency)
+    pattern = os.path.join(root or default_products_path(), station, str(instrument),
+                           date, "%s_%s_%s_%s_s*.npz" % (station, instrument, date, freq))
+    return sorted(glob.glob(pattern))
@@ -8,27 +8,33 @@
 # ----------------------------------------------------------------------------
 
 
+import argparse
+import json
 import os
 import glob
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime as dt
 from datetime import timezone
-from sys import argv
+
+import sys
+from pathlib import Path
 
 import pymysql
 import pymysql.cursors
+from dotenv import load_dotenv
 
+SCRIPTS_ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SCRIPTS_ROOT_DIR))
+# SIZE_INDEX_DIR, AUDIT_WORKERS, LOG_* as the ingest scripts see them
+load_dotenv(SCRIPTS_ROOT_DIR / "scripts.env")
+from _script_log import get_logger, setup
+from _dir_size_index import read_size
 
-def log(path, message):
-    """
-    The function `log` appends a message to a file specified by the `path` parameter.
-    
-    :param path: The `path` parameter in the `log` function is the file path where you want to write the log message. It should be a string representing the file location on your system where you want to store the log information
-    :param message: The `message` parameter in the `log` function is the text that you want to write to the log file specified by the `path` parameter
-    """
-    
-    f = open(path, "a")
-    f.write(message + "\n")
-    f.close()
 
 def load_db(dbhost, dbuser, dbpasswd, dbname):
     """
@@ -60,103 +66,641 @@ def fetch_STATIONsubdirs(path):
             subdirs.append(subdir_path)
     return subdirs
 
-def fetch_trigger_files(station):
+def station_paths(station):
     """
-    The function fetches trigger files from a specified directory based on a specific condition.
-    
-    :param path: The `path` parameter in the `fetch_trigger_files` function is the directory path where you want to search for trigger files. This function will scan the specified directory and return a list of trigger files whose names start with the letter 'c'
-    :return: The function `fetch_trigger_files` returns a list of file names that start with the letter "c" in the specified directory path.
+    The directories a station uploads into: its home directory and, for stations
+    using the chrooted sftp setup, the jailed home directory.
+
+    :param station: Station directory name as found under /home (e.g. "N000015")
+    :return: List of the two candidate directory paths, home directory first.
+    """
+
+    return ["/home/" + station, "/home/stations/" + station + "/home/" + station]
+
+
+CHECKPOINT_VERSION = 2
+
+
+@dataclass
+class StationScan:
+    """What one station's upload directories hold, from a single listing of each."""
+    station: str
+    station_pk: int | None
+    triggers: dict = field(default_factory=dict)   # trigger name -> path
+    obs: dict = field(default_factory=dict)        # OBS file or directory name -> path
+
+
+def scan_station(dir):
     """
+    The function `scan_station` lists a station's upload directories once and sorts
+    the entries into trigger files (names starting with 'c') and observation data
+    (names starting with 'O').
 
-    trigger_files= []
-    for tf in os.scandir("/home/" + station):
-        # The line `if(tf.name[0] in {"c"}):` is checking if the first character of the file name (`tf.name`) is equal to the letter 'c'.
-        if(tf.name[0] in {"c"}):
-            trigger_files.append(tf.name)
+    :param dir: Station directory path as returned by `fetch_STATIONsubdirs`
+    :return: A `StationScan` for the station. A missing jailed directory is ignored.
+    """
+
+    # Station Directory as reflected in the Server Directory Structure
+    station = dir[-7:]
+    # Station ID, as reflected in the Database (numeric part of the directory name)
+    station_id = dir[-6:]
+    scan = StationScan(station, int(station_id) if station_id.isdigit() else None)
+    for path in station_paths(station):
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name[0] == "c":
+                        scan.triggers.setdefault(entry.name, entry.path)
+                    elif entry.name[0] == "O":
+                        scan.obs.setdefault(entry.name, entry.path)
+        except FileNotFoundError:
+            pass
+    return scan
+
+
+def station_mtimes(dir):
+    """
+    Modification times of a station's upload directories. A directory's mtime
+    changes whenever an entry is created, removed or renamed in it.
+
+    :param dir: Station directory path as returned by `fetch_STATIONsubdirs`
+    :return: Dictionary of existing directory path -> st_mtime_ns.
+    """
+
+    mtimes = {}
+    for path in station_paths(dir[-7:]):
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            pass
+    return mtimes
+
+
+def scan_stations(station_dirs, workers):
+    """
+    Scans every station directory on a bounded thread pool (the work is directory
+    listing, so threads overlap the filesystem waits).
+
+    :param station_dirs: Station directory paths as returned by `fetch_STATIONsubdirs`
+    :param workers: Maximum number of concurrent directory scans
+    :return: List of `StationScan`, in the order of `station_dirs`.
+    """
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(scan_station, station_dirs))
+
+
+def fetch_db_index(db, station_pks=None):
+    """
+    Loads observation file names in bulk: all of them in one query, or those of
+    the given stations in one query per 1000 stations.
+
+    :param db: Database connection from `load_db`
+    :param station_pks: Station primary keys to load, or None for every station
+    :return: Dictionary of station primary key -> set of observation file names.
+    """
+
+    index = {}
+    query = "SELECT station_id, fileName FROM observations_observation WHERE station_id IS NOT NULL"
+    if station_pks is None:
+        batches = [()]
+    else:
+        station_pks = sorted(station_pks)
+        batches = [tuple(station_pks[i:i + 1000]) for i in range(0, len(station_pks), 1000)]
+    for batch in batches:
+        cursor = db.cursor(pymysql.cursors.SSCursor)
+        try:
+            if batch:
+                cursor.execute(query + " AND station_id IN (" + ", ".join(["%s"] * len(batch)) + ")", batch)
+            else:
+                cursor.execute(query)
+            for station_pk, file_name in cursor:
+                index.setdefault(station_pk, set()).add(file_name)
+        finally:
+            cursor.close()
+    return index
+
+
+def fetch_db_counts(db):
+    """
+    Row count and highest observation id of every station, in one grouped query.
+    A station whose pair differs from the last audit gained or lost observations.
+
+    :param db: Database connection from `load_db`
+    :return: Dictionary of station primary key -> [row count, highest observation id].
+    """
+
+    cursor = db.cursor(pymysql.cursors.SSCursor)
     try:
-        for tf in os.scandir("/home/stations/" + station + "/home/" + station):
-            # The line `if(tf.name[0] in {"c"}):` is checking if the first character of the file name (`tf.name`) is equal to the letter 'c'.
-            if(tf.name[0] in {"c"}):
-                trigger_files.append(tf.name)
-    except FileNotFoundError:
-        pass
-    return trigger_files
-
-def fetch_obs_files(station):
-    """
-    The `fetch_obs_files` function retrieves files starting with the letter 'O' from a specified
-    directory path.
-    
-    :param path: The `fetch_obs_files` function you provided is designed to fetch observation files from
-    a specified directory path. It filters out files whose names start with the letter 'O' and returns a
-    list of these observation files
-    :return: The `fetch_obs_files` function returns a list of file names that start with the letter 'O'
-    from the specified directory path.
+        cursor.execute("SELECT station_id, COUNT(*), MAX(id) FROM observations_observation "
+                       "WHERE station_id IS NOT NULL GROUP BY station_id")
+        return {station_pk: [int(count), int(max_id)] for station_pk, count, max_id in cursor}
+    finally:
+        cursor.close()
+
+
+def station_name_batches(station_names, limit=1000):
     """
-    
-        
-    obs_files= []
-    for obs in os.scandir("/home/" + station):
-        # The line `if(obs.name[0] in {"O"}):` in the `fetch_obs_files` function is checking if the first character of the file name (`obs.name`) is equal to the letter 'O'. This condition is used to filter out files that start with the letter 'O' in the specified directory path. If the first character of the file name is 'O', the file name is added to the list of observation files (`obs_files`) that will be returned by the function.
-        if(obs.name[0] in {"O"}):
-            obs_files.append(obs.name)
+    Groups a name lookup into batches of whole stations holding at most `limit`
+    names (a single larger station is a batch of its own), for queries filtered
+    on both station_id and fileName.
+
+    :param station_names: Dictionary of station primary key -> set of file names
+    :return: List of (tuple of station primary keys, tuple of file names).
+    """
+
+    batches, pks, names = [], [], set()
+    for station_pk in sorted(station_names):
+        if pks and len(names) + len(station_names[station_pk]) > limit:
+            batches.append((tuple(pks), tuple(sorted(names))))
+            pks, names = [], set()
+        pks.append(station_pk)
+        names |= station_names[station_pk]
+    if pks:
+        batches.append((tuple(pks), tuple(sorted(names))))
+    return batches
+
+
+def fetch_db_names(db, station_names):
+    """
+    Looks up specific observation file names of specific stations, in one query
+    per batch of stations (see `station_name_batches`). OBS names are timestamps
+    shared by many stations, so the query filters on both.
+
+    :param db: Database connection from `load_db`
+    :param station_names: Dictionary of station primary key -> set of file names to look up
+    :return: Dictionary of station primary key -> set of those names that are in the database.
+    """
+
+    found = {}
+    for pks, names in station_name_batches(station_names):
+        cursor = db.cursor(pymysql.cursors.SSCursor)
+        try:
+            cursor.execute("SELECT station_id, fileName FROM observations_observation WHERE station_id IN ("
+                           + ", ".join(["%s"] * len(pks)) + ") AND fileName IN ("
+                           + ", ".join(["%s"] * len(names)) + ")", pks + names)
+            for station_pk, file_name in cursor:
+                if file_name in station_names[station_pk]:
+                    found.setdefault(station_pk, set()).add(file_name)
+        finally:
+            cursor.close()
+    return found
+
+
+def fetch_db_sizes(db, station_names):
+    """
+    Recorded sizes of specific observations of specific stations, batched like
+    `fetch_db_names`.
+
+    :return: Dictionary of station primary key -> {file name: size}.
+    """
+
+    sizes = {}
+    for pks, names in station_name_batches(station_names):
+        cursor = db.cursor(pymysql.cursors.SSCursor)
+        try:
+            cursor.execute("SELECT station_id, fileName, size FROM observations_observation WHERE station_id IN ("
+                           + ", ".join(["%s"] * len(pks)) + ") AND fileName IN ("
+                           + ", ".join(["%s"] * len(names)) + ")", pks + names)
+            for station_pk, file_name, size in cursor:
+                if file_name in station_names[station_pk]:
+                    sizes.setdefault(station_pk, {})[file_name] = size
+        finally:
+            cursor.close()
+    return sizes
+
+
+def load_checkpoint(path):
+    """
+    Reads the state saved by the previous audit run, per station directory: its
+    directory mtimes, its observation row count and highest id, the names
+    already found both on disk and in the database, and the outstanding names
+    (see `outstanding_names`).
+
+    :return: The checkpoint dictionary, or an empty one if there is none (or it is unreadable).
+    """
+
     try:
-        for obs in os.scandir("/home/stations/" + station + "/home/" + station):
-            # The line `if(obs.name[0] in {"O"}):` in the `fetch_obs_files` function is checking if the first character of the file name (`obs.name`) is equal to the letter 'O'. This condition is used to filter out files that start with the letter 'O' in the specified directory path. If the first character of the file name is 'O', the file name is added to the list of observation files (`obs_files`) that will be returned by the function.
-            if(obs.name[0] in {"O"}):
-                obs_files.append(obs.name)
-    except(FileNotFoundError):
-        pass
-    
-    return obs_files
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != CHECKPOINT_VERSION:
+        return {}
+    return data
+
+
+def save_checkpoint(path, data):
+    """Writes the checkpoint atomically, so an interrupted run leaves the previous one intact."""
 
-def fetch_db_data(db, station_id):
+    data["version"] = CHECKPOINT_VERSION
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def trigger_audit(scans, db_index, reconciled=None):
     """
-    This function fetches file names from the observations_observation table in a database based on a given station_id.
-    
-    :param db: The `db` parameter is typically a connection object to a database. In this case, it seems to be a connection to a MySQL database. The function `fetch_db_data` takes this database connection object and a `station_id` as input parameters. It then executes a SQL query to fetch the
-    :param station_id: The `station_id` parameter is used to specify the ID of the station for which you want to fetch data from the database. This ID is typically a unique identifier assigned to each station in the database
-    :return: The function `fetch_db_data` returns a list of dictionaries containing the file names of observations associated with the specified `station_id` from the database.
+    Trigger File Audit: splits every trigger file into those whose observation
+    (characters 1-19 of the trigger name) is in the database and those whose is not.
+    Triggers reconciled by an earlier run are not listed as in db again; a trigger
+    whose observation has since been deleted is reported as not in db.
+
+    :return: Tuple of (paths of triggers in db, paths of triggers not in db).
     """
 
-    cursor= db.cursor(pymysql.cursors.DictCursor)
-    cursor.execute("SELECT fileName FROM observations_observation WHERE station_id='" + station_id + "'")
-    result= cursor.fetchall()
-    return result
+    in_db, not_in_db = [], []
+    for scan in scans:
+        names = db_index.get(scan.station_pk, set())
+        found = {tf for tf in scan.triggers if tf[1:20] in names}
+        in_db.extend(scan.triggers[tf] for tf in sorted(found - (reconciled or {}).get(scan.station, set())))
+        not_in_db.extend(scan.triggers[tf] for tf in sorted(set(scan.triggers) - found))
+    return in_db, not_in_db
+
 
-def obs_exists(db, obs, station_id):
+def obs_file_audit(scans, db_index):
     """
-    The function checks if a specific observation file exists for a given station ID in a database.
-    
-    :param db: The `db` parameter is typically a connection to a database that allows you to interact with it using SQL queries. It is used to execute SQL commands and retrieve data from the database
-    :param obs: The `obs` parameter in the `obs_exists` function represents the file name of the observation file you are checking for existence in the database. It is used in the SQL query to search for a specific observation file in the `observations_observation` table based on the `fileName` column
-    :param station_id: The `obs_exists` function takes three parameters: `db`, `obs`, and `station_id`. The `station_id` parameter is used to filter the observations based on the station ID when querying the database table `observations_observation`
-    :return: the result of the SQL query executed on the database. The result will indicate whether there are any observations with the given file name (`obs`) associated with the specified `station_id` in the `observations_observation` table.
+    OBS File Audit: observation data on disk with no observation in the database.
+
+    :return: List of paths.
     """
-    
-    cursor= db.cursor()
-    result= cursor.execute("SELECT * FROM observations_observation WHERE station_id='" + station_id + "' AND fileName='" + obs +"'")
-    return result
-
-def fetch_path(station, file):
-    STATION_PATH= "/home/" + station + "/"
-    STATION_JAILED_PATH= "/home/stations/" + station + "/home/" + station + "/"
-    paths= { STATION_PATH, STATION_JAILED_PATH}
-    
+
+    missing = []
+    for scan in scans:
+        names = db_index.get(scan.station_pk, set())
+        missing.extend(scan.obs[ob] for ob in sorted(set(scan.obs) - names))
+    return missing
+
+
+def obs_size_audit(scans, db_index, db, workers):
+    """
+    OBS Size Audit: observations in the database whose directory has a size
+    index (kept by psws_addOBS, see _dir_size_index.py) recording a different
+    size than the database. The indexes are only read, never refreshed, so the
+    data is not touched.
+
+    :param workers: Maximum number of index files read concurrently
+    :return: List of log lines naming the path and both sizes.
+    """
+
+    candidates = [(scan, ob) for scan in scans
+                  for ob in sorted(set(scan.obs) & db_index.get(scan.station_pk, set()))]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        indexed = list(pool.map(lambda candidate: read_size(candidate[0].obs[candidate[1]]), candidates))
+    station_names = {}
+    for (scan, ob), size in zip(candidates, indexed):
+        if size is not None:
+            station_names.setdefault(scan.station_pk, set()).add(ob)
+    db_sizes = fetch_db_sizes(db, station_names)
+
+    mismatched = []
+    for (scan, ob), size in zip(candidates, indexed):
+        db_size = db_sizes.get(scan.station_pk, {}).get(ob)
+        if size is not None and db_size is not None and int(db_size) != size:
+            mismatched.append(scan.obs[ob] + "\tdb size: " + str(db_size) + "\tindexed size: " + str(size))
+    return mismatched
+
+
+def obs_data_audit(scans, db_index):
+    """
+    OBS Data Audit: observations in the database (other than zip uploads) whose
+    data is not on disk.
+
+    :return: List of log lines naming the station and observation.
+    """
+
+    missing = []
+    for scan in scans:
+        names = {name for name in db_index.get(scan.station_pk, set()) if name[-4:] != ".zip"}
+        missing.extend("Station: " + scan.station + "\tObservation: " + ob_name
+                       for ob_name in sorted(names - set(scan.obs)))
+    return missing
+
+
+def reconciled_names(scan, db_index):
+    """Trigger and OBS names of a station that are both on disk and in the database."""
+
+    names = db_index.get(scan.station_pk, set())
+    return ({tf for tf in scan.triggers if tf[1:20] in names} |
+            {ob for ob in scan.obs if ob in names})
+
+
+def outstanding_names(scan, db_index):
+    """
+    What a station's audits reported: triggers and OBS data not in the database
+    (name -> path) and observations without data on disk. Kept in the checkpoint
+    so a station that is not rescanned is still re-checked and reported.
+    """
+
+    names = db_index.get(scan.station_pk, set())
+    return {"triggers": {tf: path for tf, path in scan.triggers.items() if tf[1:20] not in names},
+            "obs": {ob: path for ob, path in scan.obs.items() if ob not in names},
+            "nodata": sorted(name for name in names if name[-4:] != ".zip" and name not in scan.obs)}
+
+
+def outstanding_lookup(outstanding):
+    """The observation file names to look up to re-check a station's outstanding names."""
+
+    return ({tf[1:20] for tf in outstanding.get("triggers", {})} |
+            set(outstanding.get("obs", {})) | set(outstanding.get("nodata", [])))
+
+
+def recheck_outstanding(outstanding, names):
+    """
+    Re-checks an unchanged station's outstanding names against what
+    `fetch_db_names` found of `outstanding_lookup` in the database.
+
+    :return: Tuple of (names still outstanding, paths of triggers now in db, names now reconciled).
+    """
+
+    triggers = outstanding.get("triggers", {})
+    obs = outstanding.get("obs", {})
+    found = {tf for tf in triggers if tf[1:20] in names} | {ob for ob in obs if ob in names}
+    still = {"triggers": {tf: path for tf, path in triggers.items() if tf not in found},
+             "obs": {ob: path for ob, path in obs.items() if ob not in found},
+             "nodata": [name for name in outstanding.get("nodata", []) if name in names]}
+    return still, [triggers[tf] for tf in sorted(found) if tf in triggers], found
+
+
+#############################################
+#           Magnetometer audits             #
+#############################################
+
+# Magnetometer uploads as psws_addMAG registers them: OBS<date>... files in magData/
+MAG_EXTENSIONS = (".zip", ".csv", ".json")
+
+
+@dataclass
+class MagScan:
+    """A station's magData files, from one listing of each magData directory."""
+    station: str
+    station_pk: int | None
+    files: dict = field(default_factory=dict)      # file name -> (path, size on disk)
+
+
+def scan_mag_station(dir):
+    """
+    The function `scan_mag_station` lists the magData directories of a station and
+    records the size of every magnetometer file in them.
+
+    :param dir: Station directory path as returned by `fetch_STATIONsubdirs`
+    :return: A `MagScan` for the station. Missing magData directories are ignored.
+    """
+
+    station = dir[-7:]
+    station_id = dir[-6:]
+    scan = MagScan(station, int(station_id) if station_id.isdigit() else None)
+    for path in station_paths(station):
+        try:
+            with os.scandir(path + "/magData") as entries:
+                for entry in entries:
+                    if entry.name[:3] != "OBS" or not entry.name.endswith(MAG_EXTENSIONS):
+                        continue
+                    try:
+                        size = entry.stat().st_size
+                    except OSError:
+                        continue
+                    scan.files.setdefault(entry.name, (entry.path, size))
+        except FileNotFoundError:
+            pass
+    return scan
+
+
+def fetch_mag_index(db):
+    """
+    Loads every magnetometer observation in one query: those with the
+    'magnetometer' data type or recorded against a Magnetometer instrument, as
+    psws_addMAG does not always manage to link the data type (the same union as
+    backfill_mag_products).
+
+    :param db: Database connection from `load_db`
+    :return: Dictionary of station primary key -> {file name: (observation id, size, instrument id)}.
+    """
+
+    index = {}
+    cursor = db.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute("SELECT DISTINCT o.station_id, o.fileName, o.id, o.size, o.instrument_id "
+                       "FROM observations_observation o "
+                       "LEFT JOIN observations_observation_dataType od ON od.observation_id = o.id "
+                       "LEFT JOIN datatypes_datatype d ON d.id = od.datatype_id AND d.dataType = %s "
+                       "LEFT JOIN instruments_instrument i ON i.id = o.instrument_id "
+                       "LEFT JOIN instrumenttypes_instrumenttype t ON t.id = i.instrumenttype_id "
+                       "WHERE o.station_id IS NOT NULL AND (d.id IS NOT NULL OR t.instrumentType = %s)",
+                       ("magnetometer", "Magnetometer"))
+        for station_pk, file_name, obs_id, size, instrument_id in cursor:
+            index.setdefault(station_pk, {})[file_name] = (obs_id, size, instrument_id)
+    finally:
+        cursor.close()
+    return index
+
+
+def fetch_mag_instruments(db):
+    """
+    The magnetometer instrument of each station (the newest one where a station
+    has several), for remediation lines of magData directories with no
+    magnetometer observation yet.
+
+    :return: Dictionary of station primary key -> instrument id.
+    """
+
+    cursor = db.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute("SELECT i.station_id, MAX(i.id) FROM instruments_instrument i "
+                       "JOIN instrumenttypes_instrumenttype t ON t.id = i.instrumenttype_id "
+                       "WHERE t.instrumentType = %s GROUP BY i.station_id", ("Magnetometer",))
+        return {station_pk: instrument_id for station_pk, instrument_id in cursor}
+    finally:
+        cursor.close()
+
+
+def mag_file_audit(scans, mag_index):
+    """
+    MagData File Audit: magnetometer files on disk with no magnetometer observation,
+    and files whose recorded size is smaller than the file on disk (today's file
+    keeps growing after it is first ingested).
+
+    :return: Tuple of (paths not in db, size mismatch lines, paths of the files concerned).
+    """
+
+    missing, mismatched, to_ingest = [], [], []
+    for scan in scans:
+        recorded = mag_index.get(scan.station_pk, {})
+        for name in sorted(set(scan.files) - set(recorded)):
+            missing.append(scan.files[name][0])
+        for name in sorted(set(scan.files) & set(recorded)):
+            path, size = scan.files[name]
+            obs_id, db_size, _ = recorded[name]
+            if db_size < size:
+                mismatched.append(path + "\tObservation: " + str(obs_id) +
+                                  "\tdb size: " + str(db_size) + "\tdisk size: " + str(size))
+                to_ingest.append(path)
+    return missing, mismatched, missing + to_ingest
+
+
+def mag_data_audit(scans, mag_index):
+    """
+    Magdata Audit: magnetometer observations in the database whose file is not in
+    the station's magData directories.
+
+    :return: List of log lines naming the station and observation.
+    """
+
+    missing = []
+    for scan in scans:
+        names = set(mag_index.get(scan.station_pk, {}))
+        missing.extend("Station: " + scan.station + "\tObservation: " + name
+                       for name in sorted(names - set(scan.files)))
+    return missing
+
+
+def mag_remediation(scans, paths, mag_index, instruments, timestamp):
+    """
+    Remediation list for the MagData File Audit: psws_addMAG argument lines
+    (magData directory, station, instrument, trigger time stamp) for the magData
+    directories holding a missing or outdated file, e.g.
+
+        xargs -L1 python3 scripts/ingest/psws_addMAG.py < mag_remediation_<date>.log
+
+    psws_addMAG ingests every file of the directory and finds existing rows by
+    file name, station and instrument, so each line must name the instrument the
+    directory's rows already have: an outdated file gives a line for the
+    instrument of its row, a missing file one for the instrument most of the
+    directory's rows have, and only a directory without any row uses the
+    station's magnetometer instrument.
+
+    :param paths: Paths of files to (re)ingest, from `mag_file_audit`
+    :param mag_index: Magnetometer observations, from `fetch_mag_index`
+    :param instruments: Station primary key -> magnetometer instrument id
+    :param timestamp: Trigger time stamp, YYYY-MM-DDTHH:MM
+    :return: Tuple of (argument lines, stations skipped for lack of an instrument).
+    """
+
+    station_of = {scan.files[name][0]: scan for scan in scans for name in scan.files}
+    lines, skipped = {}, set()
     for path in paths:
-        if(os.path.isdir(path + file)):
-            return path + file
-    return None
+        scan = station_of[path]
+        mag_dir = os.path.dirname(path)
+        recorded = mag_index.get(scan.station_pk, {})
+        if os.path.basename(path) in recorded:
+            instrument_id = recorded[os.path.basename(path)][2]
+        else:
+            in_use = Counter(recorded[name][2] for name, (file_path, _) in scan.files.items()
+                             if name in recorded and recorded[name][2] is not None
+                             and os.path.dirname(file_path) == mag_dir)
+            instrument_id = in_use.most_common(1)[0][0] if in_use else instruments.get(scan.station_pk)
+        if instrument_id is None:
+            skipped.add(scan.station)
+            continue
+        lines.setdefault((mag_dir, instrument_id),
+                         " ".join([mag_dir, scan.station, str(instrument_id), timestamp]))
+    return [lines[key] for key in sorted(lines)], sorted(skipped)
+
+
+def run_mag_audits(audit, station_dirs, workers, db, reports, timestamp, timer, say=print):
+    """
+    Runs the magnetometer audits selected by the flag (-m, -z or both for -a).
+    magData files are few per station and today's grows in place, so these are
+    not incremental: every magData directory is listed and its files stat'ed,
+    in parallel, against one query for all magnetometer observations.
+    """
+
+    with timer.phase("scan magData"):
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            scans = list(pool.map(scan_mag_station, station_dirs))
+    say("Scanned magData of " + str(len(scans)) + " station directories")
+
+    with timer.phase("load magnetometer db"):
+        mag_index = fetch_mag_index(db)
+        instruments = fetch_mag_instruments(db)
+
+    if(audit in {"a", "m"}):
+        say("\nStarting MagData File Audit...")
+        with timer.phase("magdata file audit"):
+            missing, mismatched, to_ingest = mag_file_audit(scans, mag_index)
+            write_report(reports["missing"], missing)
+            write_report(reports["size"], mismatched)
+            remediation, skipped = mag_remediation(scans, to_ingest, mag_index, instruments, timestamp)
+            write_report(reports["remediation"], remediation)
+        say("Complete: " + str(len(missing)) + " not in db, " + str(len(mismatched)) +
+              " size mismatches, " + str(len(remediation)) + " magData directories to ingest")
+        if skipped:
+            say("No magnetometer instrument (or rows without one) for: " + ", ".join(skipped))
+
+    if(audit in {"a", "z"}):
+        say("\nStarting Magdata Audit...")
+        with timer.phase("magdata audit"):
+            count = write_report(reports["nodata"], mag_data_audit(scans, mag_index))
+        say("Complete: " + str(count) + " without data")
+
+
+def write_report(path, lines):
+    """
+    Appends all lines of one report to its log file with a single open.
+
+    :param path: Log file path
+    :param lines: Iterable of lines, without newlines
+    """
+
+    lines = list(lines)
+    if lines:
+        with open(path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+    return len(lines)
+
+
+class PhaseTimer:
+    """Collects wall-clock time per audit phase for the summary printed at the end."""
+
+    def __init__(self):
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def summary(self, log=None):
+        if log is not None:
+            log.info("Timing: " + ", ".join("%s %.2fs" % phase for phase in self.phases))
+        print("\nTiming Summary:")
+        for name, seconds in self.phases:
+            print("  %-24s %8.2fs" % (name, seconds))
+        print("  %-24s %8.2fs" % ("total", sum(seconds for _, seconds in self.phases)))
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="Audit station uploads against the PSWS database")
+    audits = parser.add_mutually_exclusive_group(required=True)
+    audits.add_argument("-a", dest="audit", action="store_const", const="a", help="Run All Audits")
+    audits.add_argument("-t", dest="audit", action="store_const", const="t", help="Run Trigger File Audit")
+    audits.add_argument("-o", dest="audit", action="store_const", const="o", help="Run OBS File Audit")
+    audits.add_argument("-m", dest="audit", action="store_const", const="m", help="Run MagData File Audit")
+    audits.add_argument("-d", dest="audit", action="store_const", const="d", help="Run OBS Data Audit")
+    audits.add_argument("-z", dest="audit", action="store_const", const="z", help="Run Magdata Audit")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the checkpoint and audit every station directory and observation")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("AUDIT_WORKERS", "8")),
+                        help="Concurrent station directory scans (default: AUDIT_WORKERS or 8)")
+    return parser.parse_args(args)
+
 
 def main():
     # Checks for Flag
-    try:
-        FLAG = argv[1]
-    except(IndexError):
-        print("Usage: python3 obs_audit_v2.py -FLAG ")
-        print("Use -h for all possible flags")
-        return
-    
+    options = parse_args()
+    AUDIT = options.audit
+
     # Test Environmental Variables
     TESTHOST= "localhost"
     TESTUSER= "root"
@@ -170,7 +714,6 @@ def main():
     DB= "[readacted]"
 
     # Other Environmental Variables
-    PSWS_DB= load_db(HOST, USER, PASSWD, DB)
     ROOTDIR= '/home/'
     TIMESTAMP = dt.now(timezone.utc).isoformat()[0:19]
     BASE_LOG_DIR= "/home/audit_logs/"
@@ -179,186 +722,169 @@ def main():
     OBSDNE= BASE_LOG_DIR + "obs_not_in_db_" + TIMESTAMP[0:10] + ".log"
     MAGDNE= BASE_LOG_DIR + "mag_not_in_db_" + TIMESTAMP[0:10] +".log"
     NODATA= BASE_LOG_DIR + "no_obs_data_" + TIMESTAMP[0:10] + ".log"
-    
+    OBSSIZE= BASE_LOG_DIR + "obs_size_mismatch_" + TIMESTAMP[0:10] + ".log"
+    MAG_REPORTS= {"missing": MAGDNE,
+                  "size": BASE_LOG_DIR + "mag_size_mismatch_" + TIMESTAMP[0:10] + ".log",
+                  "nodata": BASE_LOG_DIR + "no_mag_data_" + TIMESTAMP[0:10] + ".log",
+                  "remediation": BASE_LOG_DIR + "mag_remediation_" + TIMESTAMP[0:10] + ".log"}
+    # Incremental state, one per audit flag so e.g. a -t run does not hide stations from -o
+    CHECKPOINT= BASE_LOG_DIR + "audit_checkpoint_" + AUDIT + ".json"
+
     # Checks for log directory.
     if(not os.path.isdir(BASE_LOG_DIR)):
         print("Error: Log Directory " + BASE_LOG_DIR + " not found. Please create it.")
         return
 
-    print("Audit Started At: " + TIMESTAMP)
-    
-    # -a for all audits
-    if(FLAG == "-a"):
-        station_dirs=fetch_STATIONsubdirs(ROOTDIR)
-
-        print("Starting All Audits...")
-
-        #############################################
-        #           Trigger File Audit              #
-        #############################################
-        print("\nStarting Trigger File Audit...")
-        
-        for dir in station_dirs:
-            # Station Directory as reflected in the Server Directory Structure
-            station= dir[-7:]
-            # Station ID, as reflected in the Database
-            station_id=  dir[-6:]
-
-            # pulls all the trigger files found within station directory
-            tfs= fetch_trigger_files(station)
-            for tf in tfs:
-                # Observation Name as reflected in Database
-                obs_name= tf[1:20]
-                
-                # Conditional Logic for determining if the trigger file is reflected within the Database or not
-                if(obs_exists(PSWS_DB, obs_name, station_id)):
-                    log(TRIGGERNDB, fetch_path(station, tf))
-                else:
-                    log(TRIGGERDNE, fetch_path(station, tf))
-        print("Complete")
-
-        #############################################
-        #              OBS File Audit               #
-        #############################################
-        print("\nStarting OBS File Audit...")
-
-        # Iteration through every station directory
-        for dir in station_dirs:
-            # Station Directory as reflected in the Server Directory Structure
-            station= dir[-7:]
-            # Station ID, as reflected in the Database
-            station_id= dir[-6:]
-
-            # pulls all the observation data files found within station directory
-            obs= fetch_obs_files(station)
-            for ob in obs:
-                # Conditional Logic for determining if the observation data file is not reflected in the database
-                if(not obs_exists(PSWS_DB, ob, station_id)):
-                    log(OBSDNE, fetch_path(station, ob))
-        print("Complete")
-            
-
-        #############################################
-        #              OBS Data Audit               #
-        #############################################
-        print("\nStarting OBS Data Audit...")
-
-        # Iteration through every station directory
-        for dir in station_dirs:
-            # Station Directory as reflected in the Server Directory Structure
-            station= dir[-7:]
-            # Station ID, as reflected in the Database
-            station_id= dir[-6:]
-        
-            # pulls all the recorded observations in db for a given station
-            station_dbData= fetch_db_data(PSWS_DB, station_id)
-            # pulls all the observation data files found within station directory
-            station_obsData= fetch_obs_files(station)
-        
-            for dbData in station_dbData:
-                ob_name= dbData.get("fileName")
-                if(not ob_name[-4:] == ".zip"):
-                    if(not ob_name in station_obsData):
-                        log(NODATA, "Station: " + station + "\t Observation: " + ob_name)
-        print("Complete")
-    
-    # -t for trigger file audit only
-    elif(FLAG == "-t"):
-        station_dirs= fetch_STATIONsubdirs(ROOTDIR)
-
-        print("\nStarting Trigger File Audit...")
-
-        # Iteration through every station directory
-        for dir in station_dirs:
-            # Station Directory as reflected in the Server Directory Structure
-            station= dir[-7:]
-            # Station ID, as reflected in the Database
-            station_id= dir[-6:]
-
-            # pulls all the trigger files found within station directory
-            tfs= fetch_trigger_files(station)
-            for tf in tfs:
-                # Observation Name as reflected in Database
-                obs_name= tf[1:20]
-                
-                # Conditional Logic for determining if the trigger file is reflected within the Database or not
-                if(obs_exists(PSWS_DB, obs_name, station_id)):
-                    log(TRIGGERNDB, fetch_path(station, tf))
-                else:
-                    log(TRIGGERDNE, fetch_path(station, tf))
-        print("Complete")
-
-    # -o for OBS file audit only
-    elif(FLAG == "-o"):
-        station_dirs= fetch_STATIONsubdirs(ROOTDIR)
-
-        print("\nStarting OBS File Audit...")
-
-        # Iteration through every station directory
-        for dir in station_dirs:
-            # Station Directory as reflected in the Server Directory Structure
-            station= dir[-7:]
-            # Station ID, as reflected in the Database
-            station_id= dir[-6:]
-
-            # pulls all the observation data files found within station directory
-            obs= fetch_obs_files(station)
-            for ob in obs:
-                # Conditional Logic for determining if the observation data file is not reflected in the database
-                if(not obs_exists(PSWS_DB, ob, station_id)):
-                    log(OBSDNE, fetch_path(station, ob))
-        print("Complete")
-
-    # -m if for MagData file audit only 
-    elif(FLAG == "-m"):
-        print("Magdata File Audit Unavailable Using psws_audit_v4.py")
-
-    # -d for OBS data audit only
-    elif(FLAG == "-d"):
-        station_dirs= fetch_STATIONsubdirs(ROOTDIR)
-
-        print("\nStarting OBS Data Audit...")
-
-        # Iteration through every station directory
-        for dir in station_dirs:
-            # Station Directory as reflected in the Server Directory Structure
-            station= dir[-7:]
-            # Station ID, as reflected in the Database
-            station_id= dir[-6:]
-        
-            # pulls all the recorded observations in db for a given station
-            station_dbData= fetch_db_data(PSWS_DB, station_id)
-            # pulls all the observation data files found within station directory
-            station_obsData= fetch_obs_files(station)
-        
-            for dbData in station_dbData:
-                ob_name= dbData.get("fileName")
-                if(not ob_name[-4:] == ".zip"):
-                    if(not ob_name in station_obsData):
-                        log(NODATA, "Station: " + station + "\tObservation: " + ob_name)
-        print("Complete")
-
-    # -z for Magdata audit only
-    elif(FLAG == "-z"):
-        print("Magdata Audit Unavailable Using psws_audit_v4.py")
-
-    # -h for Flag options
-    elif(FLAG == "-h"):
-        print("-a \t Run All Audits")
-        print("-t \t Run Trigger File Audit")
-        print("-o \t Run OBS File Audit")
-        print("-m \t Run MagData File Audit")
-        print("-d \t Run OBS Data Audit")
-        print("-z \t Run Magdata Audit")
-        print("-h \t Flag Help")
-
-    # Handles Flag Usage Error
-    else:
-        print("Usage: python3 obs_audit_v3.py -FLAG ")
+    setup(BASE_LOG_DIR + "psws_audit.log")
+    log = get_logger("psws_audit_v4")
+
+    def say(message):
+        # progress on the console and in the audit's own log
+        print(message)
+        log.info(message.strip())
+
+    say("Audit Started At: " + TIMESTAMP + " (" + AUDIT + ")")
+    timer = PhaseTimer()
+
+    if(AUDIT in {"m", "z"}):
+        PSWS_DB= load_db(HOST, USER, PASSWD, DB)
+        try:
+            run_mag_audits(AUDIT, fetch_STATIONsubdirs(ROOTDIR), options.workers, PSWS_DB,
+                           MAG_REPORTS, TIMESTAMP[0:16], timer, say)
+        finally:
+            PSWS_DB.close()
+        timer.summary(log)
+        say("\nAudit Finished At: " + dt.now(timezone.utc).isoformat()[0:19])
+        return
 
+    # Every audit works from one listing of each station directory and one
+    # query for the observation file names; the reports are set differences.
+    # Unless --full is given only stations whose directories changed, or whose
+    # observation count or highest id changed (rows added or deleted), since the
+    # last run (per the checkpoint) are rescanned. What the other stations had
+    # outstanding is carried over from the checkpoint and looked up again by name.
+    checkpoint = {} if options.full else load_checkpoint(CHECKPOINT)
+    previous = checkpoint.get("stations", {})
+    PSWS_DB= load_db(HOST, USER, PASSWD, DB)
+    try:
+        with timer.phase("detect changes"):
+            station_dirs = fetch_STATIONsubdirs(ROOTDIR)
+            with ThreadPoolExecutor(max_workers=max(1, options.workers)) as pool:
+                mtimes = dict(zip(station_dirs, pool.map(station_mtimes, station_dirs)))
+            db_counts = fetch_db_counts(PSWS_DB)
+            counts = {dir: db_counts.get(int(dir[-6:]) if dir[-6:].isdigit() else None, [0, 0])
+                      for dir in station_dirs}
+            if checkpoint:
+                changed_dirs = [dir for dir in station_dirs
+                                if dir[-7:] not in previous
+                                or previous[dir[-7:]]["mtimes"] != mtimes[dir]
+                                or previous[dir[-7:]]["db"] != counts[dir]]
+            else:
+                changed_dirs = station_dirs
+            rescan = set(changed_dirs)
+            unchanged = [dir for dir in station_dirs if dir not in rescan]
+        say("Rescanning " + str(len(changed_dirs)) + " of " + str(len(station_dirs)) + " station directories"
+              + (" (full)" if not checkpoint else ", rechecking the outstanding names of the rest"))
+
+        with timer.phase("scan stations"):
+            scans = scan_stations(changed_dirs, options.workers)
+
+        with timer.phase("load database"):
+            if checkpoint:
+                db_index = fetch_db_index(PSWS_DB, {scan.station_pk for scan in scans
+                                                    if scan.station_pk is not None})
+            else:
+                db_index = fetch_db_index(PSWS_DB)
+
+        with timer.phase("recheck outstanding"):
+            lookups = {int(dir[-6:]): outstanding_lookup(previous[dir[-7:]]["outstanding"])
+                       for dir in unchanged if dir[-6:].isdigit()}
+            found_names = fetch_db_names(PSWS_DB, {pk: names for pk, names in lookups.items() if names})
+            rechecked = {}
+            for dir in unchanged:
+                station_pk = int(dir[-6:]) if dir[-6:].isdigit() else None
+                rechecked[dir[-7:]] = recheck_outstanding(previous[dir[-7:]]["outstanding"],
+                                                          found_names.get(station_pk, set()))
+    finally:
+        PSWS_DB.close()
+    say("Loaded observations for " + str(len(db_index)) + " stations")
+    reconciled = {station: set(state["reconciled"]) for station, state in previous.items()}
+
+    if(AUDIT == "a"):
+        say("Starting All Audits...")
+
+    #############################################
+    #           Trigger File Audit              #
+    #############################################
+    if(AUDIT in {"a", "t"}):
+        say("\nStarting Trigger File Audit...")
+        with timer.phase("trigger file audit"):
+            in_db, not_in_db = trigger_audit(scans, db_index, reconciled)
+            for still, now_in_db, _ in rechecked.values():
+                in_db.extend(now_in_db)
+                not_in_db.extend(path for _, path in sorted(still["triggers"].items()))
+            write_report(TRIGGERNDB, in_db)
+            write_report(TRIGGERDNE, not_in_db)
+        say("Complete: " + str(len(in_db)) + " in db, " + str(len(not_in_db)) + " not in db")
+
+    #############################################
+    #              OBS File Audit               #
+    #############################################
+    if(AUDIT in {"a", "o"}):
+        say("\nStarting OBS File Audit...")
+        with timer.phase("obs file audit"):
+            missing = obs_file_audit(scans, db_index)
+            for still, _, _ in rechecked.values():
+                missing.extend(path for _, path in sorted(still["obs"].items()))
+            count = write_report(OBSDNE, missing)
+        say("Complete: " + str(count) + " not in db")
+
+        # sizes of the observations in db, from their size indexes (stations
+        # scanned this run; every station with --full)
+        say("\nStarting OBS Size Audit...")
+        with timer.phase("obs size audit"):
+            PSWS_DB= load_db(HOST, USER, PASSWD, DB)
+            try:
+                count = write_report(OBSSIZE, obs_size_audit(scans, db_index, PSWS_DB, options.workers))
+            finally:
+                PSWS_DB.close()
+        say("Complete: " + str(count) + " size mismatches")
+
+    #############################################
+    #              OBS Data Audit               #
+    #############################################
+    if(AUDIT in {"a", "d"}):
+        say("\nStarting OBS Data Audit...")
+        with timer.phase("obs data audit"):
+            missing = obs_data_audit(scans, db_index)
+            for station, (still, _, _) in rechecked.items():
+                missing.extend("Station: " + station + "\tObservation: " + ob_name for ob_name in still["nodata"])
+            count = write_report(NODATA, missing)
+        say("Complete: " + str(count) + " without data")
+
+    if(AUDIT == "a"):
+        PSWS_DB= load_db(HOST, USER, PASSWD, DB)
+        try:
+            run_mag_audits(AUDIT, station_dirs, options.workers, PSWS_DB, MAG_REPORTS, TIMESTAMP[0:16], timer, say)
+        finally:
+            PSWS_DB.close()
+
+    with timer.phase("save checkpoint"):
+        stations = {}
+        for station, (still, _, now_reconciled) in rechecked.items():
+            stations[station] = dict(previous[station], outstanding=still,
+                                     reconciled=sorted(reconciled[station] | now_reconciled))
+        for scan, dir in zip(scans, changed_dirs):
+            # mtimes and counts from before the scan: anything that changed during it is seen next run
+            stations[scan.station] = {"mtimes": mtimes[dir], "db": counts[dir],
+                                      "reconciled": sorted(reconciled_names(scan, db_index)),
+                                      "outstanding": outstanding_names(scan, db_index)}
+        save_checkpoint(CHECKPOINT, {"stations": stations})
+
+    timer.summary(log)
 
     FINISHTIME= dt.now(timezone.utc).isoformat()[0:19]
-    print("\nAudit Finished At: " + FINISHTIME)
+    say("\nAudit Finished At: " + FINISHTIME)
 
 if __name__ == "__main__":
     main()
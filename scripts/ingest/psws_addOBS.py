@@ -9,6 +9,9 @@
 # psws_addOBS.py
 # Add observation (where upload was detected by psws_watch) to
 # Observations table
+#
+# The logic lives in add_obs() so the watcher can call it in-process;
+# running this file directly keeps the original command line interface.
 
 import os, sys
 from pathlib import Path
@@ -29,111 +32,156 @@ if not LOG_PATH:
 
 # Django bootstrap to set up environment for Database access
 from _bootstrap_django import bootstrap 
+from _script_log import get_logger
 bootstrap() 
 
 from centerfrequencies.models import *
 from observations.models import *
 from datatypes.models import *
+from apps.stations.status import mark_station_alive
 #import datetime
 
 from datetime import timezone
 from datetime import datetime as dt
 
+from _dir_size_index import get_size
+from _drf_metadata import read_drf_metadata
+
+
+log = get_logger("psws_addOBS")
+
+
+def add_obs(dataRate, obsSize, fileName, path, station_name, instrument_name,
+            startDate, endDate, freq_list=()):
+    """
+    Add (or extend) a DRF observation in the Observations table.
+
+    :param dataRate: data rate in samples/sec
+    :param obsSize: observation size in bytes; None (or "-" on the command
+        line) takes it from the observation's size index
+    :param fileName: observation name (e.g. OBS2024-01-01T00-00)
+    :param path: path to the observation directory
+    :param station_name: station id string (e.g. N000015)
+    :param instrument_name: instrument id or instrument name
+    :param startDate: start date, formatted YYYY-MM-DDTHH:MM
+    :param endDate: end date, formatted YYYY-MM-DDTHH:MM
+    :param freq_list: center frequencies in MHz (up to 8 are recorded)
+    :return: id of the new or updated observation, or None if the
+        station/instrument pair is not in the database
+    """
+    dataRate = str(dataRate)
+    if obsSize in (None, "", "-"):
+        obsSize = get_size(str(path))
+    obsSize = str(obsSize)
+    fileName = str(fileName)
+    path = str(path)
+    station_name = str(station_name)
+    instrument_name = str(instrument_name)
+    station_log = log.bind(station=station_name, instrument=instrument_name)
+
+    theStationQS = Station.objects.filter(station_id=station_name)
+    print("found station:",theStationQS)
+    station_values = theStationQS.values()
+    if not station_values:
+        station_log.error("ERROR. Station " + station_name + " not found in database")
+        return None
+    print("id by item:",station_values[0]["id"])
+    station_id = station_values[0]["id"]
+
+    # update last_alive for this station
+    # (marks the station Online and refreshes the home page map if it was not)
+    mark_station_alive(station_id)
+    station_log.info("Updated last alive for " + station_name + " to " + str(dt.now(timezone.utc)))
+
+    theInstrumentQS = Instrument.objects.none()
+    if instrument_name.isdigit():
+        if Instrument.objects.filter(id=int(instrument_name)).exists():
+            # We've been given the instrument id, so pull data using ID
+            theInstrumentQS = Instrument.objects.filter(id=int(instrument_name), station_id=station_id)
+    else:
+        # Given instrument name, so pull data using name
+        theInstrumentQS = Instrument.objects.filter(instrument=instrument_name, station_id=station_id)
 
-def writeLog(theMessage):
-    timestamp = dt.now(timezone.utc).isoformat()[0:19]
-    # Ensure log directory exists
-    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
-    f = open(LOG_PATH, "a")
-    f.write(timestamp + " " + theMessage + "\n")
-    f.close()
-
-# Arguments are: (1) datarate in samples/sec, (2) observation size in bytes, (3) filename ,
-#  (4)  path, (5) station_id, (6) instrument, (7) start date, (8) end date
-
-#print ('Argument List:', str(sys.argv))
-writeLog("Started addOBS with args " + str(sys.argv[1]) + " " + str(sys.argv[2]) + " " + str(sys.argv[3]))
-dataRate = str(sys.argv[1])
-obsSize = str (sys.argv[2])
-fileName = str (sys.argv[3])
-path = str (sys.argv[4])
-
-station_name  = str(sys.argv[5])
-theStationQS = Station.objects.filter(station_id=station_name)
-print("found station:",theStationQS)
-#print("values:",theStationQS.values())
-print("id by item:",theStationQS.values()[0]["id"])
-station_id = theStationQS.values()[0]["id"]
-
-station_instance = Station.objects.get(station_id = station_name)
-
-# update last_alive for this station
-station_instance.last_alive = dt.now(timezone.utc)
-# the station_status will update by itself when queried.
-station_instance.save()
-writeLog("Updated last alive for " + station_name + " to " + str(dt.now(timezone.utc)))
-
-instrument_name = str(sys.argv[6])
-
-if instrument_name.isdigit():
-    if Instrument.objects.filter(id=int(instrument_name)).exists():
-        # We've been given the instrument id, so pull data using ID
-        theInstrumentQS = Instrument.objects.filter(id=int(instrument_name), station_id=station_id)
-else:
-    # Given instrument name, so pull data using name
-    theInstrumentQS = Instrument.objects.filter(instrument=instrument_name, station_id=station_id)
-
-#print("found instrument:",theInstrumentQS)
-
-try:
-    instrument_id = theInstrumentQS.values()[0]["id"]
-except IndexError as e:
-    # the instrument given is not assigned to this station
-    writeLog("ERROR. User specified " + station_name + " & " + instrument_name + "; no database match")
-    print("ERROR. User specified " + station_name + " & " + instrument_name + "; no database match")
-    exit()
-
-print("instrumentid=",instrument_id)
-startDate =  str (sys.argv[7])
-# ensure database knows about UTC timezone
-startDateTZ = dt.strptime(startDate, '%Y-%m-%dT%H:%M').replace(tzinfo=timezone.utc)
-endDate = str (sys.argv[8])
-endDateTZ = dt.strptime(endDate, '%Y-%m-%dT%H:%M').replace(tzinfo=timezone.utc)
-cfid_list=[]
-
-for  c in range(9, 17): # handles up to 8 center frequencies in this version
     try:
-      #cfid_list.append(str(sys.argv[c]))
-      theFreq = str(sys.argv[c])
-      print("look up cfid ",theFreq)
-      this_cfid = CenterFrequency.objects.filter(centerFrequency=theFreq).values('id')
-      print("found cfid:",this_cfid)
-      cfid_list.append(this_cfid[0]['id'])
-
-    except Exception as ex:
-      print("Exception:",str(ex))
-      print("center freq ids found:", c-8)
-      break
-
-print("cfids:",cfid_list)
-#sname = station_id
-obs_list =  Observation.objects.filter(fileName = fileName, station_id=station_id, instrument_id=instrument_id) # doe this OBS already exist?
-if len(obs_list) == 0:   # this is a new observation
-    theObs  = Observation(dataRate=dataRate,size=obsSize,fileName=fileName,path=path, \
-              startDate=startDateTZ, endDate=endDateTZ, \
-              station_id = station_id, instrument_id = instrument_id )
-    theObs.save()
-    # DataType Fix - Anderson November 2023
-    dataType = DataType.objects.filter(dataType='spectrum').values('id')
-    print("datatype!! = ", dataType, "  ID = ", dataType[0]['id'])
-    theObs.dataType.add(dataType[0]['id'])
-    
-    theObs.save()
-    for this_cfid in cfid_list: # add one or more center frequencies in this datase
-        theObs.centerFrequency.add(this_cfid)
+        instrument_id = theInstrumentQS.values()[0]["id"]
+    except IndexError as e:
+        # the instrument given is not assigned to this station
+        station_log.error("ERROR. User specified " + station_name + " & " + instrument_name + "; no database match")
+        print("ERROR. User specified " + station_name + " & " + instrument_name + "; no database match")
+        return None
+
+    print("instrumentid=",instrument_id)
+    # ensure database knows about UTC timezone
+    startDateTZ = dt.strptime(str(startDate), '%Y-%m-%dT%H:%M').replace(tzinfo=timezone.utc)
+    endDateTZ = dt.strptime(str(endDate), '%Y-%m-%dT%H:%M').replace(tzinfo=timezone.utc)
+    cfid_list=[]
+
+    for theFreq in list(freq_list)[0:8]: # handles up to 8 center frequencies in this version
+        try:
+          theFreq = str(theFreq)
+          print("look up cfid ",theFreq)
+          this_cfid = CenterFrequency.objects.filter(centerFrequency=theFreq).values('id')
+          print("found cfid:",this_cfid)
+          cfid_list.append(this_cfid[0]['id'])
+
+        except Exception as ex:
+          print("Exception:",str(ex))
+          print("center freq ids found:", len(cfid_list))
+          break
+
+    print("cfids:",cfid_list)
+    obs_list =  Observation.objects.filter(fileName = fileName, station_id=station_id, instrument_id=instrument_id) # doe this OBS already exist?
+    if len(obs_list) == 0:   # this is a new observation
+        theObs  = Observation(dataRate=dataRate,size=obsSize,fileName=fileName,path=path, \
+                  startDate=startDateTZ, endDate=endDateTZ, \
+                  station_id = station_id, instrument_id = instrument_id )
         theObs.save()
-
-else:  # this  observation is already in database. update endDate
-    obsPtr = obs_list[0].id    # this is id of existing observation
-    print("Existing ID:",obsPtr)
-    Observation.objects.filter( id = obsPtr ).update(endDate = endDateTZ, size=obsSize)
+        # DataType Fix - Anderson November 2023
+        dataType = DataType.objects.filter(dataType='spectrum').values('id')
+        print("datatype!! = ", dataType, "  ID = ", dataType[0]['id'])
+        theObs.dataType.add(dataType[0]['id'])
+
+        # add one or more center frequencies in this dataset
+        if cfid_list:
+            theObs.centerFrequency.add(*cfid_list)
+        return theObs.id
+
+    else:  # this  observation is already in database. update endDate
+        obsPtr = obs_list[0].id    # this is id of existing observation
+        print("Existing ID:",obsPtr)
+        Observation.objects.filter( id = obsPtr ).update(endDate = endDateTZ, size=obsSize)
+        return obsPtr
+
+
+def add_drf_obs(path, station_name, instrument_name, obsSize=None):
+    """
+    Add (or extend) a DRF observation using the dataset's own metadata.
+
+    Data rate, center frequencies and start/end dates come from the shared
+    DRF metadata cache, so nothing is re-read if the watcher already did.
+    """
+    path = str(path).rstrip('/')
+    meta = read_drf_metadata(path, "ch0")
+    dataRate = meta.sample_rate_numerator
+    startDate = dt.fromtimestamp(meta.start_sample / dataRate, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M')
+    endDate = dt.fromtimestamp(meta.end_sample / dataRate, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M')
+    return add_obs(dataRate, obsSize, os.path.basename(path), path, station_name,
+                   instrument_name, startDate, endDate, meta.center_frequencies)
+
+
+def main(argv):
+    # Arguments are: (1) datarate in samples/sec, (2) observation size in bytes, (3) filename ,
+    #  (4)  path, (5) station_id, (6) instrument, (7) start date, (8) end date,
+    #  (9..16) center frequencies
+    # or: --drf path station_id instrument   (everything else from DRF metadata)
+    if len(argv) > 1 and argv[1] == "--drf":
+        log.info("Started addOBS --drf with args " + " ".join(argv[2:5]))
+        add_drf_obs(argv[2], argv[3], argv[4])
+        return
+    log.info("Started addOBS with args " + str(argv[1]) + " " + str(argv[2]) + " " + str(argv[3]))
+    add_obs(argv[1], argv[2], argv[3], argv[4], argv[5], argv[6], argv[7], argv[8],
+            argv[9:17])
+
+
+if __name__ == "__main__":
+    main(sys.argv)
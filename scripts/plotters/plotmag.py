@@ -7,6 +7,7 @@
 # The full license is in the LICENSE file, distributed with this software.
 # ----------------------------------------------------------------------------
 from _bootstrap_django import bootstrap
+from _script_log import get_logger
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
@@ -15,7 +16,6 @@ import sys
 import argparse
 import os
 from datetime import datetime
-import zipfile
 from dotenv import load_dotenv
 
 from pathlib import Path
@@ -28,6 +28,9 @@ load_dotenv(dotenv_path=env_path)
 # Django bootstrap to set up environment for Database access
 bootstrap()
 
+# log format detection shared with the analysis pages
+from apps.analysis.magdata import open_mag_file, read_mag_frame
+
 PLOT_PATH = os.getenv("PLOT_PATH")
 LOG_PATH = os.getenv("LOG_PATH")
 
@@ -40,10 +43,7 @@ if not LOG_PATH:
 plot_output_path = os.path.join(PLOT_PATH, "mag")
 
 
-def writeLog(theMessage):
-    timestamp = datetime.now().isoformat()[0:19]
-    with open(LOG_PATH, "a") as f:
-        f.write(timestamp + " " + theMessage + "\n")
+log = get_logger("plotmag")
 
 
 def open_maybe_zip(path):
@@ -52,31 +52,16 @@ def open_maybe_zip(path):
         file-like object
         filename inside zip (or actual filename)
     """
-    if path.endswith(".zip"):
-        z = zipfile.ZipFile(path, 'r')
-        name = z.namelist()[0]
-        f = z.open(name)
-        return f, name
-    else:
-        return open(path, 'rb'), os.path.basename(path)
+    return open_mag_file(path)
 
 
 def load_dataframe(path):
     f, inner_name = open_maybe_zip(path)
-
-    first = f.read(1)
-    f.seek(0)
-
-    if first == b'{':
-        df = pd.read_json(f, lines=True)
-        bx, by, bz = 'x', 'y', 'z'
-    else:
-        names = ['ts', 'rt', 'lt', 'x', 'y', 'z', 'rx', 'ry', 'rz', 'Tm']
-        # Handle quoted CSV values with quotechar parameter
-        df = pd.read_csv(f, names=names, quotechar='"', skipinitialspace=True)
-        bx, by, bz = 'x', 'y', 'z'
-
-    f.close()
+    try:
+        df = read_mag_frame(f)
+    finally:
+        f.close()
+    bx, by, bz = 'x', 'y', 'z'
     return df, inner_name, bx, by, bz
 
 
@@ -100,7 +85,7 @@ def plot_magnetometer(path, station, date, lat, lon, grid, nick, instrument_id):
     from apps.stations.models import Station
     from apps.observations.models import Observation
     try:
-        writeLog(f'plot_magnetometer called for station {
+        log.info(f'plot_magnetometer called for station {
                  station}, file {path}')
 
         os.makedirs(plot_output_path, exist_ok=True)
@@ -114,46 +99,46 @@ def plot_magnetometer(path, station, date, lat, lon, grid, nick, instrument_id):
 
         if isinstance(df['ts'].iloc[0], str):
             df['ts'] = df['ts'].str.strip().str.strip('"')
-            writeLog(f"After stripping quotes: {df['ts'].iloc[0]}")
+            log.info(f"After stripping quotes: {df['ts'].iloc[0]}")
 
         try:
             df['ts'] = pd.to_datetime(df['ts'], format='%d %b %Y %H:%M:%S')
             parse_success = True
-            writeLog(
+            log.info(
                 "Successfully parsed timestamps with format '%d %b %Y %H:%M:%S'")
         except Exception as e:
-            writeLog(f"First parse attempt failed: {str(e)}")
+            log.info(f"First parse attempt failed: {str(e)}")
             try:
                 df['ts'] = pd.to_datetime(df['ts'])
                 parse_success = True
-                writeLog(
+                log.info(
                     "Successfully parsed timestamps with pandas auto-detection")
             except Exception as e2:
-                writeLog(f"Second parse attempt failed: {str(e2)}")
+                log.info(f"Second parse attempt failed: {str(e2)}")
 
         if not parse_success:
-            writeLog("ERROR: Could not parse timestamps")
+            log.error("ERROR: Could not parse timestamps")
             return None
 
-        writeLog(f"Date range: {df['ts'].min()} to {df['ts'].max()}")
+        log.info(f"Date range: {df['ts'].min()} to {df['ts'].max()}")
 
         df = df.set_index('ts')
 
-        writeLog(f"NaN counts before resampling - x: {df[bx].isna().sum()}, y: {
+        log.info(f"NaN counts before resampling - x: {df[bx].isna().sum()}, y: {
                  df[by].isna().sum()}, z: {df[bz].isna().sum()}")
 
         df_avg = df.resample('10min').mean()
 
-        writeLog(f"After resampling (before dropna): {len(df_avg)} rows")
-        writeLog(f"NaN counts after resampling - x: {df_avg[bx].isna().sum()}, y: {
+        log.info(f"After resampling (before dropna): {len(df_avg)} rows")
+        log.info(f"NaN counts after resampling - x: {df_avg[bx].isna().sum()}, y: {
                  df_avg[by].isna().sum()}, z: {df_avg[bz].isna().sum()}")
 
         df_avg = df_avg.dropna(subset=[bx, by, bz], how='all')
 
-        writeLog(f"After resampling: {len(df_avg)} rows")
+        log.info(f"After resampling: {len(df_avg)} rows")
 
         if df_avg.empty:
-            writeLog(
+            log.info(
                 "ERROR: No data after resampling. All magnetometer values are NaN.")
             return None
 
@@ -200,13 +185,13 @@ def plot_magnetometer(path, station, date, lat, lon, grid, nick, instrument_id):
         output_filename = f"{stationIDstr}_{instrumentID}_{date}_{grid}.png"
         output_full_path = os.path.join(plot_output_path, output_filename)
 
-        writeLog(f'Saving plot as: {output_filename}')
+        log.info(f'Saving plot as: {output_filename}')
         plt.savefig(output_full_path, dpi=300)
         plt.close('all')
 
         # Update database
         try:
-            writeLog(f'Updating database for station {
+            log.info(f'Updating database for station {
                      stationIDstr}, instrument {instrumentID}, file {filename}')
 
             theStationQS = Station.objects.filter(station_id=stationIDstr)
@@ -220,30 +205,30 @@ def plot_magnetometer(path, station, date, lat, lon, grid, nick, instrument_id):
                 )
 
                 if theObsQS.exists():
-                    writeLog(f'Updating observation with plot at: {
+                    log.info(f'Updating observation with plot at: {
                              plot_output_path}/{output_filename}')
                     obs_id = theObsQS.values()[0]["id"]
                     obs_instance = Observation.objects.get(id=obs_id)
                     obs_instance.plotFile = output_filename
                     obs_instance.plotPath = plot_output_path
                     obs_instance.save()
-                    writeLog('Database update successful')
+                    log.info('Database update successful')
                 else:
-                    writeLog(f'WARNING: No observation found for station {
+                    log.warning(f'WARNING: No observation found for station {
                              station_id}, instrument {instrumentID}, file {actual_filename}')
             else:
-                writeLog(f'WARNING: Station {
+                log.warning(f'WARNING: Station {
                          stationIDstr} not found in database')
 
         except Exception as e:
-            writeLog(f'ERROR updating database: {str(e)}')
+            log.error(f'ERROR updating database: {str(e)}')
 
         return output_full_path
 
     except Exception as e:
-        writeLog(f'ERROR in plot_magnetometer: {str(e)}')
+        log.error(f'ERROR in plot_magnetometer: {str(e)}')
         import traceback
-        writeLog(traceback.format_exc())
+        log.error(traceback.format_exc())
         return None
 
 
@@ -0,0 +1,198 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+PSWS plot service - long-running, headless renderer for spectrum, magnetometer
+and fldigi plots.
+
+The watcher and addCSV put render jobs on the local plot queue (_plot_queue.py)
+instead of starting `ts python plotspectrum_v8.py ...` per upload. Each worker
+process here sets up the Agg backend, Django, digital_rf and the plotter
+modules once, then renders jobs until it has done PLOT_MAX_JOBS_PER_WORKER of
+them and is replaced (bounding any matplotlib memory growth). The parent
+process restarts workers and logs backlog and render times.
+
+Usage:
+    python psws_plotd.py [--workers N]
+"""
+# isort: skip_file
+
+import os
+import signal
+import sys
+import time
+import multiprocessing
+from pathlib import Path
+from datetime import datetime as dt
+from datetime import timezone
+
+import matplotlib
+matplotlib.use("Agg")  # headless; must precede any pyplot import
+
+from dotenv import load_dotenv
+
+SCRIPTS_ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SCRIPTS_ROOT_DIR / "plotters"))
+sys.path.insert(0, str(SCRIPTS_ROOT_DIR))
+
+load_dotenv(SCRIPTS_ROOT_DIR / "scripts.env")
+
+LOG_PATH = os.getenv("LOG_PATH")
+# number of render processes and jobs each renders before it is replaced
+PLOT_WORKERS = int(os.getenv("PLOT_WORKERS", "2"))
+PLOT_MAX_JOBS_PER_WORKER = int(os.getenv("PLOT_MAX_JOBS_PER_WORKER", "200"))
+# seconds an idle worker waits before polling the queue again
+PLOT_POLL_INTERVAL = float(os.getenv("PLOT_POLL_INTERVAL", "2"))
+# seconds between backlog / render time reports
+PLOT_STATS_INTERVAL = int(os.getenv("PLOT_STATS_INTERVAL", "300"))
+
+if not LOG_PATH:
+    raise EnvironmentError("LOG_PATH not set in scripts.env")
+
+from _plot_queue import get_plot_queue
+from _script_log import get_logger
+
+
+log = get_logger("psws_plotd")
+
+
+def load_renderers():
+    """
+    Import the plotters once per worker. A plotter whose dependencies are
+    missing is left out; its jobs fail with the import error.
+    """
+    from _bootstrap_django import bootstrap
+    bootstrap()
+
+    renderers = {}
+    errors = {}
+    try:
+        from plotspectrum_v8 import plot_spectrum
+        renderers["spectrum"] = plot_spectrum
+    except Exception as ex:
+        errors["spectrum"] = repr(ex)
+    try:
+        from plotmag import plot_magnetometer
+        renderers["magnetometer"] = plot_magnetometer
+    except Exception as ex:
+        errors["magnetometer"] = repr(ex)
+    try:
+        from plotfldigi1 import plot_fldigi
+        renderers["fldigi"] = plot_fldigi
+    except Exception as ex:
+        errors["fldigi"] = repr(ex)
+    for kind, error in errors.items():
+        log.warning("plotd: %s renderer unavailable: %s" % (kind, error))
+    return renderers, errors
+
+
+def worker_main(name, max_jobs, poll_interval, stop_event):
+    import matplotlib.pyplot as plt
+    from django.db import close_old_connections
+
+    started = time.monotonic()
+    renderers, errors = load_renderers()
+    queue = get_plot_queue()
+    log.info("plotd: %s ready in %.1fs (%s)" % (
+        name, time.monotonic() - started, ", ".join(sorted(renderers))))
+
+    rendered = 0
+    while not stop_event.is_set() and (max_jobs <= 0 or rendered < max_jobs):
+        job = queue.claim()
+        if job is None:
+            stop_event.wait(poll_interval)
+            continue
+
+        began = time.monotonic()
+        job_log = log.bind(job_id=job.id)
+        close_old_connections()
+        try:
+            if job.kind not in renderers:
+                raise RuntimeError("no renderer for %s: %s" % (
+                    job.kind, errors.get(job.kind, "unknown kind")))
+            # plotters change rcParams / styles; keep each job's changes to itself
+            with matplotlib.rc_context():
+                result = renderers[job.kind](**job.args)
+            duration = time.monotonic() - began
+            queue.complete(job, duration)
+            job_log.info("plotd: %s rendered %s in %.2fs -> %s" % (
+                name, job.job_key, duration, result))
+        except Exception as ex:
+            duration = time.monotonic() - began
+            retry = queue.fail(job, repr(ex), duration)
+            job_log.error("plotd: %s failed %s attempt %d (%s): %s" % (
+                name, job.job_key, job.attempts,
+                "will retry" if retry else "giving up", ex), exc_info=True)
+        finally:
+            plt.close('all')
+            close_old_connections()
+        rendered += 1
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="PSWS plot rendering service")
+    parser.add_argument("--workers", type=int, default=PLOT_WORKERS,
+                        help="render processes (default from PLOT_WORKERS)")
+    parser.add_argument("--max-jobs", type=int, default=PLOT_MAX_JOBS_PER_WORKER,
+                        help="jobs per process before it is replaced (0 = never)")
+    args = parser.parse_args(argv)
+
+    # systemd stops the service with SIGTERM; shut down as for Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    queue = get_plot_queue()
+    recovered = queue.recover()
+    log.info("plotd: starting %d workers (%d interrupted jobs requeued)" % (
+        args.workers, recovered))
+
+    # spawn, not fork: no inherited database or SQLite connections
+    ctx = multiprocessing.get_context("spawn")
+    stop_event = ctx.Event()
+    workers = {}
+    serial = 0
+
+    def start_worker(slot):
+        nonlocal serial
+        serial += 1
+        proc = ctx.Process(target=worker_main, name="plot-%d" % slot,
+                           args=("plot-%d.%d" % (slot, serial), args.max_jobs,
+                                 PLOT_POLL_INTERVAL, stop_event),
+                           daemon=True)
+        proc.start()
+        workers[slot] = proc
+
+    for slot in range(max(1, args.workers)):
+        start_worker(slot)
+
+    next_stats = time.monotonic() + PLOT_STATS_INTERVAL
+    try:
+        while True:
+            time.sleep(1)
+            for slot, proc in list(workers.items()):
+                if not proc.is_alive():
+                    if proc.exitcode:
+                        log.info("plotd: worker %s exited with %s" % (
+                            proc.name, proc.exitcode))
+                    start_worker(slot)
+            if time.monotonic() >= next_stats:
+                log.info("plotd stats: " + str(queue.metrics()))
+                next_stats = time.monotonic() + PLOT_STATS_INTERVAL
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        # workers finish the plot in hand, then exit
+        stop_event.set()
+        for proc in workers.values():
+            proc.join(timeout=300)
+        log.info("plotd: stopped; " + str(queue.metrics()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from _dir_size_index import DirSizeIndex, get_size, read_size
+
+
+class DirSizeIndexTests(unittest.TestCase):
+    """A DRF-like tree: two old hour directories and the current one."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.root = os.path.join(self.tmp, "OBS2024-01-01T00-00")
+        self.index_dir = os.path.join(self.tmp, "index")
+        old = time.time() - 2 * 86400
+        for hour in ("00", "01", "02"):
+            os.makedirs(os.path.join(self.root, "ch0", hour))
+            for n in range(10):
+                path = os.path.join(self.root, "ch0", hour, "rf@%s.h5" % n)
+                with open(path, "wb") as f:
+                    f.write(b"x" * 100)
+                if hour != "02":
+                    os.utime(path, (old, old))
+        self.current = os.path.join(self.root, "ch0", "02")
+
+    def refresh(self):
+        index = DirSizeIndex(self.root, self.index_dir)
+        index.load()
+        total = index.refresh()
+        index.save()
+        return total, index.stats
+
+    def test_first_refresh_stats_every_file(self):
+        total, stats = self.refresh()
+        self.assertEqual(total, 3000)
+        self.assertEqual(stats["files_stated"], 30)
+
+    def test_new_file_stats_only_recent_files(self):
+        self.refresh()
+        with open(os.path.join(self.current, "rf@10.h5"), "wb") as f:
+            f.write(b"x" * 100)
+        total, stats = self.refresh()
+        self.assertEqual(total, 3100)
+        # only the current directory is listed; the old hours, ch0 and the
+        # root (no files of their own) are sealed
+        self.assertEqual(stats["files_stated"], 11)
+        self.assertEqual(stats["dirs_listed"], 1)
+        self.assertEqual(stats["dirs_sealed"], 4)
+
+    def test_in_place_growth_is_seen(self):
+        self.refresh()
+        with open(os.path.join(self.current, "rf@0.h5"), "ab") as f:
+            f.write(b"y" * 50)
+        total, stats = self.refresh()
+        self.assertEqual(total, 3050)
+        self.assertEqual(stats["dirs_listed"], 0)
+        self.assertEqual(stats["files_stated"], 10)
+
+    def test_read_size_does_not_refresh(self):
+        self.assertIsNone(read_size(self.root, self.index_dir))
+        self.assertEqual(get_size(self.root, index_dir=self.index_dir), 3000)
+        with open(os.path.join(self.current, "rf@10.h5"), "wb") as f:
+            f.write(b"x" * 100)
+        self.assertEqual(read_size(self.root, self.index_dir), 3000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import _script_log
+
+LINES = 2000
+
+
+def log_lines(worker):
+    log = _script_log.get_logger("test_script_log")
+    for n in range(LINES):
+        log.info("line %d", n, extra={"job_id": worker})
+
+
+class ForkedChildTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.path = os.path.join(self.tmp, "scripts.log")
+        _script_log.shutdown()
+        os.environ["LOG_PATH"] = self.path
+        self.addCleanup(os.environ.pop, "LOG_PATH", None)
+        self.addCleanup(_script_log.shutdown)
+        # the parent has a listener running, as the watcher and plotd do
+        _script_log.setup()
+
+    def test_fork_children_write_every_line(self):
+        context = multiprocessing.get_context("fork")
+        children = [context.Process(target=log_lines, args=(worker,)) for worker in range(4)]
+        for child in children:
+            child.start()
+        for child in children:
+            child.join()
+        with open(self.path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 4 * LINES)
+        self.assertEqual({record["job_id"] for record in records}, {0, 1, 2, 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
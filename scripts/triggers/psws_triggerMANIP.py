@@ -7,23 +7,32 @@
 # The full license is in the LICENSE file, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import argparse
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime as dt
+from datetime import timedelta
 from datetime import timezone
+import sys
+from pathlib import Path
 from sys import argv
+from dotenv import load_dotenv
 
-def log(message):
-    """
-    The `log` function appends a message to a log file located at "/var/www/html/triggerManip.log".
-    
-    :param message: The `log` function you provided takes a `message` parameter, which is a string
-    containing the information you want to log. This message will be written to a log file named
-    "triggerManip.log" located at "/var/www/html/"
-    """
-    
-    f = open("/var/www/html/triggerManip.log", "a")
-    f.write(message + "\n")
-    f.close()
+# SCRIPTS_ROOT_DIR is 1 level up from scripts/triggers/
+SCRIPTS_ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SCRIPTS_ROOT_DIR))
+
+# Load environment variables from scripts/.env: the replay must use the
+# watcher's INGEST_QUEUE_DB and retry policy
+load_dotenv(SCRIPTS_ROOT_DIR / "scripts.env")
+
+from _script_log import get_logger, setup
+from _job_queue import JobQueue, default_queue_path
+setup("/var/www/html/triggerManip.log")
+log = get_logger("psws_triggerMANIP")
 
 def load_logfile(filename):
     """
@@ -41,7 +50,7 @@ def load_logfile(filename):
         return file
     except IOError:
         print("Error: " + filename + " not found")
-        log("Error: " + filename + " not found")
+        log.error("Error: " + filename + " not found")
         exit()
 
 def delete_triggers(filename):
@@ -58,7 +67,7 @@ def delete_triggers(filename):
     triggerfiles= file.readlines()
     num_triggerfiles= len(triggerfiles)
     print("Number of TriggerFiles in File --> " + str(num_triggerfiles))
-    log("Number of TriggerFiles in File --> " + str(num_triggerfiles))
+    log.info("Number of TriggerFiles in File --> " + str(num_triggerfiles))
     # Strips the newline(\n) character from end of each log entry
     for i in range(num_triggerfiles):
         triggerfiles[i] = triggerfiles[i].strip("\n")
@@ -68,7 +77,7 @@ def delete_triggers(filename):
         os.rmdir(triggerfile)
         count+=1
     print("Number of TriggerFiles Removed --> " + str(count))
-    log("Number of TriggerFiles Removed --> " + str(count))
+    log.info("Number of TriggerFiles Removed --> " + str(count))
 
 def create_triggers(filename):
     """
@@ -84,7 +93,7 @@ def create_triggers(filename):
     triggerfiles= file.readlines()
     num_triggerfiles= len(triggerfiles)
     print("Number of TriggerFiles in File --> " + str(num_triggerfiles))
-    log("Number of TriggerFiles in File --> " + str(num_triggerfiles))
+    log.info("Number of TriggerFiles in File --> " + str(num_triggerfiles))
     # Strips the newline(\n) character from end of each log entry
     for i in range(num_triggerfiles):
         triggerfiles[i] = triggerfiles[i].strip("\n")
@@ -94,7 +103,7 @@ def create_triggers(filename):
         os.mkdir(triggerfile)
         count+=1
     print("Number of TriggerFiles Created --> " + str(count))
-    log("Number of TriggerFiles Created --> " + str(count))
+    log.info("Number of TriggerFiles Created --> " + str(count))
 
 def delete_log(filename):
     """
@@ -107,7 +116,197 @@ def delete_log(filename):
     
     os.remove(filename)
     print("Deleted File --> " + filename)
-    log("Deleted File --> " + filename)
+    log.info("Deleted File --> " + filename)
+
+def read_triggers(filename):
+    """
+    Reads the trigger paths listed in an audit log (one per line), skipping blank lines.
+
+    :param filename: Audit log, e.g. /home/audit_logs/trigger_not_in_db_<date>.log
+    :return: List of trigger directory paths, in file order.
+    """
+
+    file= load_logfile(filename)
+    with file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def replay_checkpoint_path(filename):
+    return filename + ".replay"
+
+
+def load_replay_checkpoint(filename, triggers):
+    """
+    Returns the index of the first trigger not yet replayed by an interrupted
+    replay of this log, or 0. A checkpoint for a different list (the log was
+    rewritten) is ignored.
+    """
+
+    try:
+        with open(replay_checkpoint_path(filename), "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if data.get("count") != len(triggers) or data.get("last") != (triggers[-1] if triggers else None):
+        return 0
+    return min(int(data.get("next", 0)), len(triggers))
+
+
+def save_replay_checkpoint(filename, triggers, next_index):
+    """Writes the replay position atomically next to the log file."""
+
+    path = replay_checkpoint_path(filename)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"count": len(triggers), "last": triggers[-1] if triggers else None,
+                   "next": next_index, "updated": dt.now(timezone.utc).isoformat()[0:19]}, f)
+    os.replace(tmp, path)
+
+
+class RatePacer:
+    """Spaces calls evenly at `rate` per second (no limit when rate <= 0)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        if self.interval:
+            delay = self.next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_at = max(self.next_at, time.monotonic()) + self.interval
+
+
+def format_eta(seconds):
+    return str(timedelta(seconds=int(seconds))) if seconds == seconds and seconds != float("inf") else "?"
+
+
+def replay_triggers(filename, rate, concurrency, priority, run_here=False, restart=False):
+    """
+    The function `replay_triggers` re-runs the triggers listed in an audit log by
+    enqueueing them in the watcher's durable ingest job queue (INGEST_QUEUE_DB),
+    instead of removing and recreating the trigger directories. Nothing is
+    created on the filesystem, so the watchdog sees no burst of events.
+
+    :param filename: Audit log listing one trigger directory path per line
+    :param rate: Triggers enqueued per second at most (0 for no limit)
+    :param concurrency: Without run_here, the queue backlog (pending and running
+        jobs) above which the replay waits for the watcher to catch up; with
+        run_here, the number of ingest threads in this process
+    :param priority: Job priority; the default below 0 lets live uploads go first
+    :param run_here: Ingest the jobs in this process (the watcher's process_trigger
+        as a library call) rather than leaving them to the running watcher
+    :param restart: Ignore the checkpoint of an earlier, interrupted replay
+    :return: Number of triggers scheduled.
+    """
+
+    # the watcher's retry policy, as jobs failing here are retried by it
+    queue = JobQueue(default_queue_path(),
+                     max_attempts=int(os.getenv("INGEST_MAX_ATTEMPTS", "5")),
+                     backoff_base=float(os.getenv("INGEST_RETRY_BACKOFF", "30")))
+    triggers = read_triggers(filename)
+    total = len(triggers)
+    start = 0 if restart else load_replay_checkpoint(filename, triggers)
+    if start:
+        print("Resuming replay at trigger " + str(start + 1) + " of " + str(total))
+        log.info("Resuming replay of " + filename + " at " + str(start) + "/" + str(total))
+
+    pool = None
+    slots = None
+    if run_here:
+        sys.path.insert(0, str(SCRIPTS_ROOT_DIR / "watchers"))
+        from psws_watch10 import process_trigger
+        pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        slots = threading.BoundedSemaphore(max(1, concurrency))
+
+        def run_one():
+            try:
+                queue.run_next(process_trigger, log.warning)
+            except Exception:
+                pass  # recorded in the queue (retry / failed) by run_next
+            finally:
+                slots.release()
+
+    def progress(next_index, note=""):
+        elapsed = time.monotonic() - started
+        per_second = (next_index - start) / elapsed if elapsed > 0 else 0.0
+        eta = (total - next_index) / per_second if per_second else float("inf")
+        message = "Replayed %d/%d (%.1f/s), ETA %s, queue %s%s" % (
+            next_index, total, per_second, format_eta(eta), queue.metrics(), note)
+        print(message)
+        log.info(message)
+
+    pacer = RatePacer(rate)
+    started = time.monotonic()
+    last_report = last_save = started
+    scheduled = skipped = 0
+    index = start
+    try:
+        for index in range(start, total):
+            if not run_here:
+                # backpressure: let the watcher work off the due backlog first
+                # (jobs backing off before a retry do not count)
+                while True:
+                    metrics = queue.metrics()
+                    if metrics["due"] + metrics["running"] < max(1, concurrency):
+                        break
+                    if time.monotonic() - last_report >= 10.0:
+                        progress(index, " - waiting for the watcher (is it running?)")
+                        last_report = time.monotonic()
+                    time.sleep(1.0)
+            pacer.wait()
+            trigger = triggers[index]
+            try:
+                if queue.enqueue(trigger, priority=priority, force=True):
+                    scheduled += 1
+            except ValueError:
+                skipped += 1
+                log.warning("Not a trigger path, skipped: " + trigger)
+                continue
+            if run_here:
+                slots.acquire()
+                pool.submit(run_one)
+
+            now = time.monotonic()
+            if now - last_save >= 5.0:
+                save_replay_checkpoint(filename, triggers, index + 1)
+                last_save = now
+            if now - last_report >= 10.0:
+                progress(index + 1)
+                last_report = now
+        index = total
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+        if index >= total:
+            try:
+                os.remove(replay_checkpoint_path(filename))
+            except FileNotFoundError:
+                pass
+        else:
+            # resume from the trigger being handled when interrupted; enqueue is idempotent
+            save_replay_checkpoint(filename, triggers, index)
+
+    elapsed = time.monotonic() - started
+    print("Number of TriggerFiles Replayed --> " + str(scheduled) + " of " + str(total - start) +
+          " (" + str(skipped) + " skipped) in " + format_eta(elapsed))
+    log.info("Number of TriggerFiles Replayed --> " + str(scheduled) + " of " + str(total - start) +
+             " (" + str(skipped) + " skipped)")
+    return scheduled
+
+
+def parse_options(args):
+    """Options after the log file name (-d and the replay settings)."""
+
+    parser = argparse.ArgumentParser(prog="psws_triggerMANIP.py -FLAG log_file.txt", add_help=False)
+    parser.add_argument("-d", dest="delete_log", action="store_true")
+    parser.add_argument("--rate", type=float, default=float(os.getenv("REPLAY_RATE", "2")))
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("REPLAY_CONCURRENCY", "8")))
+    parser.add_argument("--priority", type=int, default=int(os.getenv("REPLAY_PRIORITY", "-10")))
+    parser.add_argument("--run", dest="run_here", action="store_true")
+    parser.add_argument("--restart", action="store_true")
+    return parser.parse_args(args)
 
 def main():
     # Checks for Flag and Log File
@@ -117,49 +316,58 @@ def main():
         LOG_FILE= argv[2]
         print("Log File: " + LOG_FILE)
     except(IndexError):
-        print("Usage: python3 psws_triggerMANIP.py -FLAG log_file.txt -d(optional)")
+        print("Usage: python3 psws_triggerMANIP.py -FLAG log_file.txt -d(optional) [replay options]")
         print("Use -h for all possible flags")
         return
     
-    # Checks for log deletion upon completion
-    try:
-        if(argv[3] == "-d"):
-            DELETE_LOG= True
-        else:
-            DELETE_LOG= False
-    except IndexError:
-        DELETE_LOG= False
+    # Checks for log deletion upon completion, and the replay settings
+    options = parse_options(argv[3:])
+    DELETE_LOG= options.delete_log
     
     TIMESTAMP = dt.now(timezone.utc).isoformat()[0:19]
     print("TriggerManip started at " + TIMESTAMP + " with flag " + FLAG)
-    log("TriggerManip started at " + TIMESTAMP + " with flag " + FLAG)
+    log.info("TriggerManip started at " + TIMESTAMP + " with flag " + FLAG)
     
-    # -r to Rerun trigger files not in db
+    # -r to Rerun trigger files not in db, through the ingest job queue
     if(FLAG == "-r"):
+        print("Replaying triggerfiles stored in file --> " + LOG_FILE)
+        log.info("Replaying triggerfiles stored in file --> " + LOG_FILE)
+        replay_triggers(LOG_FILE, options.rate, options.concurrency, options.priority,
+                        run_here=options.run_here, restart=options.restart)
+
+    # -x to Rerun trigger files by removing and recreating the directories
+    # (for watchers without the job queue)
+    elif(FLAG == "-x"):
         print("Deleting triggerfiles stored in file --> " + LOG_FILE)
-        log("Deleting triggerfiles stored in file --> " + LOG_FILE)
+        log.info("Deleting triggerfiles stored in file --> " + LOG_FILE)
         delete_triggers(LOG_FILE)
         print("Creating new triggerfiles from --> " + LOG_FILE)
-        log("Creating new triggerfiles from --> " + LOG_FILE)
+        log.info("Creating new triggerfiles from --> " + LOG_FILE)
         create_triggers(LOG_FILE)
     
     # -c to Clean up trigger files already in db
     elif(FLAG == "-c"):
         print("Deleting triggerfiles stored in file --> " + LOG_FILE)
-        log("Deleting triggerfiles stored in file --> " + LOG_FILE)
+        log.info("Deleting triggerfiles stored in file --> " + LOG_FILE)
         delete_triggers(LOG_FILE)
     
     # -h for Flag options
     elif(FLAG == "-h"):
-        print("-r \t Rerun Trigger Files")
+        print("-r \t Rerun Trigger Files through the ingest job queue (no mkdir/rmdir)")
+        print("   \t   --rate N         triggers per second (default 2, 0 = no limit)")
+        print("   \t   --concurrency N  queue backlog to wait for, or ingest threads with --run (default 8)")
+        print("   \t   --priority N     job priority (default -10, below live uploads)")
+        print("   \t   --run            ingest in this process instead of the running watcher")
+        print("   \t   --restart        ignore the checkpoint of an interrupted replay")
+        print("-x \t Rerun Trigger Files by recreating the trigger directories")
         print("-c \t Clean up Trigger Files")
         print("-d \t Delete Log File (add after filename)")
         print("-h \t Flag Help")
     
     # Handles Flag Usage Error
     else:
-        log("Flag Usage Error: " + FLAG + " not in options")
-        print("Usage: python3 psws_triggerMANIP.py -FLAG log_file.txt -d(optional)")
+        log.error("Flag Usage Error: " + FLAG + " not in options")
+        print("Usage: python3 psws_triggerMANIP.py -FLAG log_file.txt -d(optional) [replay options]")
         print("Use -h for all possible flags")
         return
     
@@ -168,7 +376,7 @@ def main():
         delete_log(LOG_FILE)
     
     print("TriggerMANIP Complete")
-    log("TriggerMANIP Complete")
+    log.info("TriggerMANIP Complete")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -22,19 +22,22 @@ import sys
 import time
 import glob
 import re
-import subprocess
 from pathlib import Path
 from datetime import datetime as dt
 from datetime import timezone
 
 import pytz
-import digital_rf as drf
 from dotenv import load_dotenv
-from watchdog.events import PatternMatchingEventHandler
+from watchdog.events import FileSystemEventHandler, PatternMatchingEventHandler
+from watchdog.observers import Observer
 from watchdog.observers.polling import PollingObserver
 
 REPO_ROOT = Path(__file__).resolve().parents[2]
 sys.path.insert(0, str(REPO_ROOT / "psws"))  # Add project root to sys.path
+# ingest and plotting functions are called in-process (see IngestPool)
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "plotters"))
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "ingest"))
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
 
 env_path = REPO_ROOT / "scripts" / "scripts.env"
 load_dotenv(dotenv_path=env_path)
@@ -42,316 +45,488 @@ bootstrap()
 
 
 LOG_PATH = os.getenv("LOG_PATH")
-PYTHON_EXECUTABLE = os.getenv("PYTHON_EXECUTABLE", sys.executable)
+# number of ingest worker threads and maximum number of queued triggers
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "256"))
+# "inotify" uses native filesystem events, "polling" re-stats every directory
+WATCH_MODE = os.getenv("WATCH_MODE", "inotify")
+# seconds between reconciliation sweeps for triggers missed by the observer
+RECONCILE_INTERVAL = int(os.getenv("RECONCILE_INTERVAL", "900"))
+# triggers older than this are left for the audit / psws_triggerMANIP
+RECONCILE_MAX_AGE_HOURS = int(os.getenv("RECONCILE_MAX_AGE_HOURS", "48"))
+# durable job queue; failed jobs are retried with exponential backoff
+INGEST_QUEUE_DB = os.getenv("INGEST_QUEUE_DB", "/psws/temp/ingest_queue.sqlite3")
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "5"))
+INGEST_RETRY_BACKOFF = float(os.getenv("INGEST_RETRY_BACKOFF", "30"))
+# running jobs older than this (seconds) are taken as abandoned and run again;
+# younger ones may belong to another process (psws_triggerMANIP.py -r --run)
+INGEST_STALE_AFTER = float(os.getenv("INGEST_STALE_AFTER", "21600"))
 
 if not LOG_PATH:
     raise EnvironmentError("LOG_PATH not set in scripts.env")
 
-print(f"Using Python executable: {PYTHON_EXECUTABLE}")
+import threading
+from _ingest_pool import IngestPool
+from _job_queue import JobQueue, parse_trigger
+from _script_log import get_logger
+# incremental, cached replacement for the old os.walk-based get_size
+from _dir_size_index import get_size
+from _drf_metadata import read_drf_metadata
+from psws_addOBS import add_obs
+from psws_addCSV import add_csv
+# plots are rendered by the plot service (plotters/psws_plotd.py)
+from _plot_queue import get_plot_queue
 
 
-def writeLog(theMessage):
-    timestamp = dt.now(timezone.utc).isoformat()[0:19]
-    f = open(LOG_PATH, "a")
-    f.write(timestamp + " " + theMessage + "\n")
-    f.close()
+log = get_logger("psws_watch10")
 
 
-def get_size(start_path):
-    total_size = 0
-    for dirpath, dirnames, filenames in os.walk(start_path):
-        for f in filenames:
-            fp = os.path.join(dirpath, f)
-            # skip if it is symbolic link
-            if not os.path.islink(fp):
-                total_size += os.path.getsize(fp)
-    return total_size
+def is_station_dir(name):
+    return name[:1] in ("T", "S", "N")
+
+
+def is_trigger_dir(name):
+    return name[:1] in ("c", "g", "m") and "_#" in name
+
+
+class WatchStats:
+    """Counters used to compare the polling and inotify watch modes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.sweeps = 0
+        self.sweep_entries = 0
+        self.sweep_seconds = 0.0
+        self.sweep_found = 0
+
+    def record_event(self, path):
+        # latency = time since the trigger directory was created (its mtime)
+        try:
+            latency = max(0.0, time.time() - os.stat(path).st_mtime)
+        except OSError:
+            latency = 0.0
+        with self.lock:
+            self.events += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def record_sweep(self, entries, seconds, found):
+        with self.lock:
+            self.sweeps += 1
+            self.sweep_entries += entries
+            self.sweep_seconds += seconds
+            self.sweep_found += found
+
+    def summary(self):
+        with self.lock:
+            avg = self.latency_total / self.events if self.events else 0.0
+            return ("events=%d latency_avg=%.2fs latency_max=%.2fs "
+                    "sweeps=%d sweep_entries=%d sweep_time=%.2fs missed_found=%d"
+                    % (self.events, avg, self.latency_max, self.sweeps,
+                       self.sweep_entries, self.sweep_seconds, self.sweep_found))
+
+
+def remove_trigger(src_path):
+    """Remove a processed trigger directory; replayed jobs may have none."""
+    try:
+        os.rmdir(src_path)
+        log.info("Removed directory:" + src_path)
+    except FileNotFoundError:
+        pass
+
+
+def kick_workers(queue, pool):
+    """Wake one pool worker per due job, without overfilling the pool queue."""
+    free = pool.free_slots()
+    due = queue.due_count() - pool.depth()
+    if free is not None:
+        due = min(due, free)
+    for _ in range(max(0, due)):
+        pool.submit(queue.run_next, process_trigger, log.warning)
 
 
 class UploadEvent(PatternMatchingEventHandler):
 
+    def __init__(self, pool, queue, stats=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = pool
+        self.queue = queue
+        self.stats = stats or WatchStats()
+
     def on_created(self, event):
+        if not event.is_directory:
+            return
         print('event!')
+        self.stats.record_event(event.src_path)
+        self.dispatch_trigger(event.src_path)
 
-        if event.src_path.rsplit('/')[-1] == 'm_Test':
+    def dispatch_trigger(self, src_path, priority=0):
+        """Record a trigger in the job queue; returns True if new work was scheduled."""
+        if src_path.rsplit('/')[-1] == 'm_Test':
             print("Test trigger seen!")
-            writeLog("Test file seen at  " + event.src_path)
-            print("Located at " + event.src_path)
-            os.rmdir(event.src_path)
-            print("Removed directory:" + event.src_path)
+            log.info("Test file seen at  " + src_path)
+            print("Located at " + src_path)
+            os.rmdir(src_path)
+            print("Removed directory:" + src_path)
             time.sleep(1)
-            return
-
-        # Begin by identifying if continuous or not
-        writeLog("trigger event:" + event.src_path)
-        print("UPLOAD trigger at local time: " + dt.now().isoformat())
+            return False
 
         try:
-            instrumentNo = event.src_path.split("_#")[1]
-            writeLog("Instrument number found at -> " +
-                     event.src_path.split("_#")[1])
-            print("Instrument number found at -> " +
-                  event.src_path.split("_#")[1])
-        except:
-            print("ERROR, parsing failure, the '_#' not found")
-            writeLog("ERROR - parsing failure, the '_#' not found")
-            return
+            scheduled = self.queue.enqueue(src_path, priority=priority)
+        except ValueError:
+            log.error("ERROR, parsing failure, the '_#' not found in " + src_path)
+            return False
 
-        writeLog("conditional string -> " + event.src_path.rsplit('/')[-1][0])
-
-        # processing for Grape 1 Legacy (G1L) (fldigi) upload
-        if event.src_path.rsplit('/')[-1][0] == 'g':
-            writeLog("processing Grape 1 Legacy trigger:" + event.src_path)
-            print('G1L trigger', event.src_path)
-            observation_no = event.src_path.rsplit(
-                '/')[-1][1:len(event.src_path)]
-            observation_no = observation_no.rsplit('_#')[0]
-            print("Observation#=" + observation_no)
-            writeLog("Observation#=" + observation_no)
-            path = "/".join(event.src_path.rsplit('/')
-                            [:-1]) + '/csvData/' + observation_no
-            writeLog("Path generated -> " + path)
-            obsSize = get_size(path)
-            stationID = observation_no.rsplit('_')[1]
-
-            # if this is the 8-character node number, remove the leading zero
-            if len(stationID) == 8:
-                stationID = stationID[0] + stationID[2:8]
-            writeLog("Station#=" + stationID)
-            print("StationID=", stationID)
-            instrumentID = event.src_path.rsplit('_#')[1]
-            writeLog("Instrument#=" + instrumentID)
-            trigger = event.src_path.rsplit('/')[4]
-            writeLog("trigger=" + trigger)
-
-            # Use PYTHON_EXECUTABLE environment variable
-            cmd = f'{PYTHON_EXECUTABLE} psws_addCSV.py {
-                path} {stationID} {instrumentID} {trigger}'
-            writeLog("call to psws_addCSV cmd=" + cmd)
-            print("psws_addCSV cmd:", cmd)
-            os.system(cmd)
-
-            # prepare command for plotting
-            cmd = f'{PYTHON_EXECUTABLE} plotfldigi1.py -f {
-                path} -e {event.src_path} -p /psws/psws/media/plots'
-            writeLog('plot command=' + cmd)
-            return
+        if scheduled:
+            # wake a worker; blocks while the pool queue is full
+            self.pool.submit(self.queue.run_next, process_trigger, log.warning)
+        return scheduled
 
-        # processing for Continuous type upload (Grape 1 DRF, including rx888)
-        if event.src_path.rsplit('/')[-1][0] == 'c':
-            writeLog("Processing trigger:" + event.src_path)
-            observation_no = event.src_path.rsplit('/')[-1][1:20]
-            path = "/".join(event.src_path.rsplit('/')
-                            [:-1]) + '/' + observation_no
-            print('path', path, 'observation no', observation_no)
-            writeLog("Path generated -> " + path)
-            obsSize = get_size(path)
-            print("Data size=", obsSize)
-
-            # prepare to get DRF metadata for inclusion into database
-            channelPath = path + "/ch0"
-            print("channel path=" + channelPath)
-            uploadType = 'c'
-            metadata_dir = channelPath + "/metadata"
-            start_idx = 0
 
-            try:
-                dmr = drf.DigitalMetadataReader(metadata_dir)
-                start_idx = dmr.get_bounds()[0]
-                print("Start:", start_idx)
-            except IOError as e:
-                writeLog(
-                    "IO error accessing digital metadata, path=" + metadata_dir)
-                writeLog(str(e))
-                return
+class StationDirEvent(FileSystemEventHandler):
+    """Starts watching station directories created after the watcher started."""
 
-            fields = dmr.get_fields()
-            writeLog("Available fields are <%s>" % (str(fields)))
-            print("Available DRF metadata fields are <%s>" % (str(fields)))
-            freq_list = []
-
-            # get list of center frequencies in this spectrum (often just 1)
-            data_dict = dmr.read(start_idx, start_idx +
-                                 2, "center_frequencies")
-            writeLog("Center freq list:")
-            for x in list(data_dict)[0:1]:
-                freq_list = data_dict[x]
-            print("Freq list:", freq_list)
-
-            print('sample_rate_numerator:', dmr.read(
-                start_idx, start_idx + 2, "sample_rate_numerator"))
-
-            s_r_dict = dmr.read(start_idx, start_idx + 2,
-                                "sample_rate_numerator")
-            fkey, fval = next(iter(s_r_dict.items()))
-            print('s_r_dict fkey fval', fkey, fval)
-            dataRate = fval
-
-            if not (os.path.isfile(channelPath + '/drf_properties.h5')):
-                writeLog("DRF Properties file missing!")
-                return
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
 
-            if not (os.path.exists(channelPath)):
-                writeLog(
-                    "Channel path does not exist! Might be issue with parsing of trigger file name.")
-                return
-
-            if not (os.path.exists(channelPath + '/metadata/dmd_properties.h5')):
-                writeLog("DMD Properties file missing!")
-                return
+    def on_created(self, event):
+        name = os.path.basename(event.src_path)
+        if event.is_directory and is_station_dir(name):
+            log.info("New station directory: " + event.src_path)
+            self.watcher.watch_station(event.src_path)
+            # anything uploaded before the watch was in place
+            self.watcher.sweep([event.src_path])
+
+
+class TriggerWatcher:
+    """
+    Watches every station directory under root for trigger directories.
+
+    The observer (inotify or polling) delivers new triggers; a low-frequency
+    reconciliation sweep catches triggers created while the watcher was down
+    or missed by the observer.
+    """
+
+    def __init__(self, root, pool, queue, mode=WATCH_MODE):
+        self.root = root
+        self.mode = mode
+        self.stats = WatchStats()
+        self.handler = UploadEvent(pool, queue, self.stats)
+        if mode == "polling":
+            self.observer = PollingObserver(timeout=10.0)
+        else:
+            self.observer = Observer()
+        self.stations = set()
+        self.lock = threading.Lock()
 
-            # Getting start time and end time
-            drf_data = drf.DigitalRFReader(path)
-            startDate, endDate = drf_data.get_bounds('ch0')
-            print("bounds:", startDate, endDate)
-            writeLog("Got Bounds")
-
-            # All needed fields for insertion
-            if uploadType == 'c':
-                centerFrequency = freq_list[0]
-            datapath = path
-            fileName = observation_no
-            station_id = path.rsplit('/')[-2]
-            print("startDate:", startDate)
-            print("dataRate:", dataRate)
-            myTimestamp = startDate / dataRate
-
-            startDate = dt.fromtimestamp(
-                myTimestamp, tz=pytz.UTC).strftime('%Y-%m-%dT%H:%M')
-            print("Start date:" + startDate)
-            myTimestamp = endDate / dataRate
-            endDate = dt.fromtimestamp(
-                myTimestamp, tz=pytz.UTC).strftime('%Y-%m-%dT%H:%M')
-            print("End date:" + endDate)
-
-            # Use PYTHON_EXECUTABLE
-            command = f"{PYTHON_EXECUTABLE} psws_addOBS.py {dataRate} {obsSize} {
-                fileName} {datapath} {station_id} {instrumentNo} {startDate} {endDate}"
-            for this_freq in freq_list:
-                command = command + " " + str(this_freq)
-
-            print("Issuing command:" + command)
-            writeLog("Issuing command:" + command)
-            args = command.split()
-            subprocess.run(args)
-            writeLog("Issued syscommand:" + command)
+    def station_dirs(self):
+        return [entry.path for entry in os.scandir(self.root)
+                if entry.is_dir() and is_station_dir(entry.name)]
 
+    def watch_station(self, path):
+        with self.lock:
+            if path in self.stations:
+                return
+            self.stations.add(path)
+        print("Watching:", path)
+        self.observer.schedule(self.handler, path, recursive=False)
+
+    def start(self):
+        for path in self.station_dirs():
+            self.watch_station(path)
+        # station directories created later
+        self.observer.schedule(StationDirEvent(self), self.root, recursive=False)
+        self.observer.start()
+
+    def stop(self):
+        self.observer.stop()
+        self.observer.join()
+
+    def sweep(self, station_dirs=None):
+        """Queue unprocessed trigger directories newer than RECONCILE_MAX_AGE_HOURS."""
+        started = time.monotonic()
+        cutoff = time.time() - RECONCILE_MAX_AGE_HOURS * 3600
+        entries = 0
+        found = 0
+        if station_dirs is None:
+            station_dirs = self.station_dirs()
+            for path in station_dirs:
+                self.watch_station(path)
+        for station_dir in station_dirs:
             try:
-                writeLog("Trigger graphing  program")
-                # Use PYTHON_EXECUTABLE for plotting
-                graph_command = f"ts {PYTHON_EXECUTABLE} /var/www/html/plotspectrum_v8.py -e {
-                    event.src_path} -p /psws/psws/media/plots"
-
-                writeLog("Running graph_command ----> " + graph_command)
-                os.system(graph_command)
-                writeLog("Graphing command run!")
-
-                # Removes target directory
-                os.rmdir(event.src_path)
-                writeLog("Removed directory:" + event.src_path)
-
-            except Exception as ex:
-                print("Exception: ", str(ex))
-                writeLog("Exception: " + str(ex))
-
-        # processing for "m" (magnetometer) type upload
-# processing for "m" (magnetometer) type upload
-        elif event.src_path.rsplit('/')[-1][0] == 'm':
-            try:
-                from apps.stations.models import Station
-            except ImportError:
-                from stations.models import Station
-            mag_dir = '/'.join(event.src_path.rsplit('/')[:-1]) + '/magData'
-            writeLog("Path generated -> " + mag_dir)
+                with os.scandir(station_dir) as it:
+                    for entry in it:
+                        entries += 1
+                        if not is_trigger_dir(entry.name) or not entry.is_dir():
+                            continue
+                        try:
+                            if entry.stat().st_mtime < cutoff:
+                                continue
+                        except OSError:
+                            continue
+                        if self.handler.dispatch_trigger(entry.path):
+                            found += 1
+                            log.info("Reconciliation queued missed trigger " + entry.path)
+            except OSError as e:
+                log.info("Reconciliation could not scan " + station_dir + ": " + str(e))
+        self.stats.record_sweep(entries, time.monotonic() - started, found)
+        return found
+
+
+def process_trigger(src_path):
+    """Ingest one upload trigger directory (runs on an IngestPool worker)."""
+    try:
+        _, trigger_station, trigger_instrument, _ = parse_trigger(src_path)
+        trigger_log = log.bind(trigger=src_path, station=trigger_station, instrument=trigger_instrument)
+    except ValueError:
+        trigger_log = log.bind(trigger=src_path)
+    # Begin by identifying if continuous or not
+    trigger_log.info("trigger event:" + src_path)
+    print("UPLOAD trigger at local time: " + dt.now().isoformat())
 
-            station_id = mag_dir.rsplit('/')[-2]
-            endDate = event.src_path[-16:]
+    try:
+        instrumentNo = src_path.split("_#")[1]
+        trigger_log.info("Instrument number found at -> " +
+                 src_path.split("_#")[1])
+        print("Instrument number found at -> " +
+              src_path.split("_#")[1])
+    except:
+        print("ERROR, parsing failure, the '_#' not found")
+        trigger_log.error("ERROR - parsing failure, the '_#' not found")
+        return
+
+    trigger_log.info("conditional string -> " + src_path.rsplit('/')[-1][0])
+
+    # processing for Grape 1 Legacy (G1L) (fldigi) upload
+    if src_path.rsplit('/')[-1][0] == 'g':
+        trigger_log.info("processing Grape 1 Legacy trigger:" + src_path)
+        print('G1L trigger', src_path)
+        observation_no = src_path.rsplit(
+            '/')[-1][1:len(src_path)]
+        observation_no = observation_no.rsplit('_#')[0]
+        print("Observation#=" + observation_no)
+        trigger_log.info("Observation#=" + observation_no)
+        path = "/".join(src_path.rsplit('/')
+                        [:-1]) + '/csvData/' + observation_no
+        trigger_log.info("Path generated -> " + path)
+        obsSize = get_size(path)
+        stationID = observation_no.rsplit('_')[1]
+
+        # if this is the 8-character node number, remove the leading zero
+        if len(stationID) == 8:
+            stationID = stationID[0] + stationID[2:8]
+        trigger_log.info("Station#=" + stationID)
+        print("StationID=", stationID)
+        instrumentID = src_path.rsplit('_#')[1]
+        trigger_log.info("Instrument#=" + instrumentID)
+        trigger = src_path.rsplit('/')[4]
+        trigger_log.info("trigger=" + trigger)
+
+        trigger_log.info("call to add_csv " + " ".join(
+            [path, stationID, instrumentID, trigger]))
+        add_csv(path, stationID, instrumentID, trigger)
+        return
+
+    # processing for Continuous type upload (Grape 1 DRF, including rx888)
+    if src_path.rsplit('/')[-1][0] == 'c':
+        trigger_log.info("Processing trigger:" + src_path)
+        observation_no = src_path.rsplit('/')[-1][1:20]
+        path = "/".join(src_path.rsplit('/')
+                        [:-1]) + '/' + observation_no
+        print('path', path, 'observation no', observation_no)
+        trigger_log.info("Path generated -> " + path)
+        obsSize = get_size(path)
+        print("Data size=", obsSize)
+
+        # prepare to get DRF metadata for inclusion into database
+        channelPath = path + "/ch0"
+        print("channel path=" + channelPath)
+        uploadType = 'c'
+        metadata_dir = channelPath + "/metadata"
+
+        if not (os.path.exists(channelPath)):
+            trigger_log.info(
+                "Channel path does not exist! Might be issue with parsing of trigger file name.")
+            return
 
-            try:
-                station_obj = Station.objects.filter(
-                    station_id=station_id).first()
-                if not station_obj:
-                    writeLog(f"ERROR: Station {station_id} not found.")
-                else:
-                    # Gather candidates
-                    candidates = glob.glob(os.path.join(mag_dir, "*.zip")) + \
-                        glob.glob(os.path.join(mag_dir, "*.csv")) + \
-                        glob.glob(os.path.join(mag_dir, "*.json"))
-
-                    for fpath in sorted(candidates):
-                        date_str = None
-                        m = re.search(r"(\d{4}-\d{2}-\d{2})",
-                                      os.path.basename(fpath))
-                        date_str = m.group(1) if m else endDate[0:10]
-
-                        # SUBPROCESS CALL STARTS HERE
-                        # Construct path to the plotmag script relative to REPO_ROOT
-                        plotmag_script = os.path.join(
-                            REPO_ROOT, "scripts", "plotters", "plotmag.py")
-
-                        plot_cmd = [
-                            PYTHON_EXECUTABLE,
-                            plotmag_script,
-                            fpath,
-                            "--station", station_id,
-                            "--date", date_str,
-                            "--lat", str(station_obj.latitude),
-                            "--long", str(station_obj.longitude),
-                            "--grid", station_obj.grid,
-                            "--nick", station_obj.nickname,
-                            "-i", instrumentNo
-                        ]
-
-                        writeLog(f"Executing: {' '.join(plot_cmd)}")
-
-                        # Run the script; capture=True allows you to log errors if it fails
-                        result = subprocess.run(
-                            plot_cmd, capture_output=True, text=True)
-
-                        if result.returncode != 0:
-                            writeLog(f"Plotting failed: {result.stderr}")
-                        else:
-                            writeLog(f"Plotting successful: {result.stdout}")
-
-            except Exception as e:
-                writeLog(f"ERROR in magnetometer processing: {str(e)}")
-
-            os.rmdir(event.src_path)
+        if not (os.path.isfile(channelPath + '/drf_properties.h5')):
+            trigger_log.info("DRF Properties file missing!")
             return
 
-        else:
-            writeLog("ERROR. Unrecognized upload type: " +
-                     event.src_path.rsplit('/')[-1][0])
+        if not (os.path.exists(channelPath + '/metadata/dmd_properties.h5')):
+            trigger_log.info("DMD Properties file missing!")
             return
 
+        # one metadata read and one bounds read, shared with the plotter via the cache
+        try:
+            meta = read_drf_metadata(path, "ch0")
+        except IOError as e:
+            trigger_log.info(
+                "IO error accessing digital metadata, path=" + metadata_dir)
+            trigger_log.info(str(e))
+            # upload may still be incomplete; let the job queue retry it
+            raise
+
+        trigger_log.info("Available fields are <%s>" % (str(meta.fields)))
+        print("Available DRF metadata fields are <%s>" % (str(meta.fields)))
+
+        # list of center frequencies in this spectrum (often just 1)
+        freq_list = meta.center_frequencies
+        print("Freq list:", freq_list)
+
+        dataRate = meta.sample_rate_numerator
+        print('sample_rate_numerator:', dataRate)
+
+        # Getting start time and end time
+        startDate, endDate = meta.start_sample, meta.end_sample
+        print("bounds:", startDate, endDate)
+        trigger_log.info("Got Bounds")
+
+        # All needed fields for insertion
+        if uploadType == 'c':
+            centerFrequency = freq_list[0]
+        datapath = path
+        fileName = observation_no
+        station_id = path.rsplit('/')[-2]
+        print("startDate:", startDate)
+        print("dataRate:", dataRate)
+        myTimestamp = startDate / dataRate
+
+        startDate = dt.fromtimestamp(
+            myTimestamp, tz=pytz.UTC).strftime('%Y-%m-%dT%H:%M')
+        print("Start date:" + startDate)
+        myTimestamp = endDate / dataRate
+        endDate = dt.fromtimestamp(
+            myTimestamp, tz=pytz.UTC).strftime('%Y-%m-%dT%H:%M')
+        print("End date:" + endDate)
+
+        args = [dataRate, obsSize, fileName, datapath, station_id,
+                instrumentNo, startDate, endDate]
+        trigger_log.info("call to add_obs " + " ".join(
+            str(a) for a in args + list(freq_list)))
+        add_obs(*args, freq_list=freq_list)
+        trigger_log.info("add_obs done for " + fileName)
 
-if __name__ == "__main__":
-    print("starting watchdog, v10 (corrected)")
-    writeLog("Watchdog 10 starting (corrected)")
+        try:
+            trigger_log.info("Queue spectrum plot for " + src_path)
+            get_plot_queue().submit("spectrum", src_path,
+                                    event_src_path=src_path,
+                                    plot_output_path="/psws/psws/media/plots")
+            trigger_log.info("Spectrum plot queued")
+
+            # Removes target directory
+            remove_trigger(src_path)
 
-    root = sys.argv[1] if len(sys.argv) > 1 else "/psws/home"
-    root = os.path.abspath(root)
+        except Exception as ex:
+            print("Exception: ", str(ex))
+            trigger_log.info("Exception: " + str(ex))
 
-    print("Starting watchdog (polling, non-recursive S*/N*/T*)")
-    writeLog("Watchdog polling starting at " + root)
+    # processing for "m" (magnetometer) type upload
+    elif src_path.rsplit('/')[-1][0] == 'm':
+        try:
+            from apps.stations.models import Station
+        except ImportError:
+            from stations.models import Station
+        mag_dir = '/'.join(src_path.rsplit('/')[:-1]) + '/magData'
+        trigger_log.info("Path generated -> " + mag_dir)
+
+        station_id = mag_dir.rsplit('/')[-2]
+        endDate = src_path[-16:]
 
-    observer = PollingObserver(timeout=10.0)
-    handler = UploadEvent()
+        try:
+            station_obj = Station.objects.filter(
+                station_id=station_id).first()
+            if not station_obj:
+                trigger_log.error(f"ERROR: Station {station_id} not found.")
+            else:
+                # Gather candidates
+                candidates = glob.glob(os.path.join(mag_dir, "*.zip")) + \
+                    glob.glob(os.path.join(mag_dir, "*.csv")) + \
+                    glob.glob(os.path.join(mag_dir, "*.json"))
+
+                for fpath in sorted(candidates):
+                    date_str = None
+                    m = re.search(r"(\d{4}-\d{2}-\d{2})",
+                                  os.path.basename(fpath))
+                    date_str = m.group(1) if m else endDate[0:10]
+
+                    trigger_log.info(f"Queue plot of {fpath} for {station_id} on {date_str}")
+
+                    get_plot_queue().submit(
+                        "magnetometer", fpath,
+                        path=fpath, station=station_id, date=date_str,
+                        lat=str(station_obj.latitude),
+                        lon=str(station_obj.longitude),
+                        grid=station_obj.grid, nick=station_obj.nickname,
+                        instrument_id=instrumentNo)
+
+        except Exception as e:
+            trigger_log.error(f"ERROR in magnetometer processing: {str(e)}")
+
+        remove_trigger(src_path)
+        return
+
+    else:
+        trigger_log.error("ERROR. Unrecognized upload type: " +
+                 src_path.rsplit('/')[-1][0])
+        return
 
-    # Watch each existing S*, N*, T* directory directly under /psws/home
-    for entry in os.scandir(root):
-        if entry.is_dir() and entry.name[0] in ("T", "S", "N"):
-            print("Watching:", entry.path)
-            observer.schedule(handler, entry.path, recursive=False)
 
-    observer.start()
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="PSWS upload trigger watcher")
+    parser.add_argument("root", nargs="?", default="/psws/home",
+                        help="directory holding the S*/N*/T* station directories")
+    parser.add_argument("--mode", choices=("inotify", "polling"), default=WATCH_MODE,
+                        help="observer type (default from WATCH_MODE)")
+    args = parser.parse_args()
+
+    print("starting watchdog, v10 (corrected)")
+    log.info("Watchdog 10 starting (corrected)")
+
+    root = os.path.abspath(args.root)
+
+    print("Starting watchdog (" + args.mode + ", non-recursive S*/N*/T*)")
+    log.info("Watchdog " + args.mode + " starting at " + root)
+
+    queue = JobQueue(INGEST_QUEUE_DB, max_attempts=INGEST_MAX_ATTEMPTS,
+                     backoff_base=INGEST_RETRY_BACKOFF)
+    recovered = queue.recover(stale_after=INGEST_STALE_AFTER)
+    if recovered:
+        log.info("Recovered %d interrupted ingest jobs" % recovered)
+    pool = IngestPool(workers=INGEST_WORKERS, maxsize=INGEST_QUEUE_SIZE,
+                      log=log.info).start()
+    watcher = TriggerWatcher(root, pool, queue, mode=args.mode)
+    watcher.start()
     print("observer started")
-    writeLog("Watchdog polling observer started")
+    log.info("Watchdog " + args.mode + " observer started")
+
+    # pick up anything uploaded while the watcher was down
+    watcher.sweep()
+    next_sweep = time.monotonic() + RECONCILE_INTERVAL
 
     try:
         while True:
             time.sleep(2)
+            # jobs recovered at startup or whose retry backoff has expired
+            kick_workers(queue, pool)
+            if time.monotonic() >= next_sweep:
+                recovered = queue.recover(stale_after=INGEST_STALE_AFTER)
+                if recovered:
+                    log.info("Recovered %d abandoned ingest jobs" % recovered)
+                watcher.sweep()
+                log.info("Watch stats: " + watcher.stats.summary() +
+                         " ingest: " + str(pool.stats()) +
+                         " queue: " + str(queue.metrics()))
+                next_sweep = time.monotonic() + RECONCILE_INTERVAL
     finally:
         print("Stopping observer")
-        observer.stop()
-        observer.join()
+        watcher.stop()
+        log.info("Watch stats: " + watcher.stats.summary())
+        print("Draining ingest pool")
+        pool.shutdown(wait=True)
@@ -26,13 +26,13 @@ from datetime import datetime as dt
 import numpy as np
 
 import os
+from pathlib import Path
 from urllib.parse import quote_plus
 
-def writeLog(theMessage):
-    timestamp = dt.now(timezone.utc).isoformat()[0:19]
-    f = open("/var/www/html/watchdog.log", "a")
-    f.write(timestamp + " " + theMessage + "\n")
-    f.close()
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from _script_log import get_logger, setup
+setup("/var/www/html/watchdog.log")
+log = get_logger("psws_watch8")
 
 def get_size(start_path):
     total_size = 0
@@ -53,7 +53,7 @@ class UploadEvent(PatternMatchingEventHandler):
         print('event')
         if event.src_path.rsplit('/')[-1] == 'm_Test':
             print("Test file seen!")
-            writeLog("Test file seen at  " + event.src_path)
+            log.info("Test file seen at  " + event.src_path)
             print("Located at " + event.src_path)
             os.rmdir(event.src_path)
             print("Removed directory:" + event.src_path)
@@ -61,21 +61,21 @@ class UploadEvent(PatternMatchingEventHandler):
             return
         #Begin by identifying if continuous or not
         #Then locating the path of the event
-        writeLog("trigger event:" + event.src_path)
+        log.info("trigger event:" + event.src_path)
         print("UPLOAD trigger at local time: " + dt.now().isoformat())
-        writeLog("parsed event 0=" + event.src_path.rsplit('/')[0] + ',1=' +event.src_path.rsplit('/')[1] + \
+        log.info("parsed event 0=" + event.src_path.rsplit('/')[0] + ',1=' +event.src_path.rsplit('/')[1] + \
              ',2=' + event.src_path.rsplit('/')[2] + ',3=' + event.src_path.rsplit('/')[3])
 
         try:
             instrumentNo = event.src_path.split("_#")[1] # this should be instrument_id in database
-            writeLog("Instrument number found at -> " + event.src_path.split("_#")[1])
+            log.info("Instrument number found at -> " + event.src_path.split("_#")[1])
         except:
             print("ERROR, parsing failure, the '_#' not found")
-            writeLog("ERROR - parsing failure, the '_#' not found")
+            log.error("ERROR - parsing failure, the '_#' not found")
             return
 
-        writeLog("conditional string -> " + event.src_path.rsplit('/')[-1][0])
-        writeLog("event.src_path.rsplit('/')[-1][0]='" + event.src_path.rsplit('/')[-1][0] +"'")
+        log.info("conditional string -> " + event.src_path.rsplit('/')[-1][0])
+        log.info("event.src_path.rsplit('/')[-1][0]='" + event.src_path.rsplit('/')[-1][0] +"'")
 
         # if event.src_path.rsplit('/')[-1][0] == 'd':  # processing for Data Request type upload
             # print("D!")
@@ -88,49 +88,49 @@ class UploadEvent(PatternMatchingEventHandler):
             #os.system(graph_command)
 
         if event.src_path.rsplit('/')[-1][0] == 'g': # processing for Grape 1 Legacy (fldigi) upload
-            writeLog("processing Grape 1 Legacy trigger:" + event.src_path)
+            log.info("processing Grape 1 Legacy trigger:" + event.src_path)
             observation_no = event.src_path.rsplit('/')[-1][1:len(event.src_path)] # get entire trigger
             observation_no = observation_no.rsplit('_#')[0] # get the filename in trigger
             print("Observation#=" + observation_no)
-            writeLog("Observation#=" + observation_no)
+            log.info("Observation#=" + observation_no)
             path =        "/".join(event.src_path.rsplit('/')[:-1]) + '/csvData/' + observation_no
-            writeLog("Path generated -> " + path)
+            log.info("Path generated -> " + path)
             obsSize = get_size(path)
             stationID = observation_no.rsplit('_')[1]
             # if this is the 8-character node number, remove the leading zero in the number
             # (This is normal for Grape 1 Legacy stations)
             if len(stationID) == 8:
                 stationID = stationID[0] + stationID[2:8]
-            writeLog("Station#=" + stationID)
+            log.info("Station#=" + stationID)
             print("StationID=",stationID)
             instrumentID = event.src_path.rsplit('_#')[1]
-            writeLog("Instrument#=" + instrumentID)
+            log.info("Instrument#=" + instrumentID)
             if event.src_path.rsplit('/')[3][0] == 'g':
                trigger = event.src_path.rsplit('/')[3]  # this is non-jailed account
             else:
                trigger = event.src_path.rsplit('/')[6] # this is jailed account
-            writeLog("trigger=" + trigger)
+            log.info("trigger=" + trigger)
             # for calling addCSV, arguments are: (1) path, (2) station_id, (3) instrument, (4) trigger
             cmd = '/opt/venv311/bin/python3 psws_addCSV.py ' + path + " " + stationID + \
                 " " + instrumentID + " " + trigger
-            writeLog("call to psws_addCSV cmd=" + cmd)
+            log.info("call to psws_addCSV cmd=" + cmd)
             print("psws_addCSV cmd:",cmd)
             os.system(cmd)
             # prepare command for plotting
          #   cmd = 'python3 plotfldigi1.py -f ' + path + ' -e ' + event.src_path + \
           #        ' -p /var/www/html/PSWS/static/PSWS/media'
-          #  writeLog('plot command=' + cmd)
+          #  log.info('plot command=' + cmd)
             return
 
         if event.src_path.rsplit('/')[-1][0] == 'c': # processing for Continuous type upload (Grape 1 DRF)
           #  print("C! path=" + event.src_path)
-            writeLog("Processing trigger:" + event.src_path)
+            log.info("Processing trigger:" + event.src_path)
             observation_no = event.src_path.rsplit('/')[-1][1:20]
             # path = "/" + event.src_path.rsplit('/')[1] + "/" +  event.src_path.rsplit('/')[2] \
             #        +  "/" + observation_no
             #path = "/" + "/".join(event.src_path.rsplit('/')[:-1]) + '/' + observation_no # WDE replaced by the following
             path =        "/".join(event.src_path.rsplit('/')[:-1]) + '/' + observation_no
-            writeLog("Path generated -> " + path)
+            log.info("Path generated -> " + path)
             obsSize = get_size(path)
             print("Data size=", obsSize)
             # prepare to get DRF metadata for inclusion into database
@@ -144,34 +144,34 @@ class UploadEvent(PatternMatchingEventHandler):
               start_idx = dmr.get_bounds()[0]
     #          print("Start:" , start_idx)
             except IOError as e:
-              writeLog("IO error accessing digital metadata, path=" + metadata_dir)
-              writeLog(str(e))
+              log.info("IO error accessing digital metadata, path=" + metadata_dir)
+              log.info(str(e))
               #print("IO error accessing digital metadata")
               return
             fields = dmr.get_fields()
-            #writeLog("Available fields are <%s>" % (str(fields)))
+            #log.info("Available fields are <%s>" % (str(fields)))
             freq_list = []
             # get list of center frequencies in this spectrum (often just 1)
             data_dict = dmr.read(start_idx, start_idx + 2, "center_frequencies")
-            #writeLog("Center freq list:")
+            #log.info("Center freq list:")
             for x in list(data_dict)[0:1]:
-                #writeLog("key{}, val{}:".format(x, data_dict[x]))
+                #log.info("key{}, val{}:".format(x, data_dict[x]))
                 freq_list = data_dict[x]
             #print("Freq list:", freq_list)
 
             # GRAPHING COMMAND
             if not (os.path.isfile(channelPath + '/drf_properties.h5')):
-                writeLog("DRF Properties file missing!")
+                log.info("DRF Properties file missing!")
                 return
             # EMERGENCY CHNAGE TO PREVENT s000123 from crashing watchdog
             if not (os.path.exists(channelPath)):
-                writeLog("Channel path does not exist! Might be issue with parsing of trigger file name.")
+                log.info("Channel path does not exist! Might be issue with parsing of trigger file name.")
                 return
             if not (os.path.exists(channelPath + '/metadata/dmd_properties.h5')):
-                writeLog("DMD Properties file missing!")
+                log.info("DMD Properties file missing!")
                 return
             try:
-                writeLog("Trigger graphing  program")
+                log.info("Trigger graphing  program")
                 # This uses task spooler (ts) to make multiple plot jobs run in a queue
                 graph_command = "ts /opt/venv311/bin/python3 /var/www/html/plotspectrum_v8.py -e " + event.src_path + " -p /psws/psws/media/plots" 
             #    graph_command = "ts /home/N000004/virtualenvs/dev/bin/python3 /var/www/html/plotspectrum_v7.py -e " + event.src_path + " -p /var/www/html/PSWS/static/PSWS/plots" 
@@ -179,13 +179,13 @@ class UploadEvent(PatternMatchingEventHandler):
                 #graph_command = "/home/N000004/virtualenvs/dev/bin/python3 /var/www/html/plotspectrum_v7.py -e " + event.src_path + " -p /var/www/html/PSWS/static/PSWS/plots | at -q b -m now & "
                 # graph_command = subprocess.Popen(['/home/N000004/virtualenvs/dev/bin/python3', '/var/www/html/plotspectrum_v7.py', '-e', event.src_path, '-p', '/var/www/html/PSWS/static/PSWS/plots'])
 
-                writeLog("Running graph_command ----> " + graph_command)
+                log.info("Running graph_command ----> " + graph_command)
                 os.system(graph_command)
-                # writeLog(graph_command.stdout)
-                writeLog("Graphing command run!")
+                # log.info(graph_command.stdout)
+                log.info("Graphing command run!")
             except Exception as ex:
                 print("Exception: ", str(ex))
-                writeLog("Exception: " + str(ex))
+                log.info("Exception: " + str(ex))
 
 
         elif event.src_path.rsplit('/')[-1][0] == 'm': # processing for "m" (magnetometer) type upload
@@ -194,7 +194,7 @@ class UploadEvent(PatternMatchingEventHandler):
             # path = "/" + event.src_path.rsplit('/')[1] + "/" +  event.src_path.rsplit('/')[2] + "/magData/"
             #path = "/" + '/'.join(event.src_path.rsplit('/')[:-1]) + '/magData'  # WDE replaced with following
             path =        '/'.join(event.src_path.rsplit('/')[:-1]) + '/magData'
-            writeLog("Path generated -> " + path)
+            log.info("Path generated -> " + path)
             obsSize = get_size(path)
             station_id = path.rsplit('/')[-2]
             #dataRate = 1 # one rec per second
@@ -222,7 +222,7 @@ class UploadEvent(PatternMatchingEventHandler):
             #    command = command + str(this_freq) + " "
             print("Issuing command: " + command)
             # os.system(command)
-            writeLog("Issued syscommand:" + command)
+            log.info("Issued syscommand:" + command)
             
             # Using venv instead of os.system
             args = list(command.split(" "))
@@ -230,11 +230,11 @@ class UploadEvent(PatternMatchingEventHandler):
 
             # Removes target directory
             os.rmdir(event.src_path)
-            writeLog("Removed directory:" + event.src_path)
+            log.info("Removed directory:" + event.src_path)
             return
 
         else:
-            writeLog("ERROR. Unrecognized upload type: " + event.src_path.rsplit('/')[-1][0] )
+            log.error("ERROR. Unrecognized upload type: " + event.src_path.rsplit('/')[-1][0] )
          #   print   ("Error! Unrecognized upload type: " + event.src_path.rsplit('/')[-1][0] )
             return
 
@@ -249,7 +249,7 @@ class UploadEvent(PatternMatchingEventHandler):
             # datapath = '/' + event.src_path.rsplit('/')[1] + '/' + event.src_path.rsplit('/')[2] + '/tangerine_data/'
             # print('datapath:'+datapath)
             datapath = '/'.join(event.src_path.rsplit('/')[:-1]) + '/tangerine_data/'
-            writeLog("Path generated -> " + datapath)
+            log.info("Path generated -> " + datapath)
             #Grep for upload in the folder using the stripped rID
             rawfile = subprocess.check_output('ls ' + datapath + ' | grep d' + rID + '.tar', shell=True)
             #Decode output from bytestring and strip newline
@@ -274,22 +274,22 @@ class UploadEvent(PatternMatchingEventHandler):
             tar_file = observation_no
             
         #Scrape the metadata from the properties files
-        writeLog("Scraping metadata!")
+        log.info("Scraping metadata!")
         if (os.path.isfile(channelPath + '/drf_properties.h5')):
             fp = h5py.File(channelPath + '/drf_properties.h5','r')  # WDE added 'r'
         else:
-            writeLog("Cannot find metadata!")
+            log.info("Cannot find metadata!")
             return
         if uploadType == 'd':  # this will be obsolete if all uploads standardize on digital_metadata
             afp = h5py.File(channelPath + '/aux_drf_properties.h5')
-        writeLog("Successfully scraped metadata!")
+        log.info("Successfully scraped metadata!")
         
         # Getting start time and end time
         drf_data = drf.DigitalRFReader(path)
         startDate, endDate = drf_data.get_bounds('ch0')
         print("bounds:", startDate, endDate)
-        writeLog("Got Bounds")
-        # writeLog("bounds: " + startDate + " " + endDate)
+        log.info("Got Bounds")
+        # log.info("bounds: " + startDate + " " + endDate)
         # Converting from Unix time to datetime
 
         #All needed fields for insertion
@@ -319,21 +319,21 @@ class UploadEvent(PatternMatchingEventHandler):
             command = command + str(this_freq) + " "
         
         print   ("Issuing command:" + command)
-        writeLog("Issuing command:" + command)
+        log.info("Issuing command:" + command)
         # os.system(command)
         args = list(command.split(" "))
         subprocess.run(args)
-        # writeLog("Issued syscommand:" + command)
+        # log.info("Issued syscommand:" + command)
 
         # Removes target directory
         os.rmdir(event.src_path)
-        writeLog("Removed directory:" + event.src_path)
+        log.info("Removed directory:" + event.src_path)
 
 ##############################################################################################################################
 
 if __name__ == "__main__":
     print("starting watchdog, v10")
-    writeLog("Watchdog triggered")
+    log.info("Watchdog triggered")
      
     path = sys.argv[1] if len(sys.argv) > 1 else '/home'
 
@@ -350,7 +350,7 @@ if __name__ == "__main__":
     observer.schedule(event_handler, path, recursive=True)
     observer.start()
     print("observer started")
-    writeLog("Starting watchdog, v8")
+    log.info("Starting watchdog, v8")
     try:
         while True:
         #    print("waiting")
@@ -36,16 +36,10 @@ ROOT = Path(sys.argv[1] if len(sys.argv) > 1 else "/home")
 
 TRIGGER_NAMES = {"m", "t", "g", "c", "m_Test"}
 
-'''
-def writeLog(msg):
-    print(msg, flush=True)  # replace with your real logger
-'''
-def writeLog(theMessage):
-    print("log:",theMessage)
-    timestamp = dt.now(timezone.utc).isoformat()[0:19]
-    f = open("/var/log/watchdog/watchdog.log", "a")
-    f.write(timestamp + " " + theMessage + "\n")
-    f.close()
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from _script_log import get_logger, setup
+setup("/var/log/watchdog/watchdog.log")
+log = get_logger("psws_watch9")
 
 def get_size(start_path): # Calculate size of directory containing observation
     total_size = 0
@@ -74,68 +68,68 @@ class TriggerDirHandler(FileSystemEventHandler):
         if event.is_directory:
             leaf = os.path.basename(event.src_path)
             if leaf in TRIGGER_NAMES or leaf[0] in TRIGGER_NAMES:
-                writeLog(f"[TRIGGER] {event.src_path} created under {self.parent_path}")
+                log.info(f"[TRIGGER] {event.src_path} created under {self.parent_path}")
  
    # Process a test trigger; if it is m_Test, delete is, else leave it.
                 if event.src_path.rsplit('/')[-1] == 'm_Test':
                     print("Test file seen!")
-                    writeLog("Test file seen at  " + event.src_path)
+                    log.info("Test file seen at  " + event.src_path)
                     print("Located at " + event.src_path)
                     os.rmdir(event.src_path)
                     print("Removed directory:" + event.src_path)
                     return
  
                 print("UPLOAD trigger at local time: " + dt.now().isoformat())
-                writeLog("parsed event 0=" + event.src_path.rsplit('/')[0] + ',1=' +event.src_path.rsplit('/')[1] + \
+                log.info("parsed event 0=" + event.src_path.rsplit('/')[0] + ',1=' +event.src_path.rsplit('/')[1] + \
 
                   ',2=' + event.src_path.rsplit('/')[2] + ',3=' + event.src_path.rsplit('/')[3])
    
   # Now we have trigger directory; does it contain an instrument number?
                 try:
                     instrumentNo = event.src_path.split("_#")[1] # this should be instrument_>
-                    writeLog("Instrument number found at -> " + event.src_path.split("_#")[1])
+                    log.info("Instrument number found at -> " + event.src_path.split("_#")[1])
                 except:
                     print("ERROR, parsing failure, the '_#' not found")
-                    writeLog("ERROR - parsing failure, the '_#' not found")
+                    log.error("ERROR - parsing failure, the '_#' not found")
                     return
 
                 if event.src_path.rsplit('/')[-1][0] == 'g': # processing for Grape 1 Legacy (fldigi) upload
-                    writeLog("processing Grape 1 Legacy trigger:" + event.src_path)
+                    log.info("processing Grape 1 Legacy trigger:" + event.src_path)
                     observation_no = event.src_path.rsplit('/')[-1][1:len(event.src_path)] # get entire trigger
                     observation_no = observation_no.rsplit('_#')[0] # get the filename in trigger
                     print("Observation#=" + observation_no)
-                    writeLog("Observation#=" + observation_no)
+                    log.info("Observation#=" + observation_no)
                     path =        "/".join(event.src_path.rsplit('/')[:-1]) + '/csvData/' + observation_no
-                    writeLog("Path generated -> " + path)
+                    log.info("Path generated -> " + path)
                     obsSize = get_size(path)  
                     stationID = observation_no.rsplit('_')[1]
                     # if this is the 8-character node number, remove the leading zero in the number
                     # (This is normal for Grape 1 Legacy stations)
                     if len(stationID) == 8:   
                         stationID = stationID[0] + stationID[2:8]
-                    writeLog("Station#=" + stationID)
+                    log.info("Station#=" + stationID)
                     print("StationID=",stationID)
                     instrumentID = event.src_path.rsplit('_#')[1]
-                    writeLog("Instrument#=" + instrumentID)
+                    log.info("Instrument#=" + instrumentID)
                     if event.src_path.rsplit('/')[3][0] == 'g':
                        trigger = event.src_path.rsplit('/')[3]  # this is non-jailed account
                     else:                     
                        trigger = event.src_path.rsplit('/')[6] # this is jailed account
-                    writeLog("trigger=" + trigger)
+                    log.info("trigger=" + trigger)
                     # for calling addCSV, arguments are: (1) path, (2) station_id, (3) instrument, (4) trigger
                     cmd = '/opt/venv311/bin/python3 /var/www/html/psws_addCSV.py ' + path + " " + stationID + \
                         " " + instrumentID + " " + trigger
-                    writeLog("call to psws_addCSV cmd=" + cmd)
+                    log.info("call to psws_addCSV cmd=" + cmd)
                     print("psws_addCSV cmd:",cmd)
                     os.system(cmd)            
                     return
 
 
                 if event.src_path.rsplit('/')[-1][0] == 'c': # processing for Continuous type upload (Grape 1 DRF)
-                    writeLog("Processing trigger:" + event.src_path)
+                    log.info("Processing trigger:" + event.src_path)
                     observation_no = event.src_path.rsplit('/')[-1][1:20]
                     path =        "/".join(event.src_path.rsplit('/')[:-1]) + '/' + observation_no
-                    writeLog("Path generated -> " + path)
+                    log.info("Path generated -> " + path)
                     obsSize = get_size(path)
                     print("Data size=", obsSize)
                     # prepare to get DRF metadata for inclusion into database
@@ -149,8 +143,8 @@ class TriggerDirHandler(FileSystemEventHandler):
                       start_idx = dmr.get_bounds()[0]
                       print("Start:" , start_idx)
                     except IOError as e:
-                      writeLog("IO error accessing digital metadata, path=" + metadata_dir)
-                      writeLog(str(e))
+                      log.info("IO error accessing digital metadata, path=" + metadata_dir)
+                      log.info(str(e))
                       print("IO error accessing digital metadata")
                       return
                     fields = dmr.get_fields()
@@ -158,19 +152,19 @@ class TriggerDirHandler(FileSystemEventHandler):
                     # get list of center frequencies in this spectrum (often just 1)
                     data_dict = dmr.read(start_idx, start_idx + 2, "center_frequencies")
                     for x in list(data_dict)[0:1]:
-                         #writeLog("key{}, val{}:".format(x, data_dict[x]))
+                         #log.info("key{}, val{}:".format(x, data_dict[x]))
                         print("key{}, val{}:".format(x, data_dict[x]))
                         freq_list = data_dict[x]
                     # GRAPHING COMMAND
                     if not (os.path.isfile(channelPath + '/drf_properties.h5')):
-                        writeLog("DRF Properties file missing!")
+                        log.info("DRF Properties file missing!")
                         return
                     # EMERGENCY CHNAGE TO PREVENT s000123 from crashing watchdog
                     if not (os.path.exists(channelPath)):
-                        writeLog("Channel path does not exist! Might be issue with parsing of trigger file name.")
+                        log.info("Channel path does not exist! Might be issue with parsing of trigger file name.")
                         return
                     if not (os.path.exists(channelPath + '/metadata/dmd_properties.h5')):
-                        writeLog("DMD Properties file missing!")
+                        log.info("DMD Properties file missing!")
                         return
 
 # Add OBS to database section
@@ -178,24 +172,24 @@ class TriggerDirHandler(FileSystemEventHandler):
                     size = 0
                     tar_file = observation_no
                     #Scrape the metadata from the properties files
-                    writeLog("Scraping metadata!")
+                    log.info("Scraping metadata!")
                     if (os.path.isfile(channelPath + '/drf_properties.h5')):
                         fp = h5py.File(channelPath + '/drf_properties.h5','r')
                     else:
-                        writeLog("Cannot find metadata!")
+                        log.info("Cannot find metadata!")
                         return
                     if uploadType == 'd':  # this will be obsolete if all uploads standardize on digital_metadata
                         afp = h5py.File(channelPath + '/aux_drf_properties.h5')
-                    writeLog("Successfully scraped metadata!")
+                    log.info("Successfully scraped metadata!")
                     # Getting start time and end time
                     drf_data = drf.DigitalRFReader(path)
                     startDate, endDate = drf_data.get_bounds('ch0')
                     print("bounds:", startDate, endDate)
-                    writeLog("Got Bounds")
+                    log.info("Got Bounds")
                     #All needed fields for insertion
                     dataRate = fp.attrs.get('sample_rate_numerator')
                     if type(dataRate) == None:
-                        writeLog('sample_rate_numerator not found in metadata; skipping record')
+                        log.info('sample_rate_numerator not found in metadata; skipping record')
                         print('sample_rate_numerator not found; skip')
                         return 
                     if uploadType == 'c': # is sample_rate numerator a float or a list
@@ -208,17 +202,17 @@ class TriggerDirHandler(FileSystemEventHandler):
                     station_id = path.rsplit('/')[-2]
                     if dataRate is None:
                         print("sample_rate_numerator not found")
-                        writeLog('sample_rate_numerator not found, skipping')
+                        log.info('sample_rate_numerator not found, skipping')
                         return
                     if startDate is None:
-                        writeLog('startDate missing, skipping')
+                        log.info('startDate missing, skipping')
                         return
                     print("startDate:",startDate)
                     print("dataRate:",dataRate)
                     try:
                         myTimestamp = startDate / dataRate
                     except:
-                        writeLog('Bad/missing dataRate in metadata, skipping')
+                        log.info('Bad/missing dataRate in metadata, skipping')
                         return
                     startDate = dt.fromtimestamp(myTimestamp, tz=pytz.UTC).strftime('%Y-%m-%dT%H:%M')
                     print("Start date:" + startDate)
@@ -240,12 +234,12 @@ class TriggerDirHandler(FileSystemEventHandler):
                         for this_freq in freq_list:
                             command = command + str(this_freq) + " "
                     print   ("Issuing command:" + command)
-                    writeLog("Issuing command:" + command)
+                    log.info("Issuing command:" + command)
                     args = list(command.split(" "))
                     subprocess.run(args)
                     # Removes target directory
                     os.rmdir(event.src_path)
-                    writeLog("Removed directory:" + event.src_path)
+                    log.info("Removed directory:" + event.src_path)
 
 # End of database section
 
@@ -253,17 +247,17 @@ class TriggerDirHandler(FileSystemEventHandler):
 
 
                     try:
-                        writeLog("Trigger graphing  program")
+                        log.info("Trigger graphing  program")
                         # This uses task spooler (ts) to make multiple plot jobs run in a queue
                         graph_command = "ts /opt/venv311/bin/python3 /var/www/html/plotspectrum_v8.py -e " + \
                             event.src_path  # plot path will be set in plotspectrum
-                        writeLog("Running graph_command ----> " + graph_command)
+                        log.info("Running graph_command ----> " + graph_command)
                         os.system(graph_command)
-                        # writeLog(graph_command.stdout)
-                        writeLog("Graphing command run!")
+                        # log.info(graph_command.stdout)
+                        log.info("Graphing command run!")
                     except Exception as ex:
                         print("Exception: ", str(ex))
-                        writeLog("Exception: " + str(ex))
+                        log.info("Exception: " + str(ex))
 
 
 
@@ -271,7 +265,7 @@ class TriggerDirHandler(FileSystemEventHandler):
                     observation_no = event.src_path.rsplit('/')[-1][1:20]
                     print("path from watchdog:" + event.src_path)
                     path =        '/'.join(event.src_path.rsplit('/')[:-1]) + '/magData'
-                    writeLog("Path generated -> " + path)
+                    log.info("Path generated -> " + path)
                     obsSize = get_size(path)
                     station_id = path.rsplit('/')[-2]
                     endDate = event.src_path[-16:]  # get the last 16 char of the trigger, this is timestamp of the upload
@@ -289,7 +283,7 @@ class TriggerDirHandler(FileSystemEventHandler):
                               station_id + " " + instrumentNo + " "  + endDate
                     print("Issuing command: " + command)
                     # os.system(command)
-                    writeLog("Issued syscommand:" + command)
+                    log.info("Issued syscommand:" + command)
 
                     # Using venv instead of os.system
                     args = list(command.split(" "))
@@ -297,11 +291,11 @@ class TriggerDirHandler(FileSystemEventHandler):
 
                     # Removes target directory
                     os.rmdir(event.src_path)
-                    writeLog("Removed directory:" + event.src_path)
+                    log.info("Removed directory:" + event.src_path)
                     return
 
                 else:
-                    writeLog("ERROR. Unrecognized upload type: " + event.src_path.rsplit('/')[-1][0] )
+                    log.error("ERROR. Unrecognized upload type: " + event.src_path.rsplit('/')[-1][0] )
                     return
 
 
@@ -317,7 +311,7 @@ class RootHandler(FileSystemEventHandler):
         if event.is_directory:
             name = os.path.basename(event.src_path)
             if is_parent_of_interest(name):
-                writeLog(f"[PARENT-NEW] {event.src_path} — adding trigger watch")
+                log.info(f"[PARENT-NEW] {event.src_path} — adding trigger watch")
                 self.observer.schedule(TriggerDirHandler(Path(event.src_path)),
                                        event.src_path, recursive=False)
 
@@ -326,17 +320,17 @@ def add_existing_parents(observer, root: Path):
     for child in root.iterdir():
         try:
             if child.is_dir() and is_parent_of_interest(child.name):
-                writeLog(f"[PARENT-EXISTING] {child} — adding trigger watch")
+                log.info(f"[PARENT-EXISTING] {child} — adding trigger watch")
                 observer.schedule(TriggerDirHandler(child), str(child), recursive=False)
         except PermissionError:
-            writeLog(f"[WARN] permission denied scanning {child}")
+            log.info(f"[WARN] permission denied scanning {child}")
 
 
 
 ######################################################################################
 if __name__ == "__main__":
     print("starting watchdog (polling), V10")
-    writeLog(f"Watching ROOT: {ROOT} (exists={ROOT.is_dir()})")
+    log.info(f"Watching ROOT: {ROOT} (exists={ROOT.is_dir()})")
 
     observer = PollingObserver(timeout=5.05)  # polling loop; tune timeout if desired
 
@@ -348,7 +342,7 @@ if __name__ == "__main__":
     add_existing_parents(observer, ROOT)
 
     observer.start()
-    writeLog("Polling observer started")
+    log.info("Polling observer started")
 
     try:
         while True:
@@ -356,6 +350,6 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         pass
     finally:
-        writeLog("Stopping observer…")
+        log.info("Stopping observer…")
         observer.stop()
         observer.join()
@@ -31,6 +31,8 @@ from .tokens import account_activation_token
 from .models import Profile
 from .tables import UserTable
 from apps.stations.models import Station
+from apps.stations.status import refresh_station_status_if_due
+from apps.stations.station_map import station_map_json
 
 from apps.observations.models import Observation
 from apps.observations.tables import ObservationTable
@@ -41,50 +43,23 @@ logger = logging.getLogger(__name__)
 
 from datetime import datetime, timedelta, timezone
 
-# Station Status Cutoffs
-ONLINE_CUT_OFF_HOURS = settings.ONLINE_CUT_OFF_HOURS
-POSSIBLY_ONLINE_CUT_OFF_HOURS = settings.POSSIBLY_ONLINE_CUT_OFF_HOURS
-RETIREMENT_CUT_OFF_HOURS = settings.RETIREMENT_CUT_OFF_HOURS
 
 # Activation Log Path
 ACCOUNT_ACTIVATION_LOG_PATH=settings.ACCOUNT_ACTIVATION_LOG_PATH
 
 
 def updateStatus():
-    #Update Station status of all stations before displaying
-    AliveCutoff = datetime.now(timezone.utc) - timedelta(hours=ONLINE_CUT_OFF_HOURS)
-    DeadCutoff = datetime.now(timezone.utc) - timedelta(hours=POSSIBLY_ONLINE_CUT_OFF_HOURS)
-    RetiredCutoff = datetime.now(timezone.utc) - timedelta(hours=RETIREMENT_CUT_OFF_HOURS)
-
-    for instance in Station.objects.all():
-        if (instance.last_alive is None):
-            instance.last_alive = datetime(2000,1,1,tzinfo=timezone.utc)
-        if (instance.last_alive < RetiredCutoff):
-            instance.station_status = "Retired"
-        elif (instance.last_alive < DeadCutoff):
-            instance.station_status = "Offline"
-        elif (instance.last_alive < AliveCutoff):
-            instance.station_status = "PossiblyOnline"
-        else:
-            instance.station_status = "Online"
-       # if station has never submitted an upload, they are marked inactive and won't show on map
-        if (instance.last_alive == datetime(2000,1,1,tzinfo=timezone.utc)):
-            instance.station_status = "Inactive"
-        instance.save()
+    #Update Station status of all stations before displaying: one bulk UPDATE,
+    #at most once per STATION_STATUS_REFRESH_SECONDS (see apps/stations/status.py)
+    # if station has never submitted an upload, they are marked inactive and won't show on map
+    refresh_station_status_if_due()
 
 def home(request):
     updateStatus()
-    online_stations = Station.objects.filter(station_status="Online") 
-    possiblyonline_stations = Station.objects.filter(station_status="PossiblyOnline")
-    offline_stations = Station.objects.filter(station_status="Offline")
-    retired_stations = Station.objects.filter(station_status="Retired")
-
+    # stations grouped by status, as cached JSON (see apps/stations/station_map.py)
     return render(request, 'home.html',
       { 'mapbox_access_token' : settings.MAPBOX_ACCESS_TOKEN,
-          'online_stations' : online_stations,
-          'possiblyonline_stations' : possiblyonline_stations,
-          'offline_stations' : offline_stations,
-	        'retired_stations' : retired_stations,
+          'station_map' : station_map_json(),
         } )
 
 @login_required
@@ -0,0 +1,358 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Magnetometer data access for the analysis pages and the plotters.
+
+read_mag_frame() recognises the log formats stations have uploaded (JSON
+lines, quoted CSV with or without the lTemp column, "Key: value" lines) and
+parses a file in one pass with pandas. load_mag_file() turns that into a
+typed frame indexed by UTC time.
+
+Ingest (psws_addMAG) writes a day product per station, instrument and day
+file with write_day_products(): 1-minute and 10-minute mean / min / max and NaN
+counts of Bx, By, Bz and temperature, as a compressed .npz under
+MAG_PRODUCTS_PATH, laid out like the spectrum products
+
+    MAG_PRODUCTS_PATH/<station>/<instrument>/<station>_<instrument>_<YYYY-MM-DD>_mag.npz
+
+holding, for each resolution r in RESOLUTIONS, r_time, r_count and
+r_<Bx|By|Bz|temp>_<mean|min|max|nan>.
+
+Views work on 1-minute means. station_minutes() selects a station's files
+for a time window in SQL and takes each day from its product; files without
+one fall back to minute_aggregates(), which computes the means from the raw
+file and keeps them in MAG_AGGREGATE_CACHE_DIR keyed by the file's path,
+size and mtime.
+"""
+import glob
+import hashlib
+import io
+import os
+import re
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from django.conf import settings
+
+# column names by number of fields in a CSV line
+CSV_COLUMNS = {
+    10: ['ts', 'rt', 'lt', 'x', 'y', 'z', 'rx', 'ry', 'rz', 'Tm'],
+    9: ['ts', 'rt', 'x', 'y', 'z', 'rx', 'ry', 'rz', 'Tm'],
+}
+# keys of the "Time: ..., rTemp: ..., x: ..." format
+KEY_ALIASES = {'Time': 'ts', 'rTemp': 'rt', 'lTemp': 'lt'}
+
+TS_FORMAT = '%d %b %Y %H:%M:%S'
+FIELDS = ('x', 'y', 'z', 'rt')
+# the remote (sensor) temperature is reported as the temperature
+FIELD_NAMES = {'x': 'Bx', 'y': 'By', 'z': 'Bz', 'rt': 'temp'}
+
+# day product resolutions (key in the product: pandas frequency)
+RESOLUTIONS = {'1min': '1min', '10min': '10min'}
+
+# OBSYYYY-MM-DDTHH:MM.zip
+FILE_DATE = re.compile(r'OBS(\d{4}-\d{2}-\d{2})')
+
+
+def open_mag_file(path):
+    """
+    Returns:
+        file-like object
+        filename inside zip (or actual filename)
+    """
+    if path.endswith(".zip"):
+        z = zipfile.ZipFile(path, 'r')
+        name = z.namelist()[0]
+        return z.open(name), name
+    return open(path, 'rb'), os.path.basename(path)
+
+
+def read_mag_frame(f):
+    """
+    DataFrame of one magnetometer log with the station's own column names
+    ('ts' as text, x/y/z in the units the station reports).
+    """
+    data = f.read()
+    first = data.lstrip().split(b'\n', 1)[0].decode('utf-8', 'replace')
+
+    if first.startswith('{'):
+        return pd.read_json(io.BytesIO(data), lines=True)
+
+    fields = first.split(',')
+    if fields[0].strip()[:1].isalpha():
+        # Time: 07 Dec 2022 00:00:00, rTemp: 10.19, lTemp: 12.38, x: 47.307, ...
+        df = pd.read_csv(io.BytesIO(data), header=None, dtype=str, skipinitialspace=True)
+        df = df.apply(lambda col: col.str.split(':', n=1).str[1].str.strip())
+        keys = [field.split(':', 1)[0].strip() for field in fields]
+        df.columns = [KEY_ALIASES.get(key, key) for key in keys][:len(df.columns)]
+        return df
+
+    names = CSV_COLUMNS.get(len(fields), CSV_COLUMNS[10])
+    # Handle quoted CSV values with quotechar parameter
+    return pd.read_csv(io.BytesIO(data), names=names, quotechar='"', skipinitialspace=True)
+
+
+def parse_timestamps(ts):
+    """UTC DatetimeIndex for the 'ts' column (NaT where it cannot be parsed)."""
+    if ts.dtype == object:
+        ts = ts.astype(str).str.strip().str.strip('"')
+    parsed = pd.to_datetime(ts, format=TS_FORMAT, utc=True, errors='coerce')
+    if parsed.isna().all():
+        parsed = pd.to_datetime(ts, utc=True, errors='coerce')
+    return pd.DatetimeIndex(parsed)
+
+
+def load_mag_file(path):
+    """
+    Every record of a magnetometer file (all members of a zip) as float64
+    columns x, y, z, rt indexed by UTC time, in file order.
+    """
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path, 'r') as z:
+            raw = []
+            for name in z.namelist():
+                with z.open(name) as f:
+                    raw.append(read_mag_frame(f))
+        raw = pd.concat(raw, ignore_index=True) if raw else pd.DataFrame()
+    else:
+        with open(path, 'rb') as f:
+            raw = read_mag_frame(f)
+
+    if raw.empty or 'ts' not in raw:
+        return pd.DataFrame(columns=list(FIELDS), index=pd.DatetimeIndex([], tz='UTC'), dtype=float)
+    frame = pd.DataFrame(
+        {field: pd.to_numeric(raw[field], errors='coerce') if field in raw else np.nan
+         for field in FIELDS})
+    frame.index = parse_timestamps(raw['ts'])
+    return frame[frame.index.notna()]
+
+
+# ---------------------------------------------------------------------
+# 1-minute aggregates, cached per file
+# ---------------------------------------------------------------------
+
+def _aggregate_cache_path(path, st):
+    stamp = '%s:%d:%d' % (os.path.realpath(path), st.st_size, st.st_mtime_ns)
+    key = hashlib.sha1(stamp.encode('utf-8')).hexdigest()
+    return os.path.join(settings.MAG_AGGREGATE_CACHE_DIR, key[:2], key + '.npz')
+
+
+def compute_minute_aggregates(frame):
+    """1-minute means and sample counts of a load_mag_file() frame (minutes with data only)."""
+    grouped = frame.groupby(frame.index.floor('min'))
+    means = grouped.mean()
+    means['count'] = grouped.size()
+    return means.sort_index()
+
+
+def minute_aggregates(path):
+    """1-minute means of one file, from the cache when the file is unchanged."""
+    st = os.stat(path)
+    cache_path = _aggregate_cache_path(path, st)
+    try:
+        with np.load(cache_path) as cached:
+            index = pd.DatetimeIndex(cached['minute'], tz='UTC')
+            return pd.DataFrame({name: cached[name] for name in FIELDS + ('count',)}, index=index)
+    except (OSError, KeyError, ValueError):
+        pass
+
+    means = compute_minute_aggregates(load_mag_file(path))
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp = cache_path[:-4] + '.%d.tmp.npz' % os.getpid()
+    np.savez(tmp,
+             minute=means.index.tz_convert(None).to_numpy(dtype='datetime64[ns]'),
+             count=means['count'].to_numpy(dtype=np.int64),
+             **{name: means[name].to_numpy(dtype=np.float64) for name in FIELDS})
+    os.replace(tmp, cache_path)
+    return means
+
+
+# ---------------------------------------------------------------------
+# Day products, written at ingest
+# ---------------------------------------------------------------------
+
+def day_product_path(station, instrument, date, root=None):
+    name = "%s_%s_%s_mag.npz" % (station, instrument, date)
+    return os.path.join(root or settings.MAG_PRODUCTS_PATH, station, str(instrument), name)
+
+
+def aggregate_frame(frame, freq):
+    """mean / min / max / NaN count per field and sample count for each bin of freq."""
+    bins = frame.index.floor(freq)
+    grouped = frame.groupby(bins)
+    size = grouped.size()
+    means, lows, highs = grouped.mean(), grouped.min(), grouped.max()
+    nans = frame.isna().groupby(bins).sum()
+    product = {
+        'time': size.index.tz_convert(None).to_numpy(dtype='datetime64[ns]'),
+        'count': size.to_numpy(dtype=np.int64),
+    }
+    for field, name in FIELD_NAMES.items():
+        product[name + '_mean'] = means[field].to_numpy(dtype=np.float32)
+        product[name + '_min'] = lows[field].to_numpy(dtype=np.float32)
+        product[name + '_max'] = highs[field].to_numpy(dtype=np.float32)
+        product[name + '_nan'] = nans[field].to_numpy(dtype=np.int32)
+    return product
+
+
+def _product_source(product):
+    """basename of the file a day product was written from, or None if there is none."""
+    try:
+        with np.load(product) as data:
+            return str(data['source'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def write_day_products(path, station, instrument, root=None, force=False):
+    """
+    Write the day products of a magnetometer file; returns the paths written.
+
+    A file named after its day (OBSYYYY-MM-DD...) only writes that day's
+    product: records past midnight belong to the next day's file and are
+    dropped, so they never replace that file's product. It is skipped
+    (without parsing) when its product is newer than the file, unless force
+    is given. A file without a date in its name writes a product for each
+    day it holds, except days whose product came from another file.
+    """
+    match = FILE_DATE.search(os.path.basename(path))
+    if match and not force:
+        product = day_product_path(station, instrument, match.group(1), root)
+        try:
+            if os.path.getmtime(product) >= os.path.getmtime(path):
+                return []
+        except OSError:
+            pass
+
+    frame = load_mag_file(path)
+    source = os.path.basename(path)
+    written = []
+    for day, part in frame.groupby(frame.index.floor('D')):
+        date = day.strftime('%Y-%m-%d')
+        product = day_product_path(station, instrument, date, root)
+        if match:
+            if date != match.group(1):
+                continue
+        elif _product_source(product) not in (None, source):
+            continue
+        arrays = {}
+        for resolution, freq in RESOLUTIONS.items():
+            for key, values in aggregate_frame(part, freq).items():
+                arrays[resolution + '_' + key] = values
+        os.makedirs(os.path.dirname(product), exist_ok=True)
+        tmp = product[:-4] + '.%d.tmp.npz' % os.getpid()
+        np.savez_compressed(tmp, station=station, instrument=str(instrument),
+                            date=date, source=source, **arrays)
+        os.replace(tmp, product)
+        written.append(product)
+    return written
+
+
+def load_day_product(station, instrument, date, resolution='1min', root=None):
+    """
+    One resolution of a day product as a DataFrame indexed by UTC time
+    (columns count and <field>_<stat>), or None if there is no product.
+    """
+    try:
+        with np.load(day_product_path(station, instrument, date, root)) as data:
+            index = pd.DatetimeIndex(data[resolution + '_time'], tz='UTC')
+            prefix = resolution + '_'
+            columns = {key[len(prefix):]: data[key] for key in data.files
+                       if key.startswith(prefix) and key != prefix + 'time'}
+    except (OSError, KeyError, ValueError):
+        return None
+    return pd.DataFrame(columns, index=index)
+
+
+def day_product_instruments(station, date, root=None):
+    """Instrument ids (as strings) that have a day product for the station and date."""
+    pattern = day_product_path(station, '*', date, root)
+    return sorted(os.path.basename(os.path.dirname(path))
+                  for path in glob.glob(pattern))
+
+
+def product_minutes(station, instrument, date):
+    """A day product's 1-minute means in the layout of minute_aggregates(), or None."""
+    product = load_day_product(station, instrument, date, '1min')
+    if product is None:
+        return None
+    minutes = pd.DataFrame({field: product[name + '_mean'].astype(np.float64)
+                            for field, name in FIELD_NAMES.items()}, index=product.index)
+    minutes['count'] = product['count']
+    return minutes
+
+
+def observation_file(observation):
+    """Path of the magnetometer file of an Observation (path holds its directory)."""
+    path = os.path.join(observation.path, observation.fileName)
+    if os.path.exists(path):
+        return path
+    # older rows hold a path one level below the file's directory
+    return '/'.join(observation.path.split('/')[:-1]) + '/' + observation.fileName
+
+
+def station_minutes(station_pk, start, end, station=None):
+    """
+    1-minute means of a station's zipped magnetometer files between start
+    and end (aware datetimes). Files are chosen by their observation dates
+    in the database; with the station id string (e.g. N000015) given, days
+    that have a day product are read from it. Unreadable files are skipped.
+    """
+    from apps.observations.models import Observation
+
+    first_day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    after_last_day = end.replace(hour=0, minute=0, second=0, microsecond=0) + pd.Timedelta(days=1)
+    observations = (Observation.objects
+                    .filter(station_id=station_pk, fileName__endswith='.zip',
+                            startDate__gte=first_day, endDate__lt=after_last_day)
+                    .order_by('startDate')
+                    .only('path', 'fileName', 'instrument_id', 'startDate'))
+
+    parts = []
+    for observation in observations:
+        minutes = None
+        if station:
+            minutes = product_minutes(station, observation.instrument_id,
+                                      observation.startDate.strftime('%Y-%m-%d'))
+        try:
+            if minutes is None:
+                minutes = minute_aggregates(observation_file(observation))
+            parts.append(minutes)
+        except Exception as e:
+            print(e)
+    if not parts:
+        return pd.DataFrame(columns=list(FIELDS) + ['count'], dtype=float)
+    minutes = pd.concat(parts).sort_index()
+    minutes = minutes[~minutes.index.duplicated(keep='first')]
+    return minutes.loc[pd.Timestamp(start):pd.Timestamp(end)]
+
+
+# ---------------------------------------------------------------------
+# Overlay preparation
+# ---------------------------------------------------------------------
+
+def overlay_series(minutes, axes=None):
+    """
+    Bx/By/Bz minute series ready to overlay: scaled to nT if the station
+    reports uT, with its mean removed and the axis matrix of its
+    calibration (apps/instruments/calibration.py) applied.
+    Returns an (n, 3) array.
+    """
+    from apps.instruments.calibration import apply_axes
+
+    values = minutes[['x', 'y', 'z']].to_numpy(dtype=np.float64)
+    if len(values) == 0:
+        return values
+    # stations reporting in uT have |Bx| well under 100
+    if abs(values[0, 0]) / 10 < 10:
+        values = values * 1000
+    values = values - np.nanmean(values, axis=0)
+    return apply_axes(values, axes)
@@ -0,0 +1,95 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+
+from apps.analysis.magdata import observation_file, write_day_products
+from apps.observations.models import Observation
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import os
+import time
+
+'''
+EXAMPLE USAGE
+
+python manage.py backfill_mag_products --workers 8
+python manage.py backfill_mag_products --station N000015 --since 2024-01-01 --force
+
+Writes the daily magnetometer aggregates (see apps/analysis/magdata.py) for
+magnetometer observations already in the database, the same products
+psws_addMAG writes for new uploads. Days whose product is newer than the
+file are skipped unless --force is given, so an interrupted run can simply
+be started again.
+'''
+
+
+def backfill_one(task):
+    """Worker: write the products of one file. Returns (path, products written, error)."""
+    path, station, instrument, force = task
+    try:
+        return path, len(write_day_products(path, station, instrument, force=force)), None
+    except Exception as e:
+        return path, 0, repr(e)
+
+
+class Command(BaseCommand):
+    help = "Write daily magnetometer aggregate products for the historical archive, in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Parallel worker processes (default: CPU count)")
+        parser.add_argument('--station', type=str, help="Only this station ID (e.g. N000015)")
+        parser.add_argument('--since', type=str, help="Only observations starting on or after YYYY-MM-DD")
+        parser.add_argument('--force', action='store_true', help="Rewrite products that are up to date")
+
+    def handle(self, *args, **kwargs):
+        observations = (Observation.objects
+                        .filter(Q(dataType__dataType='magnetometer') |
+                                Q(instrument__instrumenttype__instrumentType='Magnetometer'))
+                        .select_related('station')
+                        .only('path', 'fileName', 'instrument_id', 'station__station_id')
+                        .distinct()
+                        .order_by('id'))
+        if kwargs['station']:
+            observations = observations.filter(station__station_id=kwargs['station'])
+        if kwargs['since']:
+            observations = observations.filter(startDate__gte=kwargs['since'])
+
+        tasks = []
+        for observation in observations.iterator():
+            if observation.station is None:
+                continue
+            tasks.append((observation_file(observation), observation.station.station_id,
+                          observation.instrument_id, kwargs['force']))
+        self.stdout.write("%d magnetometer files to check" % len(tasks))
+
+        # the workers only read files; do not hand them our database connections
+        connections.close_all()
+        started = time.monotonic()
+        written = failed = done = 0
+        with ProcessPoolExecutor(max_workers=max(1, kwargs['workers']),
+                                 mp_context=multiprocessing.get_context('fork')) as pool:
+            futures = [pool.submit(backfill_one, task) for task in tasks]
+            for future in as_completed(futures):
+                path, count, error = future.result()
+                done += 1
+                written += count
+                if error:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING("%s: %s" % (path, error)))
+                if done % 500 == 0:
+                    self.stdout.write("%d/%d files, %d products, %.0fs" % (
+                        done, len(tasks), written, time.monotonic() - started))
+
+        self.stdout.write(self.style.SUCCESS(
+            "Checked %d files: %d day products written, %d files failed in %.0fs" % (
+                done, written, failed, time.monotonic() - started)))
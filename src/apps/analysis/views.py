@@ -15,13 +15,14 @@ from django.urls import path
 from django.utils.dateparse import parse_datetime
 from django.conf import settings
 from . import views
-import zipfile
+import numpy as np
 from apps.stations.models import Station
 from apps.observations.models import Observation
 from apps.instruments.models import Instrument
 from apps.instrumenttypes.models import InstrumentType
 from apps.observations.tables import ObservationTable
-from statistics import mean 
+from .magdata import station_minutes, overlay_series
+from apps.instruments.calibration import station_axis_matrices
 
 # Declaration of cutoff hours for station status
 ONLINE_CUT_OFF_HOURS = settings.ONLINE_CUT_OFF_HOURS
@@ -87,184 +88,33 @@ def display_graphs(request):
             if start_converted:
                 # Prepare data for plotting
                 datasets = []
+                # axis corrections of the stations' magnetometers, in one query
+                axes = station_axis_matrices([int(id) for id in station_ids if str(id).isdigit()])
                 for id in station_ids:
                     ts=[]
                     xs=[]
                     ys=[]
                     zs=[]
                     name=""
+                    address=""
                     try:
                         station = get_object_or_404(Station, id=int(id))
                         name=station.nickname
                         address=station.city+' '+station.state
-                        ob=Observation.objects.filter(station_id=int(id))
-                        # Choices are: band, centerFrequency, dataRate, dataType, endDate, fileName, id, instrument, instrument_id, path, size, startDate, station, station_id
-                    except:
-                        ob=None
-                    if ob!=None:
-                        for o in ob.all():
-                            file_extension=o.fileName[-4:]
-                            if (o.startDate.date()>=start_converted.date()) and (o.endDate.date()<=end_converted.date()) and file_extension=='.zip':
-                                path=('/').join(o.path.split('/')[:-1])+'/'+o.fileName
-                                print('path =', path)
-                                try:
-                                    with zipfile.ZipFile(path) as zf:
-                                        for file in zf.namelist():
-                                            with zf.open(file) as f:
-                                                try:
-                                            # switch file format
-                                            # line=f.readlines()[0]
-                                            # print(line)
-                                            # continue
-                                            #case 1 b'{ "ts":"14 Nov 2022 00:00:00", "rt":16.56, "lt":29.56, "x":-44.0088, "y":0.9507, "z":-18.7339, "rx":-390, "ry":8, "rz":-166, "Tm": 47.8397 }\n'
-                                            #case 2 ,x is [3] "15 Nov 2022 07:58:00", 17.62, 34.44, 3936.0, -253.3, 2800.0, 2952, -190, 2100, 4836.96948
-                                            #case 3 , x is [2]'"14 Nov 2022 00:00:00", 17.81, -38.2493, -18.8440, -14.1587, -28, -14, -10, 44.9286\n' 
-                                            #case 4 ['{ "ts":"22 Nov 2022 00:00:01"', ' "rt":13.44', ' "x":-38.340', ' "y":-18.920', ' "z":-13.707', ' "rx":-5751', ' "ry":-2838', ' "rz":-2056', ' "Tm": 44.89760 }\n']
-                                            #case 5 [' Time: 07 Dec 2022 00:00:00', ' rTemp: 10.19', ' lTemp: 12.38', ' x: 47.307', ' y: -0.507', ' z: -14.800', ' rx: 3548', ' ry: -38', ' rz: -1110\n']
-                                            # switch format issue 4  float error ['"22 Nov 2022 16:59:45"', ' 13.75', ' -93129.3', ' 0.0', ' 0.0', ' -139694', ' 0', ' 0', ' 93129.33333\n']
-                                                    data=f.readlines()
-                                                    if len(data)>0:
-                                                        totalcount=0
-                                                        check_case=0
-                                                        if str(data[0],'UTF-8')[0]=='{' and len(str(data[0],'UTF-8').split(','))==10:
-                                                            check_case=1
-                                                        elif str(data[0],'UTF-8')[0]=='{' and len(str(data[0],'UTF-8').split(','))==9:
-                                                            check_case=4
-                                                        elif len(str(data[0],'UTF-8').split(','))==9 and str(data[0],'UTF-8')[1]=='T':
-                                                            check_case=5
-                                                        elif len(str(data[0],'UTF-8').split(','))==10:
-                                                            check_case=2
-                                                        elif len(str(data[0],'UTF-8').split(','))==9:
-                                                            check_case=3
-                                                        linecount=xx=yy=zz=0
-                                                        for d in data:  #sum and take avg of minutes data
-                                                            totalcount+=1
-                                                            d=str(d,'UTF-8')
-                                                            ds=d.split(',')
-                                                            linecount+=1
-                                                            if check_case==1:
-                                                                t=ds[0][8:-4]
-                                                                realtime=utc.localize(datetime.strptime(t, '%d %b %Y %H:%M'))
-                                                                if realtime>end_converted:
-                                                                    break
-                                                                xx+=float(ds[3][5:])
-                                                                yy+=float(ds[4][5:])
-                                                                zz+=float(ds[5][5:])
-
-                                                            elif check_case==4:
-                                                                t=ds[0][8:-4]
-                                                                realtime=utc.localize(datetime.strptime(t, '%d %b %Y %H:%M'))
-                                                                if realtime>end_converted:
-                                                                    break
-                                                                xx+=float(ds[2][5:])
-                                                                yy+=float(ds[3][5:])
-                                                                zz+=float(ds[4][5:])
-                                                        
-                                                            elif check_case==5:
-                                                                t=ds[0][7:-4]
-                                                                print('case 5',t)
-                                                                realtime=utc.localize(datetime.strptime(t, '%d %b %Y %H:%M'))
-                                                                if realtime>end_converted:
-                                                                    break
-                                                                xx+=float(ds[3][4:])
-                                                                yy+=float(ds[3][4:])
-                                                                zz+=float(ds[3][4:])
-                                              
-                                                            elif check_case==3:
-                                                                t=ds[0][1:-4]
-                                                                realtime=utc.localize(datetime.strptime(t, '%d %b %Y %H:%M'))
-                                                                if realtime>end_converted:
-                                                                    break
-                                                                xx+=float(ds[3][1:])
-                                                                yy+=float(ds[4][1:])
-                                                                zz+=float(ds[5][1:])
-                                                 
-                                                            elif check_case==2 :
-                                                                t=ds[0][1:-4]
-                                                                realtime=utc.localize(datetime.strptime(t, '%d %b %Y %H:%M'))
-                                                                if realtime>end_converted:
-                                                                    break
-                                                                xx+=float(ds[3][1:])
-                                                                yy+=float(ds[4][1:])
-                                                                zz+=float(ds[5][1:])
-                                                     
-                                                            if linecount==60: #take only averaged every 60s data
-                                                                # selected_time=['00:00','06:00','12:00','18:00','23:59'] #only show selected time
-                                                                t=t[-5:]
-                                                                # if t in selected_time:
-                                                                #     ts.append(t)
-                                                                # else:
-                                                                #     ts.append('0')
-                                                                # t=datetime.strptime(t, '%d %b %Y %H:%M')
-                                                                ts.append(t)
-                                                                xs.append(xx/60)
-                                                                ys.append(yy/60)
-                                                                zs.append(zz/60)
-                                                                xx=yy=zz=linecount=0
-                                                            elif len(data)-totalcount==0 : #tail condition, if the data reaches the end but not 60
-                                                                # if t in selected_time:
-                                                                #     ts.append(t)
-                                                                # else:
-                                                                #     ts.append('0')
-                                                                t=t[-5:]
-                                                                ts.append(t)
-                                                                xs.append(xx/linecount)
-                                                                ys.append(yy/linecount)
-                                                                zs.append(zz/linecount)
-                                                                xx=yy=zz=linecount=0 
-                                               
-                                                except Exception as e: 
-                                                    print(check_case)
-                                                    print(e)
-                                                    print(str(data[0],'UTF-8')[0])
-                                except Exception as e: 
-                                    print(e)
-                    else:
+                        # 1-minute means of the station's files for the day, selected in
+                        # SQL and cached per file (see magdata.py)
+                        minutes = station_minutes(station.id, start_converted, end_converted, station.station_id)
+                    except Exception as e:
+                        print(e)
+                        minutes = None
+                    if minutes is None:
                         print("not found!")
-                    print(len(xs))
-
-                    print(id)
-                    print(name)
-                    if len(xs)>1:
-                        # print(xs[0:20])
-                        if (abs(xs[0])/10<10):
-                            xs=[x*1000 for x in xs]
-                            ys=[y*1000 for y in ys]
-                            zs=[z*1000 for z in zs]
-                        # print(xs[0:20])
-                        x_m=mean(xs)
-                        y_m=mean(ys)
-                        z_m=mean(zs)
-                        # print(x_m)
-                        xs=[x -x_m for x in xs]
-                        ys=[y - y_m for y in ys]
-                        zs=[z- z_m for z in zs]
-                        # print(xs[0:20])
-                        if id=='28': 
-                            xxs=[z for z in zs]
-                            zs=xs
-                            xs=xxs
-                        if id=='33':
-                            temp=xs
-                            xs=[z*-1 for z in zs]
-                            zs=temp
-                        if id=='4':
-                            xs=[x*0.01 for x in xs]
-                            ys=[y*0.01 for y in ys]
-                            zs=[z*0.01 for z in zs]
-                        if id=='3':
-                            xs=[-10*x for x in xs]
-                            ys=[-10*y for y in ys]
-                            zs=[10*z for z in zs]
-                            temp=xs
-                            xs=zs
-                            zs=temp
-                        if id=='32':
-                            ys=[y*-1 for y in ys]
-                            temp=xs
-                            xs=[z*-1 for z in zs]
-                            zs=temp
-                        datasets.append({'station_id': id, 'station_name':name,'station_address':address,'ts':ts,'xs':xs,'ys':ys,'zs':zs}) 
+                    elif len(minutes)>1:
+                        values = overlay_series(minutes, axes.get(station.id))
+                        ts = minutes.index.strftime('%H:%M').tolist()
+                        xs, ys, zs = (np.where(np.isnan(values), None, values).T.tolist()
+                                      if len(values) else ([], [], []))
+                        datasets.append({'station_id': id, 'station_name':name,'station_address':address,'ts':ts,'xs':xs,'ys':ys,'zs':zs})
                         msg = 'Data plotted for selected stations on ' + start_datetime_str
                     else:
                         # Handle invalid date format
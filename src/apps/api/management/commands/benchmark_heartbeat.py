@@ -0,0 +1,164 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from apps.api.views import StationHeartbeat
+from apps.datarequests.models import DataRequest
+from apps.stations.models import Station
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import random
+import statistics
+import threading
+import time
+
+'''
+EXAMPLE USAGE
+
+python manage.py benchmark_heartbeat --stations 5000 --pings 20000 --concurrency 32 --compare
+
+Creates synthetic stations and has them ping the heartbeat view concurrently
+(in process, through DRF's request factory, so the numbers are the view and
+the database, not the network). With --compare the previous implementation
+(get + full save + DataRequest.latest + second save) is run first on the same
+stations. The synthetic stations are removed at the end unless --keep is given.
+'''
+
+BENCH_USERNAME = "psws_heartbeat_benchmark"
+BENCH_STATION_PREFIX = "H"
+BENCH_PASS = "benchmark-station-pass"
+
+
+def legacy_heartbeat(station_id, station_pass):
+    """The heartbeat as it was: full row load, full saves, DataRequest per ping."""
+    try:
+        instance = Station.objects.get(station_id=station_id)
+    except Station.DoesNotExist:
+        return 404
+    if instance.station_pass == station_pass:
+        instance.last_alive = datetime.now(timezone.utc)
+        instance.save()
+        dataReqInst = DataRequest.objects.latest('requestID')
+        if dataReqInst.requestID > instance.last_rID:
+            instance.last_rID = dataReqInst.requestID
+            instance.save()
+        return 200
+    return 401
+
+
+class Command(BaseCommand):
+    help = "Simulate many stations pinging the heartbeat endpoint concurrently and report throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stations', type=int, default=2000, help="Synthetic stations")
+        parser.add_argument('--pings', type=int, default=10000, help="Heartbeats to send in total")
+        parser.add_argument('--concurrency', type=int, default=16, help="Concurrent client threads")
+        parser.add_argument('--compare', action='store_true', help="Run the previous implementation first")
+        parser.add_argument('--keep', action='store_true', help="Keep the synthetic stations afterwards")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed for the ping order")
+
+    def handle(self, *args, **kwargs):
+        station_ids = self.seed_stations(kwargs['stations'])
+        created_request = None
+        if not DataRequest.objects.exists():
+            # the legacy path fails without any data request
+            now = datetime.now(timezone.utc)
+            created_request = DataRequest.objects.create(timestart=now, timestop=now)
+        try:
+            rng = random.Random(kwargs['seed'])
+            order = [rng.choice(station_ids) for _ in range(kwargs['pings'])]
+
+            if kwargs['compare']:
+                self.report("before (legacy heartbeat)",
+                            self.run(legacy_heartbeat, order, kwargs['concurrency']))
+
+            view = StationHeartbeat.as_view()
+            factory = APIRequestFactory()
+
+            def heartbeat(station_id, station_pass):
+                request = factory.put('/heartbeat/', {'station_id': station_id, 'station_pass': station_pass},
+                                      format='json')
+                return view(request).status_code
+
+            self.report("after (fast heartbeat)", self.run(heartbeat, order, kwargs['concurrency']))
+            self.report_queries(heartbeat, station_ids[0])
+        finally:
+            if created_request is not None:
+                created_request.delete()
+            if kwargs['keep']:
+                self.stdout.write(self.style.WARNING("Keeping synthetic stations (%s*)" % BENCH_STATION_PREFIX))
+            else:
+                deleted, _ = Station.objects.filter(user__username=BENCH_USERNAME).delete()
+                User.objects.filter(username=BENCH_USERNAME).delete()
+                self.stdout.write(self.style.SUCCESS("Removed synthetic stations (%d rows)" % deleted))
+
+    def seed_stations(self, count):
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME,
+                                             defaults={'email': 'benchmark@localhost'})
+        stations = [Station(user=user,
+                            station_id="%s%06d" % (BENCH_STATION_PREFIX, n),
+                            station_pass=BENCH_PASS,
+                            nickname="Heartbeat %d" % n,
+                            antenna_1="NA")
+                    for n in range(count)]
+        Station.objects.bulk_create(stations, batch_size=1000)
+        return [station.station_id for station in stations]
+
+    def run(self, heartbeat, order, concurrency):
+        latencies = []
+        failures = [0]
+        lock = threading.Lock()
+
+        def ping(station_id):
+            started = time.perf_counter()
+            status = heartbeat(station_id, BENCH_PASS)
+            elapsed = time.perf_counter() - started
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    failures[0] += 1
+
+        def ping_batch(batch):
+            try:
+                for station_id in batch:
+                    ping(station_id)
+            finally:
+                # each thread has its own database connection
+                connections.close_all()
+
+        batches = [order[i::concurrency] for i in range(max(1, concurrency))]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+            list(pool.map(ping_batch, batches))
+        return time.perf_counter() - started, latencies, failures[0]
+
+    def report(self, label, result):
+        elapsed, latencies, failures = result
+        latencies.sort()
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== %s ===" % label))
+        self.stdout.write("%d ok, %d failed in %.2fs: %.0f heartbeats/s" % (
+            len(latencies), failures, elapsed, len(latencies) / elapsed))
+        if latencies:
+            self.stdout.write("latency (ms): median %.2f  p95 %.2f  max %.2f" % (
+                statistics.median(latencies) * 1000,
+                latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+                latencies[-1] * 1000))
+
+    def report_queries(self, heartbeat, station_id):
+        with CaptureQueriesContext(connection) as queries:
+            heartbeat(station_id, BENCH_PASS)
+        self.stdout.write("\nqueries per heartbeat: %d" % len(queries))
+        for query in queries.captured_queries:
+            self.stdout.write("  " + query['sql'])
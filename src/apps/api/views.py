@@ -11,15 +11,13 @@ from rest_framework import permissions
 from rest_framework import generics
 from .serializers import StationSerializer, HeartbeatSerializer, StationStopSerializer
 from apps.stations.models import Station
+from apps.stations.status import mark_station_alive, refresh_station_status_if_due
 from apps.observations.models import Observation
-from apps.datarequests.models import DataRequest
+from apps.datarequests.latest import latest_data_request
 from rest_framework.response import Response
 from datetime import datetime, timedelta, timezone
 from django.conf import settings
-
-#Declaring time cutoffs here since will probably change in the future
-ONLINE_CUT_OFF_HOURS = settings.ONLINE_CUT_OFF_HOURS
-POSSIBLY_ONLINE_CUT_OFF_HOURS = settings.POSSIBLY_ONLINE_CUT_OFF_HOURS
+import hmac
 
 
 """
@@ -27,9 +25,8 @@ API method of listing all stations and their attributes
 To modify what is shown, modify the Serializer
 In addition to displaying, this will also calculate whether
 a specific station is alive or dead based on current time and the
-last_alive time of the station.
-May wish to change this to only update station status at a certain
-time interval since it requires a loop of all station objects
+last_alive time of the station (one bulk UPDATE, at most once per
+STATION_STATUS_REFRESH_SECONDS)
 """
 class StationList(generics.ListAPIView):
     queryset = Station.objects.all()
@@ -42,25 +39,24 @@ class StationList(generics.ListAPIView):
         """
 
         #Update Station status of all stations before displaying
-        AliveCutoff = datetime.now(timezone.utc) - timedelta(hours=ONLINE_CUT_OFF_HOURS)
-        DeadCutoff = datetime.now(timezone.utc) - timedelta(hours=POSSIBLY_ONLINE_CUT_OFF_HOURS)
-        for instance in Station.objects.all():
-            if (instance.last_alive < DeadCutoff): 
-                instance.station_status = "Offline"
-            elif (instance.last_alive < AliveCutoff):
-                instance.station_status = "PossiblyOnline"
-            else:
-                instance.station_status = "Online"
-            instance.save()
-    
+        refresh_station_status_if_due()
+
         return self.list(request)
 
+def station_pass_matches(stored, given):
+    """Constant-time comparison of a station password."""
+    if not stored or given is None:
+        return False
+    return hmac.compare_digest(str(stored).encode('utf-8'), str(given).encode('utf-8'))
+
 """
 API that takes a POST or PUT that includes a station ID and Password
 If valid, it will update the station's last_alive variable
 A successful request will return 200, if there is a newer data request than
 the last one fielded by the station, the response body will also include the 
 timestamps of the data request
+Every station pings this, so it costs one small SELECT and one UPDATE; the
+latest data request comes from a per-process cache (apps/datarequests/latest.py)
 """
 class StationHeartbeat(generics.UpdateAPIView):
     queryset = Station.objects.all()
@@ -71,30 +67,30 @@ class StationHeartbeat(generics.UpdateAPIView):
         rID = request.data.get("station_id")
         rPass = request.data.get("station_pass")
 
-        #Try to get specific station object
-        try:
-            instance = Station.objects.get(station_id = rID)
-        except Station.DoesNotExist:
+        #Try to get specific station (only the columns needed here)
+        row = (Station.objects.filter(station_id = rID)
+               .values_list('pk', 'station_pass', 'station_status', 'last_rID').first())
+        if row is None:
             return Response(status=404)
+        pk, station_pass, station_status, last_rID = row
 
         #Make sure that password is valid
-        if (instance.station_pass == rPass):
-            #Update last alive
-            instance.last_alive = datetime.now(timezone.utc)
-            instance.save()
-
-            #Grab latest data request
-            dataReqInst = DataRequest.objects.latest('requestID')
-            #Check if station has fielded this yet -- NOTE -- This functionality may change
-            #Depending on how we want to handle a station that has missed multiple requests
-            if(dataReqInst.requestID > instance.last_rID):
-                instance.last_rID = dataReqInst.requestID
-                instance.save()
-                return Response({'requestID': dataReqInst.requestID, 'timestart': dataReqInst.timestart, 'timestop': dataReqInst.timestop})
-            else:
-                return Response(status=200)  
-        #Password did not match, return unauthorized
-        return Response(status=401)
+        if not station_pass_matches(station_pass, rPass):
+            #Password did not match, return unauthorized
+            return Response(status=401)
+
+        #Grab latest data request
+        dataReqInst = latest_data_request()
+        #Check if station has fielded this yet -- NOTE -- This functionality may change
+        #Depending on how we want to handle a station that has missed multiple requests
+        if dataReqInst is not None and dataReqInst.requestID > last_rID:
+            #Update last alive and last request in one UPDATE
+            mark_station_alive(pk, station_status, last_rID=dataReqInst.requestID)
+            return Response({'requestID': dataReqInst.requestID, 'timestart': dataReqInst.timestart, 'timestop': dataReqInst.timestop})
+
+        #Update last alive (and show the station online on the map if it was not)
+        mark_station_alive(pk, station_status)
+        return Response(status=200)
 
 class StationStop(generics.UpdateAPIView):
     queryset = Station.objects.all()
@@ -113,7 +109,7 @@ class StationStop(generics.UpdateAPIView):
             return Response(status=404) #Not found
 
         #Check that password works
-        if(instance.station_pass != Pass):
+        if not station_pass_matches(instance.station_pass, Pass):
             return Response(status=401) #Unauthorized
 
         #Check that this station has an associated observation object with a blank endDate
@@ -11,3 +11,7 @@ from django.apps import AppConfig
 
 class DatarequestsConfig(AppConfig):
     name = 'apps.datarequests'
+
+    def ready(self):
+        # clear the cached latest request when one is created or removed
+        from . import latest  # noqa: F401
@@ -0,0 +1,55 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Process-local cache of the latest DataRequest.
+
+Every station heartbeat needs the newest data request, and requests are
+created rarely (by hand, in the admin). The value is kept in this process
+and dropped when a DataRequest is saved or deleted here; other processes
+(gunicorn workers) see a new request after at most
+DATAREQUEST_CACHE_SECONDS.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import DataRequest
+
+_lock = threading.Lock()
+_latest = None
+_expires = 0.0
+
+
+def latest_data_request():
+    """The DataRequest with the highest requestID, or None if there is none."""
+    global _latest, _expires
+    now = time.monotonic()
+    with _lock:
+        if now < _expires:
+            return _latest
+    latest = DataRequest.objects.order_by('-requestID').first()
+    with _lock:
+        _latest = latest
+        _expires = now + settings.DATAREQUEST_CACHE_SECONDS
+    return latest
+
+
+def clear_latest_data_request():
+    global _expires
+    with _lock:
+        _expires = 0.0
+
+
+@receiver(post_save, sender=DataRequest, dispatch_uid="datarequest_latest_saved")
+@receiver(post_delete, sender=DataRequest, dispatch_uid="datarequest_latest_deleted")
+def _data_request_changed(sender, **kwargs):
+    clear_latest_data_request()
@@ -8,7 +8,8 @@
 # ----------------------------------------------------------------------------
 from django.contrib import admin
 
-from .models import Instrument
+from .models import Instrument, InstrumentCalibration
 # Register your models here.
 
 admin.site.register(Instrument)
+admin.site.register(InstrumentCalibration)
@@ -0,0 +1,91 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Instrument calibrations (InstrumentCalibration rows) applied to data arrays.
+
+Used by the analysis views, the plotters and the observation APIs, so an
+instrument's axis correction or RF calibration is entered once, in the
+admin, and needs no code change. Lookups return None when an instrument
+has no calibration, and the apply functions then leave data as it is.
+
+Axis corrections are 3x3 matrices applied to (n, 3) arrays of (x, y, z)
+rows; RF calibrations convert peak amplitudes to dBm. Both are single
+NumPy expressions over the whole array.
+"""
+import numpy as np
+from django.db.models import Q
+
+from .models import InstrumentCalibration
+
+AXIS_INDEX = {'x': 0, 'y': 1, 'z': 2}
+
+
+def axis_matrix(calibration):
+    """The 3x3 matrix M of a calibration's axis correction, out = M @ (x, y, z)."""
+    matrix = np.zeros((3, 3))
+    for row, axis in enumerate(('x', 'y', 'z')):
+        source = getattr(calibration, axis + '_source')
+        matrix[row, AXIS_INDEX[source]] = getattr(calibration, axis + '_sign') * getattr(calibration, axis + '_scale')
+    return matrix
+
+
+def apply_axes(values, matrix):
+    """Apply an axis matrix to an (n, 3) array; None leaves the values unchanged."""
+    if matrix is None:
+        return values
+    return values @ matrix.T
+
+
+def rf_dbm(samples, calibration):
+    """Peak amplitudes converted to dBm with a calibration that has rf_divisor set."""
+    volts = (np.abs(samples) + calibration.rf_offset) / calibration.rf_divisor
+    return 10. * np.log10((volts ** 2 * 1000.) / calibration.rf_load_ohms)
+
+
+def _pick(calibrations):
+    # an instrument's own calibration wins over its type's default
+    calibrations = list(calibrations)
+    for calibration in calibrations:
+        if calibration.instrument_id is not None:
+            return calibration
+    return calibrations[0] if calibrations else None
+
+
+def instrument_calibration(instrument_id):
+    """The calibration that applies to an instrument, or None."""
+    return _pick(InstrumentCalibration.objects.filter(
+        Q(instrument_id=instrument_id) | Q(instrumenttype__instrument__id=instrument_id)))
+
+
+def rf_calibration(instrument_id):
+    """The instrument's calibration if it has an RF calibration curve, else None."""
+    calibration = instrument_calibration(instrument_id)
+    if calibration is None or calibration.rf_divisor is None:
+        return None
+    return calibration
+
+
+def station_axis_matrices(station_pks, instrument_type='Magnetometer'):
+    """
+    {Station.id: axis matrix} for the stations' instruments of one type, in
+    one query. Stations without a calibration are left out.
+    """
+    calibrations = (InstrumentCalibration.objects
+                    .filter(instrument__station_id__in=station_pks,
+                            instrument__instrumenttype__instrumentType=instrument_type)
+                    .select_related('instrument')
+                    .order_by('instrument_id'))
+    matrices = {}
+    for calibration in calibrations:
+        matrices.setdefault(calibration.instrument.station_id, axis_matrix(calibration))
+    default = InstrumentCalibration.objects.filter(instrumenttype__instrumentType=instrument_type).first()
+    if default is not None:
+        for pk in station_pks:
+            matrices.setdefault(int(pk), axis_matrix(default))
+    return matrices
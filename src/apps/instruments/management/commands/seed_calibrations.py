@@ -0,0 +1,85 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+from django.core.management.base import BaseCommand
+
+from apps.instruments.models import Instrument, InstrumentCalibration
+from apps.instrumenttypes.models import InstrumentType
+
+'''
+EXAMPLE USAGE
+
+python manage.py seed_calibrations
+python manage.py seed_calibrations --dry-run
+
+Creates the calibrations that used to be hard-coded: the magnetometer axis
+corrections of a few stations (previously in the analysis overlay view) and
+the Grape 1 dBm curve (previously in plotspectrum_v8.py). Existing rows are
+left alone, so this is safe to run again; further calibrations are added in
+the admin.
+'''
+
+# Station.id -> (source, sign, scale) for the x, y and z outputs
+LEGACY_STATION_AXES = {
+    28: (('z', 1, 1.0), ('y', 1, 1.0), ('x', 1, 1.0)),
+    33: (('z', -1, 1.0), ('y', 1, 1.0), ('x', 1, 1.0)),
+    4: (('x', 1, 0.01), ('y', 1, 0.01), ('z', 1, 0.01)),
+    3: (('z', 1, 10.0), ('y', -1, 10.0), ('x', -1, 10.0)),
+    32: (('z', -1, 1.0), ('y', -1, 1.0), ('x', 1, 1.0)),
+}
+
+# InstrumentType.instrumentType -> RF calibration curve
+LEGACY_RF_CURVES = {
+    'Grape 1 DRF': {'rf_offset': 0.001879, 'rf_divisor': 464., 'rf_load_ohms': 50.},
+}
+
+
+class Command(BaseCommand):
+    help = "Create the built-in axis and RF calibrations in the calibration registry"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be created")
+
+    def handle(self, *args, **kwargs):
+        dry_run = kwargs['dry_run']
+        created = 0
+
+        for station_pk, axes in LEGACY_STATION_AXES.items():
+            instruments = Instrument.objects.filter(station_id=station_pk,
+                                                    instrumenttype__instrumentType='Magnetometer')
+            if not instruments:
+                self.stdout.write(self.style.WARNING("Station %d has no magnetometer, skipped" % station_pk))
+                continue
+            fields = {}
+            for axis, (source, sign, scale) in zip(('x', 'y', 'z'), axes):
+                fields.update({axis + '_source': source, axis + '_sign': sign, axis + '_scale': scale})
+            for instrument in instruments:
+                if InstrumentCalibration.objects.filter(instrument=instrument).exists():
+                    continue
+                self.stdout.write("Axis calibration for instrument %d (station %d)" % (instrument.id, station_pk))
+                if not dry_run:
+                    InstrumentCalibration.objects.create(instrument=instrument,
+                                                         notes="Sensor mounting correction", **fields)
+                created += 1
+
+        for type_name, curve in LEGACY_RF_CURVES.items():
+            instrumenttype = InstrumentType.objects.filter(instrumentType=type_name).first()
+            if instrumenttype is None:
+                self.stdout.write(self.style.WARNING("No instrument type '%s', skipped" % type_name))
+                continue
+            if InstrumentCalibration.objects.filter(instrumenttype=instrumenttype).exists():
+                continue
+            self.stdout.write("RF calibration for instrument type '%s'" % type_name)
+            if not dry_run:
+                InstrumentCalibration.objects.create(instrumenttype=instrumenttype,
+                                                     notes="Vrms from peak magnitude, dBm into 50 ohms",
+                                                     **curve)
+            created += 1
+
+        verb = "Would create" if dry_run else "Created"
+        self.stdout.write(self.style.SUCCESS("%s %d calibrations" % (verb, created)))
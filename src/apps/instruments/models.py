@@ -24,3 +24,47 @@ class Instrument(models.Model):
 
     def __str__(self):
         return self.instrument + "\n(" + self.instrumenttype.instrumentType + ")"
+
+
+AXES = [('x', 'x'), ('y', 'y'), ('z', 'z')]
+SIGNS = [(1, '+'), (-1, '-')]
+
+
+class InstrumentCalibration(models.Model):
+    """
+    Calibration of one instrument, or of every instrument of a type when
+    instrumenttype is set instead (an instrument's own row wins). Applied
+    by apps/instruments/calibration.py.
+
+    Magnetometer axes: output component c is c_sign * c_scale * input[c_source].
+    RF amplitude: volts = (|sample| + rf_offset) / rf_divisor, reported as dBm
+    into rf_load_ohms; rows without rf_divisor have no RF calibration.
+    """
+    instrument = models.OneToOneField(Instrument, on_delete=models.CASCADE, null=True, blank=True,
+                                      related_name='calibration')
+    instrumenttype = models.OneToOneField(InstrumentType, on_delete=models.CASCADE, null=True, blank=True,
+                                          related_name='calibration')
+    x_source = models.CharField(max_length=1, choices=AXES, default='x')
+    x_sign = models.SmallIntegerField(choices=SIGNS, default=1)
+    x_scale = models.FloatField(default=1.0)
+    y_source = models.CharField(max_length=1, choices=AXES, default='y')
+    y_sign = models.SmallIntegerField(choices=SIGNS, default=1)
+    y_scale = models.FloatField(default=1.0)
+    z_source = models.CharField(max_length=1, choices=AXES, default='z')
+    z_sign = models.SmallIntegerField(choices=SIGNS, default=1)
+    z_scale = models.FloatField(default=1.0)
+    rf_offset = models.FloatField(default=0.0)
+    rf_divisor = models.FloatField(null=True, blank=True)
+    rf_load_ohms = models.FloatField(default=50.0)
+    notes = models.CharField(max_length=200, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(instrument__isnull=False) | models.Q(instrumenttype__isnull=False),
+                name='calibration_has_target'),
+        ]
+
+    def __str__(self):
+        target = self.instrument or self.instrumenttype
+        return "Calibration: " + str(target)
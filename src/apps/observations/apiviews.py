@@ -10,12 +10,18 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.throttling import AnonRateThrottle
 from rest_framework import status
-from django.http import FileResponse
-from datetime import datetime
-import tempfile, os, zipfile
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from datetime import datetime, timezone
+import os
 
 from apps.stations.models import Station
 from apps.observations.models import Observation
+from apps.observations.archives import iter_entries, stream_zip
+from apps.observations.delivery import cached_archive, file_response
+from apps.observations.drf_extract import RangeError, stream_range
+from apps.analysis.magdata import RESOLUTIONS, day_product_instruments, load_day_product
+from apps.instruments.calibration import axis_matrix, instrument_calibration
 
 class ObservationDownloadAPIView(APIView):
     throttle_classes = [AnonRateThrottle]
@@ -201,67 +207,45 @@ class ObservationDownloadAPIView(APIView):
         for i, obs in enumerate(observations):
             print(f"  Observation {i+1}: {obs.fileName} | Path: {obs.path} | Start: {obs.startDate.date()} | End: {obs.endDate.date()}")
 
-        # MULTIPLE FILES: Create ZIP archive when multiple observations found
+        # MULTIPLE FILES: Stream a ZIP archive when multiple observations found
         if len(observations) > 1:
-            temp_dir = tempfile.gettempdir()
             # Create descriptive filename based on search criteria
             if station_id:
                 zip_filename = f"observations_{station_id}_{start_date}_{end_date}.zip"
             else:
                 zip_filename = f"observations_region_{start_date}_{end_date}.zip"
-            zip_path = os.path.join(temp_dir, zip_filename)
-            print(f"Creating ZIP archive: {zip_path}")
-            
-            files_added = 0
-            files_processed = 0
-            
-            try:
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for obs in observations:
-                        files_processed += 1
-                        print(f"Processing observation {files_processed}/{len(observations)}: {obs.fileName}")
-                        
-                        # VALIDATION: Only process ZIP files within date range # Removed since file formats may change?
-                        #file_extension = obs.fileName[-4:]
-                        #if file_extension == '.zip':
-                            
-                            # CONSTRUCT FILE PATH: Build full path to observation file
-                        file_path = '/'.join(obs.path.split('/')[:-1]) + '/' + obs.fileName
-                            # TEST CASE - developer is linux username
-                        #file_path = "/home/developer/S000028/magData/" + obs.fileName
-                        print(f"  File path: {file_path}")
-                            
-                            # VALIDATION: Check file exists before adding to ZIP
-                        if os.path.exists(file_path):
-                            try:
-                                zipf.write(file_path, arcname=obs.fileName)
-                                files_added += 1
-                                print(f"  ✓ Successfully added to ZIP")
-                            except Exception as add_error:
-                                print(f"  ✗ Error adding file to ZIP: {add_error}")
-                        else:
-                            print(f"  ✗ File not found at path")
-                        #else:
-                        #    print(f"  ✗ File skipped (invalid extension or date range)")
-                            
-            except Exception as e:
-                print(f"Error creating ZIP file: {str(e)}")
-                return Response({"detail": f"Failed to generate zip file: {str(e)}"},
-                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            print(f"ZIP creation completed: {files_added}/{files_processed} files added to archive")
-            
-            # Check if any files were actually added
+            print(f"Streaming ZIP archive: {zip_filename}")
+
+            # VALIDATION: Only archive observations whose data exists on the filesystem
+            members = []
+            for obs in observations:
+                # CONSTRUCT FILE PATH: Build full path to observation file (or DRF directory)
+                file_path = '/'.join(obs.path.split('/')[:-1]) + '/' + obs.fileName
+                if os.path.exists(file_path):
+                    members.append((file_path, obs.fileName))
+                else:
+                    print(f"  ✗ File not found at path: {file_path}")
+
+            files_processed = len(observations)
+            files_added = len(members)
+            print(f"ZIP archive will hold {files_added}/{files_processed} observations")
+
+            # Check if any files will actually be added
             if files_added == 0:
                 return Response({"detail": "No valid observation files found to include in archive"},
                                 status=status.HTTP_404_NOT_FOUND)
 
-            # RETURN ZIP FILE: Send ZIP archive as download with custom headers
-            response = FileResponse(open(zip_path, 'rb'),
-                                as_attachment=True,
-                                filename=zip_filename,
-                                content_type="application/zip")
-            
+            def entries():
+                for file_path, arcname in members:
+                    yield from iter_entries(file_path, arcname)
+
+            # RETURN ZIP FILE: Stream the archive as it is built; nothing is written to disk
+            response = StreamingHttpResponse(
+                stream_zip(entries(),
+                           on_error=lambda path, ex: print(f"  ✗ Error adding {path} to ZIP: {ex}")),
+                content_type="application/zip")
+            response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
+
             # Add custom headers visible to user
             response['X-Files-Discovered'] = str(len(observations))
             response['X-Files-Processed'] = str(files_processed)
@@ -292,10 +276,13 @@ class ObservationDownloadAPIView(APIView):
                                 status=status.HTTP_404_NOT_FOUND)
             
             # RETURN SINGLE FILE: Send observation file as download with custom headers
-            response = FileResponse(open(file_path, 'rb'),
-                                as_attachment=True,
-                                filename=obs.fileName,
-                                content_type="application/zip")
+            # (sent by nginx when X-Accel-Redirect delivery is enabled; a DRF
+            # observation is a directory and is sent as its cached ZIP archive)
+            if os.path.isdir(file_path):
+                response = file_response(cached_archive(obs, file_path),
+                                         obs.fileName + '.zip', "application/zip")
+            else:
+                response = file_response(file_path, obs.fileName, "application/zip")
             
             # Add custom headers visible to user
             response['X-Files-Discovered'] = '1'
@@ -304,3 +291,151 @@ class ObservationDownloadAPIView(APIView):
             response['X-Archive-Type'] = 'single-file'
             
             return response
+
+
+def _parse_utc(value):
+    """ISO 8601 time; naive values (and a trailing Z) are taken as UTC."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+class ObservationRangeDownloadAPIView(APIView):
+    throttle_classes = [AnonRateThrottle]
+
+    def get(self, request, id=None, format=None):
+        '''
+        Download a time range of one Digital RF observation.
+
+        AUTHENTICATION: No authentication required - publicly accessible with rate limiting
+
+        REQUIRED PARAMETERS:
+        - start: UTC start time, YYYY-MM-DDTHH:MM[:SS] (e.g. "2024-01-01T12:00")
+        - end: UTC end time, same format
+
+        OPTIONAL PARAMETERS:
+        - subchannel: only this subchannel (0-based) of a multi-frequency observation
+
+        EXAMPLE:
+        curl -o flare.zip \
+        "https://pswsnetwork.eng.ua.edu/observations/rangeapi/1234/?start=2024-01-01T12:00&end=2024-01-01T13:00&subchannel=1"
+
+        RESPONSE:
+        - A ZIP archive holding a valid Digital RF dataset (ch0 and its metadata)
+          with only the requested samples
+        - Invalid parameters or an empty range: HTTP 400 with error details
+        - Unknown observation or no DRF data on the filesystem: HTTP 404
+        '''
+        observation = get_object_or_404(Observation, id=id)
+
+        start = request.query_params.get("start")
+        end = request.query_params.get("end")
+        subchannel = request.query_params.get("subchannel")
+
+        # VALIDATION: Parse the time range (UTC)
+        if not (start and end):
+            return Response({"detail": "Missing start or end parameters"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start_dt, end_dt = (_parse_utc(start), _parse_utc(end))
+        except ValueError:
+            return Response({"detail": "start and end must be in YYYY-MM-DDTHH:MM[:SS] format"}, status=status.HTTP_400_BAD_REQUEST)
+        if end_dt <= start_dt:
+            return Response({"detail": "end must be after start"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if subchannel is not None:
+            try:
+                subchannel = int(subchannel)
+            except ValueError:
+                return Response({"detail": "subchannel must be a valid integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # VALIDATION: Only Digital RF observations (directories with a ch0 channel) can be sliced
+        data_dir = observation.path
+        if not os.path.isdir(os.path.join(data_dir, "ch0")):
+            return Response({"detail": "Observation has no Digital RF data on the filesystem."},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            chunks = stream_range(data_dir, observation.fileName, start_dt, end_dt, subchannel)
+        except RangeError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        zip_filename = "%s_%s_%s.zip" % (observation.fileName,
+                                         start_dt.strftime("%Y%m%dT%H%M%S"),
+                                         end_dt.strftime("%Y%m%dT%H%M%S"))
+        response = StreamingHttpResponse(chunks, content_type="application/zip")
+        response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
+        response['X-Archive-Type'] = 'drf-range'
+        return response
+
+
+class MagnetometerDailyAPIView(APIView):
+    throttle_classes = [AnonRateThrottle]
+
+    def get(self, request, format=None):
+        '''
+        Daily magnetometer aggregates (written at ingest) for one station and day.
+
+        AUTHENTICATION: No authentication required - publicly accessible with rate limiting
+
+        REQUIRED PARAMETERS:
+        - station_id: Station identifier (e.g. "N000015")
+        - date: YYYY-MM-DD (UTC day)
+
+        OPTIONAL PARAMETERS:
+        - resolution: "1min" or "10min" (default "10min")
+        - instrument_id: only this instrument (integer)
+
+        EXAMPLE:
+        curl "https://pswsnetwork.eng.ua.edu/observations/magapi/?station_id=N000015&date=2024-05-11&resolution=10min"
+
+        RESPONSE:
+        - JSON with one entry per instrument: bin start times (UTC, ISO 8601),
+          sample counts and Bx/By/Bz/temp mean, min, max and NaN counts per bin
+        - axis_transform: the instrument's calibrated axis matrix M (corrected
+          (Bx, By, Bz) = M @ raw), or null if it has no calibration
+        - No product for that station and day: HTTP 404
+        - Invalid parameters: HTTP 400 with error details
+        '''
+        station_id = request.query_params.get("station_id")
+        date = request.query_params.get("date")
+        resolution = request.query_params.get("resolution", "10min")
+        instrument_id = request.query_params.get("instrument_id")
+
+        # VALIDATION: Required parameters and their formats
+        if not (station_id and date):
+            return Response({"detail": "Missing station_id or date parameters"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            date = datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            return Response({"detail": "date must be in YYYY-MM-DD format"}, status=status.HTTP_400_BAD_REQUEST)
+        if resolution not in RESOLUTIONS:
+            return Response({"detail": "resolution must be one of: " + ", ".join(RESOLUTIONS)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if instrument_id is not None and not instrument_id.isdigit():
+            return Response({"detail": "instrument_id must be a valid integer"}, status=status.HTTP_400_BAD_REQUEST)
+        # station ids are used in product paths; accept only plain identifiers
+        if not station_id.isalnum():
+            return Response({"detail": "Invalid station_id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        instruments = [instrument_id] if instrument_id else day_product_instruments(station_id, date)
+        results = []
+        for instrument in instruments:
+            product = load_day_product(station_id, instrument, date, resolution)
+            if product is None:
+                continue
+            calibration = instrument_calibration(int(instrument))
+            entry = {"instrument_id": int(instrument),
+                     "axis_transform": axis_matrix(calibration).tolist() if calibration else None,
+                     "time": [t.isoformat() for t in product.index]}
+            for column in product.columns:
+                values = product[column].to_numpy()
+                # NaN is not valid JSON
+                entry[column] = [None if v != v else v for v in values.tolist()]
+            results.append(entry)
+
+        if not results:
+            return Response({"detail": "No magnetometer aggregates for this station and date."},
+                            status=status.HTTP_404_NOT_FOUND)
+        return Response({"station_id": station_id, "date": date, "resolution": resolution,
+                         "instruments": results})
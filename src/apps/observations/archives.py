@@ -0,0 +1,104 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Streaming ZIP archives for observation downloads.
+
+stream_zip() yields the archive as it is written, so a download starts
+immediately and memory use does not depend on the archive size: files are
+read in CHUNK_SIZE pieces and only the bytes produced since the last yield
+are held. zipfile writes to the unseekable sink using data descriptors and
+switches to ZIP64 for large members by itself.
+
+Members that are already compressed (.zip, .h5) are STORED; everything else
+is DEFLATED.
+"""
+import io
+import os
+import zipfile
+
+CHUNK_SIZE = 1024 * 1024
+STORED_EXTENSIONS = ('.zip', '.h5', '.hdf5', '.gz', '.png', '.jpg')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file object that collects what zipfile writes."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def compress_type_for(name):
+    if name.lower().endswith(STORED_EXTENSIONS):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def iter_entries(path, arcname):
+    """
+    (file path, archive name) pairs for a file, or for every file below a
+    directory (e.g. a DRF dataset) with arcname as the top-level folder.
+    """
+    if os.path.isfile(path):
+        yield path, arcname
+        return
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        rel = os.path.relpath(dirpath, path)
+        for name in sorted(filenames):
+            file_path = os.path.join(dirpath, name)
+            if os.path.islink(file_path):
+                continue
+            member = name if rel == '.' else os.path.join(rel, name)
+            yield file_path, os.path.join(arcname, member) if arcname else member
+
+
+def stream_zip(entries, on_error=None):
+    """
+    Yield the bytes of a ZIP archive holding the given (file path, archive
+    name) pairs. A member that cannot be read is skipped and reported to
+    on_error(path, exception).
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode='w', allowZip64=True) as zf:
+        for file_path, arcname in entries:
+            try:
+                zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+                zinfo.compress_type = compress_type_for(arcname)
+                with open(file_path, 'rb') as src, zf.open(zinfo, mode='w') as dest:
+                    while True:
+                        block = src.read(CHUNK_SIZE)
+                        if not block:
+                            break
+                        dest.write(block)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            except OSError as ex:
+                # a member that failed part way has already been sent; the
+                # archive stays readable because zipfile closes the entry
+                if on_error:
+                    on_error(file_path, ex)
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
@@ -0,0 +1,177 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Download delivery for observation files, plots and DRF archives.
+
+Django decides what may be downloaded; with DOWNLOAD_ACCEL_ENABLED the bytes
+are then sent by nginx through an X-Accel-Redirect to an internal location
+(see deploy/nginx/psws.conf), so a slow client does not hold a gunicorn
+worker. Without it (development) the file is streamed by Django.
+
+DRF observations are directories. They are zipped once into a
+content-addressed cache (DOWNLOAD_ARCHIVE_CACHE_DIR) keyed by the
+observation's id, size and end date, which ingest updates whenever the
+dataset grows, and the dataset directory's mtime; building the key costs
+one stat, not a walk of the tree. Later downloads of unchanged data reuse
+the archive. An archive is built once even when several requests (in any
+gunicorn worker) ask for it at the same time: the first takes a lock and
+builds it, the others wait on the lock and then serve the result.
+Archives unused for DOWNLOAD_ARCHIVE_CACHE_MAX_AGE_HOURS are evicted, as are
+the least recently used ones when the cache grows past
+DOWNLOAD_ARCHIVE_CACHE_MAX_BYTES. Partly written archives count against the
+budget and are removed once older than DOWNLOAD_ARCHIVE_BUILD_TIMEOUT (the
+worker building them was killed).
+"""
+import fcntl
+import hashlib
+import mimetypes
+import os
+import tempfile
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+
+from .archives import iter_entries, stream_zip
+
+
+def _accel_location(path):
+    """Internal nginx URI for path, or None if it is outside every mapped root."""
+    real = os.path.realpath(path)
+    for root, location in settings.DOWNLOAD_ACCEL_MAP.items():
+        root = os.path.realpath(root)
+        if real.startswith(root.rstrip('/') + '/'):
+            return location.rstrip('/') + '/' + quote(os.path.relpath(real, root))
+    return None
+
+
+def file_response(path, filename, content_type=None):
+    """Attachment response for a file, delivered by nginx when possible."""
+    if content_type is None:
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    location = _accel_location(path) if settings.DOWNLOAD_ACCEL_ENABLED else None
+    if location is None:
+        return FileResponse(open(path, 'rb'), as_attachment=True,
+                            filename=filename, content_type=content_type)
+    response = HttpResponse(content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+    response['X-Accel-Redirect'] = location
+    return response
+
+
+# ---------------------------------------------------------------------
+# DRF directory archives
+# ---------------------------------------------------------------------
+
+def archive_key(observation, data_dir):
+    stamp = '%s:%s:%s:%s:%d' % (observation.id, os.path.realpath(data_dir), observation.size,
+                                observation.endDate.isoformat() if observation.endDate else '',
+                                os.stat(data_dir).st_mtime_ns)
+    return hashlib.sha1(stamp.encode('utf-8')).hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(settings.DOWNLOAD_ARCHIVE_CACHE_DIR, key[:2], key + '.zip')
+
+
+def _build_archive(data_dir, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            # members relative to the dataset directory, as make_archive did
+            for chunk in stream_zip(iter_entries(data_dir, '')):
+                f.write(chunk)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def evict_archives(keep=None):
+    """
+    Delete abandoned partial archives and archives not used within the age
+    limit, then the least recently used ones until the cache fits its size
+    budget. Archives still being built count against the budget.
+    """
+    budget = settings.DOWNLOAD_ARCHIVE_CACHE_MAX_BYTES
+    now = time.time()
+    oldest_use = now - settings.DOWNLOAD_ARCHIVE_CACHE_MAX_AGE_HOURS * 3600
+    oldest_build = now - settings.DOWNLOAD_ARCHIVE_BUILD_TIMEOUT
+    cache_dir = settings.DOWNLOAD_ARCHIVE_CACHE_DIR
+    archives = []
+    building = 0
+    for dirpath, _, filenames in os.walk(cache_dir):
+        for name in filenames:
+            if not name.endswith(('.zip', '.part')):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith('.zip'):
+                archives.append((st.st_mtime, st.st_size, path))
+            elif st.st_mtime < oldest_build:
+                # not written to for the build timeout: its builder is gone
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            else:
+                building += st.st_size
+    total = building + sum(size for _, size, _ in archives)
+    for last_used, size, path in sorted(archives):
+        if total <= budget and last_used >= oldest_use:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+        try:
+            os.remove(path + '.lock')
+        except OSError:
+            pass
+
+
+def cached_archive(observation, data_dir):
+    """Path of an up-to-date ZIP of an Observation's data_dir, building it on a cache miss."""
+    path = _cache_path(archive_key(observation, data_dir))
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.lock', 'a') as lock:
+            # one builder per archive; concurrent requests wait here
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if not os.path.exists(path):
+                    _build_archive(data_dir, path)
+                    # later requests find the archive and never take the lock;
+                    # anyone still waiting holds the lock file open
+                    try:
+                        os.remove(path + '.lock')
+                    except OSError:
+                        pass
+                    evict_archives(keep=path)
+                    return path
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    # the mtime records the last use for LRU / age eviction
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return path
@@ -0,0 +1,167 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Time-range extraction from Digital RF observations.
+
+extract_range() copies only the samples between two times (optionally one
+subchannel) into a new, valid Digital RF dataset: the samples are read raw
+with read_vector_raw() per continuous block, in bounded chunks, and written
+with DigitalRFWriter using the source channel's sample rate, data type and
+file layout; gaps stay gaps. The channel metadata in effect at the start of
+the range, and any metadata within it, is copied as well (center
+frequencies cut down to the chosen subchannel).
+
+stream_range() wraps this for downloads: the dataset is written to a
+temporary directory, streamed back as a ZIP and removed afterwards.
+"""
+import math
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .archives import iter_entries, stream_zip
+
+CHANNEL = 'ch0'
+CHUNK_SAMPLES = 36000  # samples read and written per step (1 hour at 10 sps)
+
+
+class RangeError(ValueError):
+    """The requested range or subchannel does not fit the observation."""
+
+
+def _sample_bounds(start_dt, end_dt, samples_per_second, bounds):
+    first, last = bounds
+    start = max(int(math.ceil(start_dt.timestamp() * samples_per_second)), first)
+    end = min(int(math.floor(end_dt.timestamp() * samples_per_second)), last + 1)
+    if end <= start:
+        raise RangeError("The requested time range holds no data for this observation")
+    return start, end
+
+
+def _copy_metadata(data_dir, out_dir, start, end, subchannel):
+    import digital_rf as drf
+
+    md_dir = os.path.join(data_dir, CHANNEL, 'metadata')
+    if not os.path.isdir(md_dir):
+        return
+    dmr = drf.DigitalMetadataReader(md_dir)
+    md_first, _ = dmr.get_bounds()
+    entries = dmr.read(min(md_first, start), end - 1)
+    # the entry in effect at the range start, then every entry inside the range
+    prior = [idx for idx in entries if idx <= start]
+    wanted = ([prior[-1]] if prior else []) + [idx for idx in entries if idx > start]
+    if not wanted:
+        return
+
+    out_md_dir = os.path.join(out_dir, CHANNEL, 'metadata')
+    os.makedirs(out_md_dir, exist_ok=True)
+    dmw = drf.DigitalMetadataWriter(
+        out_md_dir,
+        dmr.get_subdir_cadence_secs(),
+        dmr.get_file_cadence_secs(),
+        dmr.get_sample_rate_numerator(),
+        dmr.get_sample_rate_denominator(),
+        dmr.get_file_name_prefix(),
+    )
+    for idx in wanted:
+        values = dict(entries[idx])
+        if subchannel is not None and 'center_frequencies' in values:
+            freqs = np.atleast_1d(values['center_frequencies'])
+            if subchannel < len(freqs):
+                values['center_frequencies'] = freqs[subchannel:subchannel + 1]
+        dmw.write(max(idx, start), values)
+
+
+def extract_range(data_dir, out_dir, start_dt, end_dt, subchannel=None):
+    """
+    Write the samples of data_dir between start_dt and end_dt (aware
+    datetimes) as a Digital RF dataset in out_dir. Returns the number of
+    samples written.
+    """
+    import digital_rf as drf
+
+    reader = drf.DigitalRFReader(data_dir)
+    props = reader.get_properties(CHANNEL)
+    num_subchannels = int(props['num_subchannels'])
+    if subchannel is not None and not 0 <= subchannel < num_subchannels:
+        raise RangeError("subchannel must be between 0 and %d" % (num_subchannels - 1))
+
+    samples_per_second = props['sample_rate_numerator'] / props['sample_rate_denominator']
+    start, end = _sample_bounds(start_dt, end_dt, samples_per_second,
+                                reader.get_bounds(CHANNEL))
+    blocks = reader.get_continuous_blocks(start, end - 1, CHANNEL)
+    if not blocks:
+        raise RangeError("The requested time range holds no data for this observation")
+
+    writer = None
+    writer_start = None
+    written = 0
+    try:
+        for block_start, block_len in blocks.items():
+            lo = max(int(block_start), start)
+            hi = min(int(block_start) + int(block_len), end)
+            for chunk_start in range(lo, hi, CHUNK_SAMPLES):
+                count = min(CHUNK_SAMPLES, hi - chunk_start)
+                data = reader.read_vector_raw(chunk_start, count, CHANNEL)
+                data = data.reshape(count, -1)
+                if subchannel is not None:
+                    data = data[:, subchannel:subchannel + 1]
+                if writer is None:
+                    channel_dir = os.path.join(out_dir, CHANNEL)
+                    os.makedirs(channel_dir, exist_ok=True)
+                    writer = drf.DigitalRFWriter(
+                        channel_dir,
+                        data.dtype,
+                        props['subdir_cadence_secs'],
+                        props['file_cadence_millisecs'],
+                        chunk_start,
+                        props['sample_rate_numerator'],
+                        props['sample_rate_denominator'],
+                        compression_level=0,
+                        checksum=False,
+                        is_complex=bool(props['is_complex']),
+                        num_subchannels=data.shape[1],
+                        is_continuous=bool(props['is_continuous']),
+                        marching_periods=False,
+                    )
+                    writer_start = chunk_start
+                # next_sample is relative to the writer's start_global_index
+                writer.rf_write(data, next_sample=chunk_start - writer_start)
+                written += count
+    finally:
+        if writer is not None:
+            writer.close()
+
+    _copy_metadata(data_dir, out_dir, start, end, subchannel)
+    return written
+
+
+def stream_range(data_dir, name, start_dt, end_dt, subchannel=None):
+    """
+    Extract the range into a temporary dataset and return a generator of ZIP
+    bytes for it (members under name/). The temporary dataset is removed once
+    the generator finishes or is closed. Raises RangeError before anything is
+    streamed if the range is empty or the subchannel is invalid.
+    """
+    tmp_dir = tempfile.mkdtemp(prefix='psws-range-')
+    try:
+        extract_range(data_dir, tmp_dir, start_dt, end_dt, subchannel)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    def generate():
+        try:
+            yield from stream_zip(iter_entries(tmp_dir, name))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return generate()
@@ -45,5 +45,8 @@ class DateTimeForm(forms.Form):
                 '%m/%d/%y'              # '10/25/06'
             ])
 
+    subchannel = forms.IntegerField(label='Subchannel (optional)', required=False, min_value=0,
+            help_text='Leave blank for all subchannels')
+
     class Meta:
-        fields = ('start_date', 'end_date')
+        fields = ('start_date', 'end_date', 'subchannel')
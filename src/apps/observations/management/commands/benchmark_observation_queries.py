@@ -0,0 +1,197 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+
+from apps.instruments.models import Instrument
+from apps.observations.models import Observation
+from apps.stations.models import Station
+
+from datetime import datetime, timedelta, timezone
+import random
+import statistics
+import time
+
+'''
+EXAMPLE USAGE
+
+python manage.py benchmark_observation_queries --rows 1000000 --stations 200 --compare
+
+Seeds synthetic observations, then reports the query plan and timings of the
+observation access paths that matter at scale. With --compare the composite
+indexes declared on Observation.Meta are dropped for a first ("before") pass
+and restored for the second ("after") pass. The seeded stations, instruments
+and observations are deleted at the end unless --keep is given.
+'''
+
+BENCH_USERNAME = "psws_benchmark"
+BENCH_STATION_PREFIX = "B"
+FIRST_DAY = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+class Command(BaseCommand):
+    help = "Seed synthetic observations and report query plans and timings for the observation access paths"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help="Synthetic observations to create")
+        parser.add_argument('--stations', type=int, default=50, help="Synthetic stations to spread them over")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk insert")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per query")
+        parser.add_argument('--compare', action='store_true',
+                            help="Run once without the Observation indexes, then again with them")
+        parser.add_argument('--keep', action='store_true', help="Keep the synthetic data afterwards")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed for the synthetic data")
+
+    def handle(self, *args, **kwargs):
+        rng = random.Random(kwargs['seed'])
+
+        stations, instruments = self.seed_stations(kwargs['stations'])
+        try:
+            started = time.perf_counter()
+            days = self.seed_observations(rng, instruments, kwargs['rows'], kwargs['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                "Seeded %d observations over %d stations in %.1fs" % (
+                    kwargs['rows'], len(stations), time.perf_counter() - started)))
+
+            queries = self.access_paths(rng, stations, instruments, days)
+            if kwargs['compare']:
+                dropped = self.drop_indexes()
+                try:
+                    self.run_pass("before (without indexes)", queries, kwargs['repeat'])
+                finally:
+                    self.restore_indexes(dropped)
+            self.run_pass("after (with indexes)", queries, kwargs['repeat'])
+        finally:
+            if kwargs['keep']:
+                self.stdout.write(self.style.WARNING("Keeping synthetic data (stations %s*)" % BENCH_STATION_PREFIX))
+            else:
+                self.cleanup()
+
+    # ------------------------------------------------------------------
+    # synthetic data
+    # ------------------------------------------------------------------
+
+    def seed_stations(self, count):
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME,
+                                             defaults={'email': 'benchmark@localhost'})
+        stations = []
+        instruments = []
+        for n in range(count):
+            station = Station.objects.create(
+                user=user,
+                station_id="%s%06d" % (BENCH_STATION_PREFIX, n),
+                nickname="Benchmark %d" % n,
+                antenna_1="NA",
+            )
+            stations.append(station)
+            instruments.append(Instrument.objects.create(
+                instrument="Benchmark", station=station, nickname="Benchmark %d" % n))
+        return stations, instruments
+
+    def seed_observations(self, rng, instruments, rows, batch_size):
+        """One observation per instrument and day, as ingest creates them. Returns the days covered."""
+        days_per_instrument = max(1, -(-rows // len(instruments)))
+        batch = []
+        created = 0
+        with transaction.atomic():
+            for day in range(days_per_instrument):
+                for instrument in instruments:
+                    if created == rows:
+                        break
+                    start = FIRST_DAY + timedelta(days=day, seconds=rng.randrange(60))
+                    batch.append(Observation(
+                        dataRate=10,
+                        station_id=instrument.station_id,
+                        instrument=instrument,
+                        size=rng.randrange(10**6, 10**8),
+                        fileName="OBS%sT000000" % start.strftime("%Y-%m-%d"),
+                        path="/psws/benchmark/%s" % instrument.station_id,
+                        startDate=start,
+                        endDate=start + timedelta(days=1) - timedelta(seconds=1),
+                    ))
+                    created += 1
+                    if len(batch) >= batch_size:
+                        Observation.objects.bulk_create(batch)
+                        batch = []
+            if batch:
+                Observation.objects.bulk_create(batch)
+        return days_per_instrument
+
+    def cleanup(self):
+        # observations and instruments go with their stations (CASCADE)
+        deleted, _ = Station.objects.filter(user__username=BENCH_USERNAME).delete()
+        User.objects.filter(username=BENCH_USERNAME).delete()
+        self.stdout.write(self.style.SUCCESS("Removed synthetic data (%d rows)" % deleted))
+
+    # ------------------------------------------------------------------
+    # access paths
+    # ------------------------------------------------------------------
+
+    def access_paths(self, rng, stations, instruments, days):
+        instrument = rng.choice(instruments)
+        day = FIRST_DAY + timedelta(days=rng.randrange(days))
+        file_name = "OBS%sT000000" % day.strftime("%Y-%m-%d")
+        station = rng.choice(stations)
+        return [
+            # psws_addOBS / addCSV / addMAG and the plotters
+            ("ingest lookup (station, instrument, fileName)",
+             Observation.objects.filter(station_id=instrument.station_id,
+                                        instrument_id=instrument.id, fileName=file_name)),
+            # ObservationDownloadAPIView / analysis_map
+            ("date range (startDate, endDate)",
+             Observation.objects.filter(startDate__gte=day, endDate__lte=day + timedelta(days=7))),
+            # ObservationListView
+            ("list newest first (-endDate)",
+             Observation.objects.order_by('-endDate', 'id')[:8]),
+            # station pages: newest observations of one station
+            ("station newest first (station, -endDate)",
+             Observation.objects.filter(station_id=station.id).order_by('-endDate')[:8]),
+        ]
+
+    def run_pass(self, label, queries, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== %s ===" % label))
+        for name, queryset in queries:
+            self.stdout.write(self.style.MIGRATE_LABEL("\n%s" % name))
+            self.stdout.write(queryset.explain())
+            timings = []
+            for _ in range(max(1, repeat)):
+                started = time.perf_counter()
+                list(queryset.all())  # .all() bypasses the queryset result cache
+                timings.append((time.perf_counter() - started) * 1000.0)
+            self.stdout.write("min %.2f ms  median %.2f ms  max %.2f ms  (%d runs)" % (
+                min(timings), statistics.median(timings), max(timings), len(timings)))
+
+    # ------------------------------------------------------------------
+    # index toggling for --compare
+    # ------------------------------------------------------------------
+
+    def existing_index_names(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Observation._meta.db_table)
+        return {name for name, info in constraints.items() if info['index']}
+
+    def drop_indexes(self):
+        existing = self.existing_index_names()
+        dropped = []
+        with connection.schema_editor() as editor:
+            for index in Observation._meta.indexes:
+                if index.name in existing:
+                    editor.remove_index(Observation, index)
+                    dropped.append(index)
+        missing = [index.name for index in Observation._meta.indexes if index not in dropped]
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                "Not in the database (run migrate?): %s" % ", ".join(missing)))
+        return dropped
+
+    def restore_indexes(self, indexes):
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.add_index(Observation, index)
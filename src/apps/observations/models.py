@@ -42,5 +42,15 @@ class Observation(models.Model):
     # Timestamp from which the observation ended for the given time period
     endDate = models.DateTimeField("End Date (UTC)", null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # ingest and plotters look an observation up by station, instrument and file
+            models.Index(fields=['station', 'instrument', 'fileName'], name='obs_station_instr_file_idx'),
+            # date range queries (download API, analysis map)
+            models.Index(fields=['startDate', 'endDate'], name='obs_start_end_idx'),
+            # newest observations of a station
+            models.Index(fields=['station', 'endDate'], name='obs_station_end_idx'),
+        ]
+
     def __str__(self):
         return 'Observation_' + self.station.station_id + '_' + self.fileName
@@ -6,6 +6,56 @@
 #
 # The full license is in the LICENSE file, distributed with this software.
 # ----------------------------------------------------------------------------
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timezone
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+try:
+    import digital_rf as drf
+    import numpy as np
+except ImportError:
+    drf = None
+
+from .drf_extract import CHANNEL, extract_range
+
+
+@unittest.skipIf(drf is None, "digital_rf is not installed")
+class ExtractRangeTests(SimpleTestCase):
+    SPS = 10
+    START = 1600000000 * SPS
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.src = os.path.join(self.tmp, 'src')
+        os.makedirs(os.path.join(self.src, CHANNEL))
+        self.samples = (np.arange(400) + 1j * np.arange(400)).astype(np.complex64)
+        writer = drf.DigitalRFWriter(
+            os.path.join(self.src, CHANNEL), np.complex64, 3600, 1000, self.START,
+            self.SPS, 1, compression_level=0, checksum=False, is_complex=True,
+            num_subchannels=1, is_continuous=False, marching_periods=False)
+        # two blocks with a gap: [0, 200) and [300, 400)
+        writer.rf_write(self.samples[:200], next_sample=0)
+        writer.rf_write(self.samples[300:], next_sample=300)
+        writer.close()
+
+    def at(self, index):
+        return datetime.fromtimestamp((self.START + index) / self.SPS, timezone.utc)
+
+    def test_range_round_trip(self):
+        out = os.path.join(self.tmp, 'out')
+        written = extract_range(self.src, out, self.at(50), self.at(350))
+        self.assertEqual(written, 200)
+
+        reader = drf.DigitalRFReader(out)
+        blocks = reader.get_continuous_blocks(self.START, self.START + 400, CHANNEL)
+        self.assertEqual({int(k): int(v) for k, v in blocks.items()},
+                         {self.START + 50: 150, self.START + 300: 50})
+        np.testing.assert_array_equal(
+            reader.read_vector_raw(self.START + 50, 150, CHANNEL).ravel(), self.samples[50:200])
+        np.testing.assert_array_equal(
+            reader.read_vector_raw(self.START + 300, 50, CHANNEL).ravel(), self.samples[300:350])
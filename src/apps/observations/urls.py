@@ -9,7 +9,7 @@
 from django.urls import path
 from . import views
 from .views import ObservationListView
-from .apiviews import ObservationDownloadAPIView
+from .apiviews import ObservationDownloadAPIView, ObservationRangeDownloadAPIView, MagnetometerDailyAPIView
 
 urlpatterns = [
         path('observation_list/', ObservationListView.as_view(), name="observation_list"),
@@ -20,4 +20,6 @@ urlpatterns = [
         path('select_download_range/<int:id>/', views.select_download_range, name='select_download_range'),
         path('download_range/<int:id>/', views.download_range, name='download_range'),
         path('downloadapi/', ObservationDownloadAPIView.as_view(), name='observation-download'),
+        path('rangeapi/<int:id>/', ObservationRangeDownloadAPIView.as_view(), name='observation-range-download'),
+        path('magapi/', MagnetometerDailyAPIView.as_view(), name='magnetometer-daily'),
         ]
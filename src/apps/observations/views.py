@@ -15,7 +15,7 @@ from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django_tables2 import SingleTableView, SingleTableMixin
 from django_filters.views import FilterView
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, Http404, StreamingHttpResponse
 from django.contrib import messages
 from django.core.files.temp import NamedTemporaryFile
 from django.conf import settings
@@ -25,8 +25,9 @@ from .models import Instrument
 from .tables import ObservationTable
 from .filters import ObservationFilter
 from .forms import DateTimeForm
+from .delivery import cached_archive, file_response
+from .drf_extract import RangeError, stream_range
 
-import shutil
 import os
 import mimetypes
 import zipfile
@@ -54,13 +55,11 @@ def download_plot(request, id=None):
     
     # determines path to retrieve plot img from as well as file type
     file_path= observation.plotPath + '/' + observation.plotFile
-    img_file= open(file_path, 'rb')
-    mime_type= mimetypes.guess_type(file_path)
+    mime_type, _ = mimetypes.guess_type(file_path)
     
     # creates and returns site response triggering img file download
-    response= HttpResponse(img_file, content_type=mime_type)
-    response['Content-Disposition'] = "attachment; filename=%s" % observation.plotFile
-    return response
+    # (sent by nginx when X-Accel-Redirect delivery is enabled)
+    return file_response(file_path, observation.plotFile, mime_type)
 
 def download_file(request, id=None):
     observation = get_object_or_404(Observation, id=id)
@@ -74,48 +73,31 @@ def download_file(request, id=None):
     
     fl_path = fl_path.replace(":", "_")
 
-    try:  # does the requested tar file exist?
-        fl = open(fl_path, 'rb')
-    except IOError:  # file is not there, see if this is request for download of  DRF dataset
-        obs = get_object_or_404(Observation, id=id)
-        fl_path =  obs.fileName
-        file_extension  = os.path.splitext(fl_path)[1]
-        # here we skip doing the tar if the file is already in zip format
-        # In version 1, this is magnetometer
-        if file_extension == ".zip":
-            fl_path = observation.path + "/" +observation.fileName # correct this
-            fl = open(fl_path, 'rb')
-            mime_type, _ = mimetypes.guess_type(fl_path)
-            response = HttpResponse(fl, content_type=mime_type)
-            response['Content-Disposition'] = "attachment; filename=%s" % observation.fileName
-            return response
-        
-        total_path = obs.path
-        zip_path = "/psws/temp/ziptemp/" + total_path.rsplit('/')[2] +   \
-                   "/temp/" + total_path.rsplit('/')[3]
-        print("tar file to: " + zip_path)
-
-        shutil.make_archive(zip_path, 'zip', total_path)
-        command = "chmod 777 " + zip_path + ".zip"  # this is to allow leter cleanup
-        os.system(command)  
-        #fl = open(zip_path + '.zip', 'rb')
-
-        # The following replaces the original tar/gzip code as it produces a
-        # zip file without the internal directory structure
-        fl = open(zip_path + '.zip', 'rb')
-        os.remove(zip_path)
-        mime_type, _ = mimetypes.guess_type(zip_path+'.zip')
-        response = HttpResponse(fl, content_type=mime_type)
-        response['Content-Disposition'] = "attachment; filename=%s" % fl_path+'.zip'
+    if os.path.isfile(fl_path):  # does the requested file exist?
+        mime_type, _ = mimetypes.guess_type(fl_path)
+        # potentially need to change content_type="application/x-tar"
+        return file_response(fl_path, filename, mime_type)
+
+    # file is not there, see if this is request for download of DRF dataset
+    obs = get_object_or_404(Observation, id=id)
+    fl_path =  obs.fileName
+    file_extension  = os.path.splitext(fl_path)[1]
+    # here we skip doing the zip if the file is already in zip format
+    # In version 1, this is magnetometer
+    if file_extension == ".zip":
+        fl_path = observation.path + "/" +observation.fileName # correct this
+        mime_type, _ = mimetypes.guess_type(fl_path)
+        return file_response(fl_path, observation.fileName, mime_type)
 
-        return response 
+    # DRF dataset: zip the directory once and reuse the archive until the data changes
+    total_path = obs.path
+    if not os.path.isdir(total_path):
+        raise Http404("Observation data not found")
+    zip_path = cached_archive(obs, total_path)
+    print("archive for " + total_path + ": " + zip_path)
 
-    mime_type, _ = mimetypes.guess_type(fl_path)
-    # potentially need to change content_type="application/x-tar"
-    response = HttpResponse(fl, content_type=mime_type)
-    # response = HttpResponse(fl, content_type="application/x-tar")
-    response['Content-Disposition'] = "attachment; filename=%s" % filename
-    return response
+    # The archive holds the dataset without the internal top-level directory
+    return file_response(zip_path, fl_path + '.zip', 'application/zip')
 
 def download_range(request, id=None):
     observation = get_object_or_404(Observation, id=id)
@@ -155,33 +137,46 @@ def download_range(request, id=None):
     
     if instrument.instrumenttype_id == 3 or instrument.instrumenttype_id == 6:
         full_path = fl_path + "/" + filename
-        fl = open(full_path, "rb")
         mime_type, _ = mimetypes.guess_type(fl_path)
-        response = HttpResponse(fl, content_type=mime_type)
-        response['Content-Disposition'] = "attachment; filename=%s" % filename
-        return response
+        return file_response(full_path, filename, mime_type)
 
     #zip_path = "/home/ziptemp/" + fl_path.rsplit('/')[2] + \
     #        "/temp/" + filename[:3] + start + "-" + end
 
-    zip_name = "Range-" + filename
-    zip_path = "/psws/temp/ziptemp/" + zip_name
-    print(zip_path)
-
-    shutil.make_archive(zip_path, 'zip', full_path)
-    command = "chmod 777 " + zip_path + ".zip"  # this is to allow leter cleanup
-    os.system(command)
-    #fl = open(zip_path + '.zip', 'rb')
+    if not os.path.isdir(full_path):
+        raise Http404("Observation data not found")
+
+    # DRF dataset with a time range: extract just those samples (optionally
+    # one subchannel) into a new DRF dataset and stream it
+    if request.POST.get('start_date') or request.POST.get('end_date'):
+        form = DateTimeForm(request.POST)
+        if not form.is_valid():
+            for field, errors in form.errors.items():
+                messages.error(request, "Error: %s: %s" % (field, " ".join(errors)))
+            return HttpResponseRedirect(request.META.get('HTTP_REFERER', '/'))
+        start = form.cleaned_data['start_date']
+        end = form.cleaned_data['end_date']
+        if end <= start:
+            messages.error(request, "Error: End date before start date")
+            return HttpResponseRedirect(request.META.get('HTTP_REFERER', '/'))
+        try:
+            chunks = stream_range(full_path, filename, start, end,
+                                  form.cleaned_data['subchannel'])
+        except RangeError as e:
+            messages.error(request, "Error: %s" % e)
+            return HttpResponseRedirect(request.META.get('HTTP_REFERER', '/'))
+        response = StreamingHttpResponse(chunks, content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="%s_%s-%s.zip"' % (
+            filename, start.strftime('%Y%m%dT%H%M'), end.strftime('%Y%m%dT%H%M'))
+        return response
 
-    # The following replaces the original tar/gzip code as it produces a
-    # zip file without the internal directory structure
-    fl = open(zip_path + ".zip", 'rb')
-    os.remove(zip_path + ".zip")
-    mime_type, _ = mimetypes.guess_type(zip_path+'.zip')
-    response = HttpResponse(fl, content_type=mime_type)
-    response['Content-Disposition'] = "attachment; filename=%s" % filename+'.zip'
+    # DRF dataset: the same cached archive as download_file (built once, reused
+    # until the data changes; .h5 members are stored, not recompressed)
+    zip_path = cached_archive(observation, full_path)
+    print(zip_path)
 
-    return response
+    # The archive holds the dataset without the internal top-level directory
+    return file_response(zip_path, filename + '.zip', 'application/zip')
 
 
     """
@@ -263,8 +258,8 @@ def select_download_range(request, id=None):
     else:
         centerfreq      = None
 
-    form_class  = DateTimeForm
-    return render(request, 'select_download_range.html', {'observation': observation, 'datatype': datatype, 'centerfreq': centerfreq, 'form': form_class})
+    form  = DateTimeForm(use_required_attribute=False)
+    return render(request, 'select_download_range.html', {'observation': observation, 'datatype': datatype, 'centerfreq': centerfreq, 'form': form})
 
 # Display a list of all observations in the database
 #class ObservationListView(SingleTableView):
@@ -11,3 +11,7 @@ from django.apps import AppConfig
 
 class StationsConfig(AppConfig):
     name = 'apps.stations'
+
+    def ready(self):
+        # station map cache invalidation on station edits
+        from . import station_map  # noqa: F401
@@ -0,0 +1,25 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+from django.core.management.base import BaseCommand
+
+from apps.stations.status import refresh_station_status
+
+'''
+EXAMPLE USAGE (cron, every 5 minutes)
+
+*/5 * * * * cd /psws/psws && python manage.py refresh_station_status
+'''
+
+
+class Command(BaseCommand):
+	help = "Recompute the stored status of every station from its last_alive time"
+
+	def handle(self, *args, **kwargs):
+		updated = refresh_station_status()
+		self.stdout.write(self.style.SUCCESS(f"Station status changed for {updated} stations"))
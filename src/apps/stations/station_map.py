@@ -0,0 +1,84 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Cached station map payload for the home page.
+
+The map needs every shown station's id, position, nickname and grid grouped
+by status. That is built with one query into compact JSON
+
+    {"Online": [[id, longitude, latitude, nickname, grid], ...],
+     "PossiblyOnline": [...], "Offline": [...], "Retired": [...]}
+
+and kept in the default cache, so a home page hit normally does no station
+query at all. The entry is dropped whenever something changes what the map
+shows - a station edit (post_save / post_delete), a status refresh that moved
+a station, a heartbeat or upload that brought a station back online - and
+expires after STATION_MAP_CACHE_SECONDS in any case.
+"""
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Station
+
+STATION_MAP_CACHE_KEY = "stations:map"
+
+MAP_STATUSES = (
+    Station.StationStatus.ONLINE,
+    Station.StationStatus.POSSIBLYONLINE,
+    Station.StationStatus.OFFLINE,
+    "Retired",
+)
+
+# Saves that only record a check-in do not change the map by themselves
+CHECK_IN_FIELDS = frozenset(("last_alive", "last_rID"))
+
+# Safe to place inside <script type="application/json"> (as json_script does)
+_SCRIPT_ESCAPES = {ord('>'): '\\u003E', ord('<'): '\\u003C', ord('&'): '\\u0026'}
+
+
+def build_station_map():
+    """Station map payload as escaped compact JSON, straight from the database."""
+    groups = {str(status): [] for status in MAP_STATUSES}
+    rows = (Station.objects
+            .filter(station_status__in=MAP_STATUSES,
+                    latitude__isnull=False, longitude__isnull=False)
+            .order_by('id')
+            .values_list('station_status', 'id', 'longitude', 'latitude', 'nickname', 'grid'))
+    for status, *station in rows:
+        groups[status].append(station)
+    return json.dumps(groups, separators=(',', ':')).translate(_SCRIPT_ESCAPES)
+
+
+def station_map_json():
+    """Cached station map payload, rebuilt on a miss."""
+    payload = cache.get(STATION_MAP_CACHE_KEY)
+    if payload is None:
+        payload = build_station_map()
+        cache.set(STATION_MAP_CACHE_KEY, payload, settings.STATION_MAP_CACHE_SECONDS)
+    return payload
+
+
+def invalidate_station_map():
+    cache.delete(STATION_MAP_CACHE_KEY)
+
+
+@receiver(post_save, sender=Station, dispatch_uid="station_map_station_saved")
+def _station_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields and CHECK_IN_FIELDS.issuperset(update_fields):
+        return
+    invalidate_station_map()
+
+
+@receiver(post_delete, sender=Station, dispatch_uid="station_map_station_deleted")
+def _station_deleted(sender, instance, **kwargs):
+    invalidate_station_map()
@@ -0,0 +1,95 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2026 University of Alabama, Digital Forensics and Control Systems Security Lab (DCSL)
+# All rights reserved.
+#
+# Distributed under the terms of the BSD 3-clause license.
+#
+# The full license is in the LICENSE file, distributed with this software.
+# ----------------------------------------------------------------------------
+"""
+Station status derived from last_alive.
+
+A station is Online if it was heard from within ONLINE_CUT_OFF_HOURS,
+PossiblyOnline within POSSIBLY_ONLINE_CUT_OFF_HOURS, Offline within
+RETIREMENT_CUT_OFF_HOURS and Retired after that. Stations that have never
+checked in are Inactive and are not shown on the map.
+
+The stored station_status is rewritten by a single UPDATE with a CASE
+expression, at most once per STATION_STATUS_REFRESH_SECONDS (pages call
+refresh_station_status_if_due(); `manage.py refresh_station_status` can run
+it from cron). status_expression() gives the same result computed in a
+queryset, for callers that need it exact to the second. A heartbeat or
+upload marks its station Online straight away with mark_station_alive().
+"""
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, Q, Value, When
+
+from .models import Station
+from .station_map import invalidate_station_map
+
+# last_alive written for stations that had never checked in (older code did this)
+NEVER_ALIVE = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+REFRESH_CACHE_KEY = "stations:status-refresh"
+
+
+def status_expression(now=None):
+    """CASE expression giving each station's status from its last_alive."""
+    if now is None:
+        now = datetime.now(timezone.utc)
+    alive_cutoff = now - timedelta(hours=settings.ONLINE_CUT_OFF_HOURS)
+    dead_cutoff = now - timedelta(hours=settings.POSSIBLY_ONLINE_CUT_OFF_HOURS)
+    retired_cutoff = now - timedelta(hours=settings.RETIREMENT_CUT_OFF_HOURS)
+    return Case(
+        When(Q(last_alive__isnull=True) | Q(last_alive=NEVER_ALIVE), then=Value("Inactive")),
+        When(last_alive__lt=retired_cutoff, then=Value("Retired")),
+        When(last_alive__lt=dead_cutoff, then=Value(Station.StationStatus.OFFLINE)),
+        When(last_alive__lt=alive_cutoff, then=Value(Station.StationStatus.POSSIBLYONLINE)),
+        default=Value(Station.StationStatus.ONLINE),
+        output_field=CharField(),
+    )
+
+
+def refresh_station_status(now=None):
+    """
+    Store the current status of every station with one UPDATE; returns the
+    number of stations whose status changed.
+    """
+    status = status_expression(now)
+    changed = Station.objects.exclude(station_status=status).update(station_status=status)
+    if changed:
+        invalidate_station_map()
+    return changed
+
+
+def mark_station_alive(station_pk, previous_status=None, now=None, **fields):
+    """
+    Record a check-in: last_alive = now and status Online, plus any other
+    fields given, in one UPDATE. previous_status, if the caller already has
+    the station loaded, saves a query when the station was online anyway.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    fields['last_alive'] = now
+    online = Station.StationStatus.ONLINE
+    stations = Station.objects.filter(pk=station_pk)
+    if previous_status != online:
+        if stations.exclude(station_status=online).update(station_status=online, **fields):
+            invalidate_station_map()
+            return
+    stations.update(**fields)
+
+
+def refresh_station_status_if_due():
+    """
+    refresh_station_status() unless some process already ran it within
+    STATION_STATUS_REFRESH_SECONDS (tracked in the shared cache). Returns
+    True if it ran.
+    """
+    if not cache.add(REFRESH_CACHE_KEY, True, timeout=settings.STATION_STATUS_REFRESH_SECONDS):
+        return False
+    refresh_station_status()
+    return True
@@ -130,6 +130,14 @@ ACCOUNT_ACTIVATION_LOG_PATH = env("ACCOUNT_ACTIVATION_LOG_PATH", "")
 ONLINE_CUT_OFF_HOURS = env_int("ONLINE_CUT_OFF_HOURS", 24)
 POSSIBLY_ONLINE_CUT_OFF_HOURS = env_int("POSSIBLY_ONLINE_CUT_OFF_HOURS", 48)
 RETIREMENT_CUT_OFF_HOURS = env_int("RETIREMENT_CUT_OFF_HOURS", 96)
+# Stored station status is recomputed at most this often (seconds)
+STATION_STATUS_REFRESH_SECONDS = env_int("STATION_STATUS_REFRESH_SECONDS", 60)
+# Longest time a worker may hand out an older DataRequest to heartbeats (seconds)
+DATAREQUEST_CACHE_SECONDS = env_int("DATAREQUEST_CACHE_SECONDS", 30)
+# Per-file 1-minute magnetometer means for the analysis graphs
+MAG_AGGREGATE_CACHE_DIR = env("MAG_AGGREGATE_CACHE_DIR", "/psws/temp/mag_cache")
+# Daily magnetometer aggregates written at ingest (see apps/analysis/magdata.py)
+MAG_PRODUCTS_PATH = env("MAG_PRODUCTS_PATH", "/psws/psws/media/products/mag")
 
 # ---------------------------------------------------------------------
 # Middleware
@@ -214,6 +222,45 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = env("DJANGO_MEDIA_URL", "/media/")
 MEDIA_ROOT = env("DJANGO_MEDIA_ROOT", str(BASE_DIR / "media"))
 
+# ---------------------------------------------------------------------
+# Downloads
+# ---------------------------------------------------------------------
+
+# Hand file transfers to nginx (X-Accel-Redirect) instead of streaming
+# them through gunicorn; see deploy/nginx/psws.conf
+DOWNLOAD_ACCEL_ENABLED = env_bool("DOWNLOAD_ACCEL_ENABLED", False)
+# Comma-separated "<filesystem root>=<internal nginx location>" pairs
+DOWNLOAD_ACCEL_MAP = dict(
+    pair.split("=", 1) for pair in env_list(
+        "DOWNLOAD_ACCEL_MAP",
+        "/psws/home/=/_protected/data/,"
+        "/psws/psws/media/plots/=/_protected/plots/,"
+        "/psws/temp/archive_cache/=/_protected/archives/",
+    )
+)
+# Cache of ZIP archives of DRF observation directories
+DOWNLOAD_ARCHIVE_CACHE_DIR = env("DOWNLOAD_ARCHIVE_CACHE_DIR", "/psws/temp/archive_cache")
+DOWNLOAD_ARCHIVE_CACHE_MAX_BYTES = env_int("DOWNLOAD_ARCHIVE_CACHE_MAX_BYTES", 50 * 1024 ** 3)
+DOWNLOAD_ARCHIVE_CACHE_MAX_AGE_HOURS = env_int("DOWNLOAD_ARCHIVE_CACHE_MAX_AGE_HOURS", 168)
+# seconds after which an unfinished archive (.part) is taken as abandoned
+DOWNLOAD_ARCHIVE_BUILD_TIMEOUT = env_int("DOWNLOAD_ARCHIVE_BUILD_TIMEOUT", 3600)
+
+# ---------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------
+
+# File based by default so every gunicorn worker and the ingest scripts
+# share it (an invalidation in one process is seen by all)
+CACHES = {
+    "default": {
+        "BACKEND": env("DJANGO_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": env("DJANGO_CACHE_LOCATION", "/psws/temp/django_cache"),
+        "TIMEOUT": env_int("DJANGO_CACHE_TIMEOUT", 300),
+    }
+}
+# Home page station map payload; rebuilt on station changes or after this many seconds
+STATION_MAP_CACHE_SECONDS = env_int("STATION_MAP_CACHE_SECONDS", 300)
+
 # ---------------------------------------------------------------------
 # Crispy Forms
 # ---------------------------------------------------------------------